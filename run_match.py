@@ -6,7 +6,10 @@ import discord
 import asyncio
 from dotenv import load_dotenv
 import os
-from log_monitor import LogMonitor
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.completion import CompletionWatcher
+from sc2_bootstrap_discord.journal import FINISH, QUEUE, START, QueueJournal
+from sc2_bootstrap_discord.results import ResultsFile, ResultsStore
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,6 +18,8 @@ PLAYER1 = os.getenv('PLAYER1')
 CHANNEL_NAME = os.getenv('CHANNEL_NAME')
 GRAYLOG_HOST = os.getenv('GRAYLOG_HOST', None)
 GRAYLOG_PORT = int(os.getenv('GRAYLOG_PORT', '12201'))
+# Every controller's log (our bot, the opponent, the micro bot) is shipped
+LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', os.path.join('logs', 'bot_controller*', '**', 'stderr.log'))
 MAPS_PATH = './maps'
 LADDERBOTS_TYPE = {"BinaryCpp": "cpplinux", "Python": "python", "DotNetCore": "dotnetcore"}
 MAP_FILE_EXT = 'SC2Map'
@@ -27,9 +32,23 @@ MAPS = sorted(file.name.rstrip('AIE.SC2Map') for file in Path('./maps').iterdir(
 
 SC2Match = namedtuple('SC2Match', ['map', 'bot1', 'bot2', 'priority'])
 
-def get_results_json():
-    with open('results.json', 'r') as results_file:
-        return json.load(results_file)['results']
+# results.json indexed into SQLite; only entries added since the last read are parsed
+RESULTS = ResultsStore(os.getenv('RESULTS_PATH', 'results.json'), os.getenv('RESULTS_DB', 'results.db'))
+# The last result comes from the tail of results.json
+RESULTS_FILE = ResultsFile(RESULTS.results_path)
+# Ends a match at its result or game-result log line, before the containers stop
+COMPLETION = CompletionWatcher(RESULTS_FILE)
+# Queued matches survive a restart; the one playing is queued again
+JOURNAL = QueueJournal(os.getenv('QUEUE_JOURNAL', 'queue.journal'))
+
+def journal(op, ticket, **fields):
+    JOURNAL.record(op, ticket, **fields)
+    asyncio.get_running_loop().run_in_executor(None, JOURNAL.flush)
+
+def record_result(match_id, match):
+    RESULTS.refresh()
+    RESULTS.annotate(match_id, match.bot1, match.bot2, match.map)
+    RESULTS.leaderboard.record(match_id)
         
 def get_bot_exe_type(bot_name):
     try:
@@ -40,45 +59,62 @@ def get_bot_exe_type(bot_name):
     except (FileNotFoundError, KeyError):
         return "python"
 
+def write_matches_file(match_string):
+    with open("matches", "w") as f:
+        f.write(match_string)
+
 class Sc2Runner(discord.Client):
     def __init__(self, bot_name, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.bot_name = bot_name
-        self.match_queue = []
+        # (ticket, match)
+        self.match_queue = [(ticket, SC2Match(*fields)) for ticket, fields, _ in JOURNAL.replay()]
+        self.next_ticket = JOURNAL.next_ticket
         self.queue_task = None
         self.current_match = None
         self.channel_id = None
+        self.match_process = None
+        self.teardown_task = None
         
         # Initialize log monitor
         if GRAYLOG_HOST:
             print(f"GRAYLOG_HOST is set to: {GRAYLOG_HOST}")
-            log_path = os.path.join('logs', 'bot_controller1', 'TBone', 'stderr.log')
-            print(f'Initializing log monitor with path: {log_path} and host: {GRAYLOG_HOST} and port: {GRAYLOG_PORT}')
-            self.log_monitor = LogMonitor(log_path, GRAYLOG_HOST, GRAYLOG_PORT)
-            print("LogMonitor instance created, starting monitoring...")
-            self.log_monitor.start_monitoring()
-            print("LogMonitor start_monitoring called")
+            print(f'Initializing log monitor with path: {LOG_FILE_PATH} and host: {GRAYLOG_HOST} and port: {GRAYLOG_PORT}')
+            self.log_monitor = LogMonitor(LOG_FILE_PATH, GRAYLOG_HOST, GRAYLOG_PORT)
+            self.log_monitor.on_game_result = lambda match_id, *game_result: COMPLETION.log_result(*game_result)
+            print("LogMonitor instance created, monitoring starts in setup_hook")
         else:
             self.log_monitor = None
             print("GRAYLOG_HOST not set, skipping log monitor initialization")
 
     def queue_match(self, player1, player2, map_name):
-        self.match_queue.append(SC2Match(map_name, player1, player2, 3))
+        match = SC2Match(map_name, player1, player2, 3)
+        ticket, self.next_ticket = self.next_ticket, self.next_ticket + 1
+        self.match_queue.append((ticket, match))
+        journal(QUEUE, ticket, match=list(match))
 
     async def process_queue(self):
         while True:
             if self.match_queue:
-                match = self.match_queue.pop(0)
+                ticket, match = self.match_queue.pop(0)
                 self.current_match = match
-                await self.do_match(match)
+                await self.do_match(match, ticket)
                 print(f'Match ended: {match}')
                 await self.report_result(match)
+                journal(FINISH, ticket)
                 self.current_match = None                
                 
             await asyncio.sleep(3)  # Sleep to prevent tight loop
 
     async def report_result(self, match:SC2Match):
-        match_results = get_results_json()[-1]
+        if self.match_process is not None:
+            match_results = await COMPLETION.result(self.match_process)
+        else:
+            match_results = await asyncio.to_thread(RESULTS_FILE.last)
+        if match_results is None:
+            return
+        if 'match' in match_results:
+            await asyncio.to_thread(record_result, match_results['match'], match)
         match_results['opponent'] = match.bot2
         match_results['map'] = match.map
         formatted_results = f"**Match Results:**\n```json\n{json.dumps(match_results, indent=4)}\n```"        
@@ -86,33 +122,39 @@ class Sc2Runner(discord.Client):
             channel = self.get_channel(self.channel_id)
             await channel.send(formatted_results)
 
-    async def do_match(self, match: SC2Match):
+    async def do_match(self, match: SC2Match, ticket=None):
         # Retrieve the current match ID from results.json
-        current_match_id = self._get_next_match_id()
+        current_match_id = await asyncio.to_thread(self._get_next_match_id)
+        if ticket is not None:
+            journal(START, ticket, match_id=current_match_id)
+        bot_type = await asyncio.to_thread(get_bot_exe_type, match.bot2)
+        matchString = f"1,{match.bot1},T,python,2,{match.bot2},T,{bot_type},{match.map}"
+        await asyncio.to_thread(write_matches_file, matchString)
+        # The last match's containers may still be stopping
+        if self.teardown_task is not None:
+            await self.teardown_task
+            self.teardown_task = None
         if self.log_monitor:
-            self.log_monitor.current_match_id = current_match_id
+            await self.log_monitor.set_match(current_match_id)
         # Send a status update to Discord
         if self.channel_id:
             channel = self.get_channel(self.channel_id)
             await channel.send(f"Match {current_match_id} started: {match.bot1} vs {match.bot2} on map {match.map}")
-        matchString = f"1,{match.bot1},T,python,2,{match.bot2},T,{get_bot_exe_type(match.bot2)},{match.map}"
-        with open("matches", "w") as f:
-            f.write(f"{matchString}")
+        await asyncio.to_thread(COMPLETION.arm)
         command = f'docker-compose -f docker-compose-host-network.yml up'
         process = await asyncio.create_subprocess_shell(command, shell=True, executable='/bin/bash')
-        await process.communicate()
+        self.match_process = process
+        await COMPLETION.wait(process)
+        # Report now; docker-compose finishes tearing down in the background
+        self.teardown_task = asyncio.create_task(process.communicate())
 
     def _get_next_match_id(self) -> int:
         """Get the next match ID by incrementing the last match's 'match' field from results.json."""
-        try:
-            with open('results.json', 'r') as f:
-                results = json.load(f)
-                last_match = results['results'][-1]
-                return last_match.get('match', 0) + 1
-        except (FileNotFoundError, json.JSONDecodeError, IndexError, KeyError):
-            return 1
+        return RESULTS_FILE.next_match_id()
 
     async def setup_hook(self):
+        if self.log_monitor:
+            await self.log_monitor.start()
         self.queue_task = self.loop.create_task(self.process_queue())  
         
 
@@ -133,7 +175,8 @@ class Sc2Runner(discord.Client):
     async def close(self):
         """Clean up resources when the client is closing."""
         if self.log_monitor:
-            self.log_monitor.stop_monitoring()
+            await self.log_monitor.aclose()
+        await asyncio.to_thread(JOURNAL.close)
         await super().close()
 
 intents = discord.Intents.default()
@@ -173,8 +216,8 @@ async def on_message(message):
     elif message.content.startswith('!maps'):
         await message.channel.send(f'{MAPS}')
     elif message.content.startswith('!queue'):
-        await message.channel.send(f'Current: {client.current_match} - Queue: {client.match_queue}')
+        await message.channel.send(f'Current: {client.current_match} - Queue: {[match for _, match in client.match_queue]}')
     elif message.content.startswith('!last_match'):
-        await message.channel.send(f'{get_results_json()[-1]}')
+        await message.channel.send(f'{await asyncio.to_thread(RESULTS_FILE.last)}')
 
 client.run(DISCORD_TOKEN)
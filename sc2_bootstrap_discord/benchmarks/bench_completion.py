@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Time between matches when results are reported on completion rather than on
+docker-compose exit.
+
+``Sc2Runner.process_queue`` plays a few matches against a stand-in for
+``docker-compose up`` that writes its result after ``--game`` seconds and
+exits ``--teardown`` seconds later. For each match it records when the game
+ended, when the result was posted and when the next match was announced:
+
+- ``on exit``: the old flow, nothing happens until the process exits
+- ``on completion``: ``CompletionWatcher`` (results.json polled every 0.5 s)
+
+    python benchmarks/bench_completion.py [--matches 3] [--game 2] [--teardown 10]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import statistics
+import sys
+import tempfile
+import time
+
+import discord
+
+from sc2_bootstrap_discord.completion import EXIT, CompletionWatcher
+from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+FAKE_COMPOSE = """
+import json, os, sys, time
+game, teardown = float(sys.argv[1]), float(sys.argv[2])
+time.sleep(game)
+results = {'results': []}
+if os.path.exists('results.json'):
+    with open('results.json') as f:
+        results = json.load(f)
+results['results'].append({'match': len(results['results']) + 1, 'result': 'Player1Win', 'ended': time.time()})
+with open('results.json', 'w') as f:
+    json.dump(results, f, indent=4)
+time.sleep(teardown)
+"""
+
+
+class WaitForExit(CompletionWatcher):
+    """The old behaviour: a match is over when docker-compose exits."""
+
+    async def wait(self, process):
+        await process.wait()
+        return EXIT
+
+
+class Channel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message):
+        self.messages.append((time.time(), message))
+
+
+async def play(runner: Sc2Runner, matches: int) -> list:
+    channel = Channel()
+    runner.channel_id = 1
+    runner.get_channel = lambda channel_id: channel
+    for _ in range(matches):
+        runner.queue_match('zergbot', 'GresvanAIE')
+    task = asyncio.create_task(runner.process_queue())
+    while sum(message.startswith('**Match Results') for _, message in channel.messages) < matches:
+        await asyncio.sleep(0.05)
+    task.cancel()
+    for worker in runner.workers:
+        if worker.teardown_task:
+            await worker.teardown_task
+    return channel.messages
+
+
+def measure(command: str, watcher: type, matches: int) -> tuple:
+    for name in ('results.json', 'results.db'):
+        if os.path.exists(name):
+            os.remove(name)
+    runner = Sc2Runner('terranbot', intents=discord.Intents.none(), compose_command=command)
+    worker = runner.workers[0]
+    worker.completion = watcher(worker.results_file, executor=runner.io_executor)
+    messages = asyncio.run(play(runner, matches))
+    runner.results.close()
+    runner.io_executor.shutdown()
+    with open('results.json') as f:
+        ended = [entry['ended'] for entry in json.load(f)['results']]
+    posted = [at for at, message in messages if message.startswith('**Match Results')]
+    started = [at for at, message in messages if message.startswith('Match ') and 'started' in message]
+    report = statistics.mean(p - e for p, e in zip(posted, ended))
+    gap = statistics.mean(s - e for s, e in zip(started[1:], ended))
+    return report, gap
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=3)
+    parser.add_argument('--game', type=float, default=2.0)
+    parser.add_argument('--teardown', type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        script = os.path.join(tmpdir, 'fake_compose.py')
+        with open(script, 'w') as f:
+            f.write(FAKE_COMPOSE)
+        command = f'{shlex.quote(sys.executable)} {shlex.quote(script)} {args.game} {args.teardown}'
+        print(f"{args.matches} matches, {args.game:.0f}s game, {args.teardown:.0f}s teardown")
+        print(f"{'':<14} {'game end -> result posted':>26} {'game end -> next match':>23}")
+        for label, watcher in (('on exit', WaitForExit), ('on completion', CompletionWatcher)):
+            report, gap = measure(command, watcher, args.matches)
+            print(f"{label:<14} {report:>25.2f}s {gap:>22.2f}s")
+
+
+if __name__ == '__main__':
+    main()
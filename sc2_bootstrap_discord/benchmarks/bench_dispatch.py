@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Enqueue-to-start latency: the old 3-second polling loop against event-driven dispatch.
+
+An idle ``Sc2Runner`` gets ``--matches`` matches, one at a time, each queued
+at a random moment after the last has finished, against a stand-in
+``docker-compose up``. The benchmark reports the time from ``queue_match``
+to the "Match N started" message. Beforehand, it counts how often the queue
+loop wakes up over ``--quiet`` seconds with nothing queued.
+
+    python benchmarks/bench_dispatch.py [--matches 10] [--idle 2] [--quiet 10]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import shlex
+import statistics
+import sys
+import tempfile
+import time
+
+import discord
+
+from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+FAKE_COMPOSE = """
+import json, os, time
+time.sleep(0.05)
+results = {'results': []}
+if os.path.exists('results.json'):
+    with open('results.json') as f:
+        results = json.load(f)
+results['results'].append({'match': len(results['results']) + 1, 'result': 'Player1Win'})
+with open('results.json', 'w') as f:
+    json.dump(results, f, indent=4)
+"""
+
+
+class PollingRunner(Sc2Runner):
+    """The old loop: try to dispatch, otherwise sleep 3 seconds."""
+
+    async def process_queue(self) -> None:
+        while True:
+            if await self._dispatch():
+                continue
+            await asyncio.sleep(3)
+
+
+class Channel:
+    def __init__(self):
+        self.started = []
+
+    async def send(self, message):
+        if ' started' in message:
+            self.started.append(time.monotonic())
+
+
+async def play(runner: Sc2Runner, matches: int, idle: float, quiet: float) -> tuple:
+    channel = Channel()
+    runner.channel_id = 1
+    runner.get_channel = lambda channel_id: channel
+    wakeups = 0
+    dispatch = runner._dispatch
+
+    async def counted():
+        nonlocal wakeups
+        wakeups += 1
+        return await dispatch()
+    runner._dispatch = counted
+    task = asyncio.create_task(runner.process_queue())
+    await asyncio.sleep(0.1)
+    before = wakeups
+    await asyncio.sleep(quiet)
+    idle_wakeups = (wakeups - before) / quiet * 60
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(matches):
+        await asyncio.sleep(rng.uniform(0, idle))
+        queued = time.monotonic()
+        runner.queue_match('zergbot', 'GresvanAIE')
+        while len(channel.started) < len(latencies) + 1:
+            await asyncio.sleep(0.001)
+        latencies.append(channel.started[-1] - queued)
+        while runner.match_tasks:
+            await asyncio.wait(set(runner.match_tasks))
+        await runner.workers[0].wait_teardown()
+    task.cancel()
+    return latencies, idle_wakeups
+
+
+def measure(runner_type: type, command: str, matches: int, idle: float, quiet: float) -> tuple:
+    for name in ('results.json', 'results.db'):
+        if os.path.exists(name):
+            os.remove(name)
+    runner = runner_type('terranbot', intents=discord.Intents.none(), compose_command=command)
+    runner.workers[0].completion.poll_interval = 0.02
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(play(runner, matches, idle, quiet))
+    runner.results.close()
+    runner.io_executor.shutdown()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=10)
+    parser.add_argument('--idle', type=float, default=2.0, help='longest idle time before a match is queued')
+    parser.add_argument('--quiet', type=float, default=10.0, help='seconds of empty queue to count wakeups over')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        script = os.path.join(tmpdir, 'fake_compose.py')
+        with open(script, 'w') as f:
+            f.write(FAKE_COMPOSE)
+        command = f'{shlex.quote(sys.executable)} {shlex.quote(script)}'
+        print(f"{args.matches} matches, each queued after up to {args.idle:.0f}s idle")
+        print(f"{'dispatch':<10} {'mean latency':>13} {'max latency':>12} {'idle wakeups/min':>17}")
+        for label, runner_type in (('polling', PollingRunner), ('event', Sc2Runner)):
+            latencies, wakeups = measure(runner_type, command, args.matches, args.idle, args.quiet)
+            print(f"{label:<10} {statistics.mean(latencies) * 1000:>11.1f}ms "
+                  f"{max(latencies) * 1000:>10.1f}ms {wakeups:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Bot log line latency: tailing stderr.log against streaming container output from the Docker API.
+
+A stand-in bot writes ``--lines`` debug lines at ``--rate`` lines a second,
+each carrying the time it was written. The benchmark reports the delay from
+the write until ``LogMonitor`` hands the parsed line to the shipper:
+
+- file: the bot writes logs/.../stderr.log and the monitor tails it (inotify);
+- docker: the bot runs as a container of a stand-in Docker Engine on a unix
+  socket, and ``DockerExecutor`` feeds its stderr straight to the monitor.
+
+    python benchmarks/bench_docker_logs.py [--lines 5000] [--rate 2000]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import uuid
+
+from aiohttp import web
+
+from sc2_bootstrap_discord.executors import DockerExecutor
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.workers import Worker
+
+BOT = """
+import sys, time
+lines, rate = int(sys.argv[1]), float(sys.argv[2])
+out = open(sys.argv[3], 'a') if len(sys.argv) > 3 else sys.stderr
+started = time.monotonic()
+for n in range(lines):
+    delay = started + n / rate - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    out.write(f"14:25 {n} 50ms 195M 3650G 173/200U INFO bench.bot:1 t={time.time():.6f}\\n")
+    out.flush()
+"""
+
+
+class FakeEngine:
+    """Just enough of the Docker Engine API: containers run their Cmd as local processes."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.containers = {}
+        app = web.Application()
+        app.router.add_post('/{version}/containers/create', self.create)
+        app.router.add_post('/{version}/containers/{id}/start', self.start_container)
+        app.router.add_post('/{version}/containers/{id}/wait', self.wait)
+        app.router.add_get('/{version}/containers/{id}/logs', self.logs)
+        app.router.add_delete('/{version}/containers/{id}', self.remove)
+        self.runner = web.AppRunner(app)
+
+    async def start(self) -> None:
+        await self.runner.setup()
+        await web.UnixSite(self.runner, self.socket_path).start()
+
+    async def create(self, request):
+        container_id = uuid.uuid4().hex
+        self.containers[container_id] = {'config': await request.json(), 'process': None,
+                                         'started': asyncio.Event()}
+        return web.json_response({'Id': container_id}, status=201)
+
+    async def start_container(self, request):
+        container = self.containers[request.match_info['id']]
+        container['process'] = await asyncio.create_subprocess_exec(
+            *container['config']['Cmd'], stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        container['started'].set()
+        return web.Response(status=204)
+
+    async def wait(self, request):
+        container = self.containers[request.match_info['id']]
+        await container['started'].wait()
+        return web.json_response({'StatusCode': await container['process'].wait()})
+
+    async def logs(self, request):
+        container = self.containers[request.match_info['id']]
+        await container['started'].wait()
+        response = web.StreamResponse()
+        await response.prepare(request)
+
+        async def copy(stream, reader):
+            while data := await reader.read(65536):
+                await response.write(struct.pack('>BxxxL', stream, len(data)) + data)
+        process = container['process']
+        await asyncio.gather(copy(1, process.stdout), copy(2, process.stderr))
+        await response.write_eof()
+        return response
+
+    async def remove(self, request):
+        self.containers.pop(request.match_info['id'], None)
+        return web.Response(status=204)
+
+
+def monitor(path: str) -> tuple:
+    log_monitor = LogMonitor(path, 'localhost', 12201, rollup_window=0, step_index=False, instrument=False)
+    latencies = []
+
+    def emit(message, fields, match_id=None, source=None):
+        if message.startswith('t='):
+            latencies.append(time.time() - float(message[2:]))
+    log_monitor._emit = emit
+    return log_monitor, latencies
+
+
+async def tail_file(tmpdir: str, script: str, lines: int, rate: float) -> list:
+    path = os.path.join(tmpdir, 'logs', 'bot_controller1', 'bench', 'stderr.log')
+    os.makedirs(os.path.dirname(path))
+    open(path, 'w').close()
+    log_monitor, latencies = monitor(path)
+    await log_monitor.start()
+    await asyncio.sleep(0.2)
+    bot = await asyncio.create_subprocess_exec(sys.executable, script, str(lines), str(rate), path)
+    await bot.wait()
+    deadline = time.monotonic() + 5
+    while len(latencies) < lines and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await log_monitor.aclose()
+    return latencies
+
+
+async def stream_container(tmpdir: str, script: str, lines: int, rate: float) -> list:
+    socket_path = os.path.join(tmpdir, 'docker.sock')
+    engine = FakeEngine(socket_path)
+    await engine.start()
+    log_monitor, latencies = monitor(os.path.join(tmpdir, 'unused.log'))
+    executor = DockerExecutor(Worker(tmpdir, 'true', name='bench'), socket_path=socket_path, services=[
+        {'name': 'bot', 'tags': {'bot_name': 'bench'},
+         'config': {'Cmd': [sys.executable, script, str(lines), str(rate)]}}])
+    executor.log_monitor = log_monitor
+    run = await executor.launch('')
+    await executor.teardown(run)
+    await executor.close()
+    await log_monitor.aclose()
+    await engine.runner.cleanup()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=2000.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        script = os.path.join(tmpdir, 'bot.py')
+        with open(script, 'w') as f:
+            f.write(BOT)
+        print(f"{args.lines} lines at {args.rate:.0f} lines/s")
+        print(f"{'path':<8} {'lines':>6} {'mean':>9} {'p50':>9} {'p99':>9} {'max':>9}")
+        for label, run in (('file', tail_file), ('docker', stream_container)):
+            with contextlib.redirect_stderr(io.StringIO()):
+                latencies = asyncio.run(run(tmpdir, script, args.lines, args.rate))
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f"{label:<8} {len(latencies):>6} {statistics.mean(latencies) * 1000:>7.2f}ms "
+                  f"{statistics.median(latencies) * 1000:>7.2f}ms {p99 * 1000:>7.2f}ms "
+                  f"{latencies[-1] * 1000:>7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Per-line cost of emitting a parsed bot log line, through logging and direct.
+
+``logging``: the previous ``LogMonitor._emit`` - an extra dict with
+``os.uname()``, ``logger.info`` into the ShippingHandler - then, on the
+sender thread, stdout formatting and graypy serialisation.
+``emitter``: ``GelfEmitter`` with a cached per-match prefix and
+``submit_raw``, then the GELF handler passing the payload through.
+
+Both report the caller's cost (the tail loop) and the sender's cost per line,
+best of several runs.
+
+    python benchmarks/bench_emitter.py [--lines N] [--runs R]
+"""
+
+import argparse
+import gc
+import io
+import logging
+import os
+import time
+
+from sc2_bootstrap_discord.emitter import GelfEmitter
+from sc2_bootstrap_discord.log_monitor import record_fields
+from sc2_bootstrap_discord.parser import parse_debug_line
+from sc2_bootstrap_discord.shipping import DEBUG_LOG_LEVELS, GelfShipper, ShippingHandler
+from sc2_bootstrap_discord.transports import GelfTransport, GelfTransportHandler
+
+SAMPLE = ("14:29 {step}  170ms   380M 3702G 173/200U Level 20 "
+          "sharpy.managers.core.log_manager:71 [EnemyArmyPredicter] "
+          "Predicting negative free minerals for enemy: -{step}")
+TAGS = {'controller': 'bot_controller1', 'bot_name': 'terranbot'}
+
+
+class NullTransport(GelfTransport):
+    def __init__(self):
+        super().__init__('127.0.0.1', 0)
+
+    def send_batch(self, messages):
+        self.messages_sent += len(messages)
+
+
+def make_shipper(echo: bool) -> GelfShipper:
+    stdout = logging.StreamHandler(io.StringIO())
+    stdout.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    return GelfShipper([stdout, GelfTransportHandler(NullTransport())], maxsize=10_000_000, echo=echo)
+
+
+def via_logging(records) -> GelfShipper:
+    shipper = make_shipper(echo=True)
+    logger = logging.getLogger('bench_emitter')
+    logger.handlers[:] = [ShippingHandler(shipper)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for record in records:
+        extra = {'match': 1, 'source': 'sc2_test_runner', 'host': os.uname().nodename}
+        extra.update(TAGS)
+        extra.update(record_fields(record))
+        logger.info(record.message, extra=extra)
+    return shipper
+
+
+def via_emitter(records) -> GelfShipper:
+    shipper = make_shipper(echo=False)
+    emitter = GelfEmitter()
+    for record in records:
+        fields = record_fields(record)
+        prefix = emitter.prefix(1, TAGS, 'stderr.log')
+        shipper.submit_raw(emitter.encode(prefix, record.message, fields),
+                           fields.get('log_level') in DEBUG_LOG_LEVELS)
+    return shipper
+
+
+def measure(path, records):
+    """(caller seconds, sender seconds) for one run."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        shipper = path(records)
+        queued = time.perf_counter()
+        while shipper.queued:
+            shipper._ship(shipper._take_batch())
+        return queued - start, time.perf_counter() - queued
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    records = [parse_debug_line(SAMPLE.format(step=i)) for i in range(args.lines)]
+
+    best = {}
+    for _ in range(args.runs):
+        for name, path in (('logging', via_logging), ('emitter', via_emitter)):
+            caller, sender = measure(path, records)
+            previous = best.get(name, (float('inf'), float('inf')))
+            best[name] = (min(previous[0], caller), min(previous[1], sender))
+    for name, (caller, sender) in best.items():
+        print(f"{name}: caller {caller / args.lines * 1e6:6.2f}us/line  "
+              f"sender {sender / args.lines * 1e6:6.2f}us/line  "
+              f"total {(caller + sender) / args.lines * 1e6:6.2f}us/line")
+    before, after = sum(best['logging']), sum(best['emitter'])
+    print(f"speedup: caller {best['logging'][0] / best['emitter'][0]:.2f}x, total {before / after:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Start latency of short matches: docker-compose from scratch against a warm pool.
+
+An ``Sc2Runner`` plays ``--matches`` queued matches one after another on a
+stand-in environment that takes ``--startup`` seconds to come up (container
+creation and SC2 startup) before it plays for ``--game`` seconds, like a
+``!micro`` match. The benchmark reports the time from each "Match N started"
+message to the game starting, and matches per minute overall, for the compose
+executor and for a warm pool of ``--size`` environments.
+
+    python benchmarks/bench_executor.py [--matches 10] [--startup 2] [--game 1] [--size 1]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shlex
+import statistics
+import sys
+import tempfile
+import time
+
+import discord
+
+from sc2_bootstrap_discord.executors import WarmPoolExecutor
+from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+FAKE_ENVIRONMENT = """
+import json, os, sys, time
+startup, game, warm = float(sys.argv[1]), float(sys.argv[2]), sys.argv[3] == 'warm'
+time.sleep(startup)
+if warm:
+    print('ready', flush=True)
+    line = sys.stdin.readline()
+    if not line:
+        sys.exit(0)
+with open('started', 'a') as f:
+    f.write(f'{time.time()}\\n')
+time.sleep(game)
+results = {'results': []}
+if os.path.exists('results.json'):
+    with open('results.json') as f:
+        results = json.load(f)
+results['results'].append({'match': len(results['results']) + 1, 'result': 'Player1Win'})
+with open('results.json', 'w') as f:
+    json.dump(results, f, indent=4)
+"""
+
+
+class Channel:
+    def __init__(self):
+        self.started = []
+
+    async def send(self, message):
+        if ' started' in message:
+            self.started.append(time.time())
+
+
+async def play(runner: Sc2Runner, matches: int) -> float:
+    worker = runner.workers[0]
+    await worker.match_executor.start()
+    while isinstance(worker.match_executor, WarmPoolExecutor) and not worker.match_executor.ready:
+        await asyncio.sleep(0.01)
+    started = time.monotonic()
+    for n in range(matches):
+        runner.queue_match(f'bot{n % 5}', 'Tier1MicroAIArena_v6')
+    while runner.match_queue or runner.match_tasks:
+        if not await runner._dispatch():
+            await asyncio.sleep(0.01)
+    elapsed = time.monotonic() - started
+    await worker.wait_teardown()
+    await worker.match_executor.close()
+    return elapsed
+
+
+def measure(match_executor: str, script: str, args: argparse.Namespace) -> tuple:
+    for name in ('results.json', 'results.db', 'started'):
+        if os.path.exists(name):
+            os.remove(name)
+    command = ' '.join(shlex.quote(part) for part in (sys.executable, script, str(args.startup),
+                                                       str(args.game), match_executor))
+    runner = Sc2Runner('terranbot', intents=discord.Intents.none(), compose_command=command,
+                       queue_journal=None, match_executor=match_executor,
+                       executor_options={'command': command, 'size': args.size} if match_executor == 'warm' else None)
+    runner.workers[0].completion.poll_interval = 0.02
+    channel = Channel()
+    runner.channel_id = 1
+    runner.get_channel = lambda channel_id: channel
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = asyncio.run(play(runner, args.matches))
+    runner.results.close()
+    runner.io_executor.shutdown()
+    with open('started') as f:
+        playing = [float(line) for line in f]
+    latencies = [start - message for message, start in zip(channel.started, playing)]
+    return latencies, args.matches / elapsed * 60
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=10)
+    parser.add_argument('--startup', type=float, default=2.0, help='seconds to create containers and start SC2')
+    parser.add_argument('--game', type=float, default=1.0, help='seconds each match plays')
+    parser.add_argument('--size', type=int, default=1, help='warm environments kept ready')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        script = os.path.join(tmpdir, 'fake_environment.py')
+        with open(script, 'w') as f:
+            f.write(FAKE_ENVIRONMENT)
+        print(f"{args.matches} matches of {args.game:.1f}s, {args.startup:.1f}s environment startup")
+        print(f"{'executor':<10} {'mean start':>11} {'max start':>10} {'matches/min':>12}")
+        for label, match_executor in (('compose', 'compose'), (f'warm x{args.size}', 'warm')):
+            latencies, rate = measure(match_executor, script, args)
+            print(f"{label:<10} {statistics.mean(latencies) * 1000:>9.0f}ms "
+                  f"{max(latencies) * 1000:>8.0f}ms {rate:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Match throughput of the farm with 1, 2 and 4 agents.
+
+A ``FarmCoordinator`` hands ``--matches`` jobs to ``farm-agent`` processes,
+each with ``--workers`` worker directories running a stand-in for
+``docker-compose up`` that "plays" for ``--game`` seconds. Each line reports
+the wall time for the whole batch and matches per minute.
+
+    python benchmarks/bench_farm.py [--agents 1,2,4] [--matches 16] [--game 2] [--workers 1]
+"""
+
+import argparse
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+import sc2_bootstrap_discord
+from sc2_bootstrap_discord.farm import FarmCoordinator
+from sc2_bootstrap_discord.workers import SC2Match
+
+FAKE_COMPOSE = """
+import json, os, sys, time
+time.sleep(float(sys.argv[1]))
+results = {'results': []}
+if os.path.exists('results.json'):
+    with open('results.json') as f:
+        results = json.load(f)
+results['results'].append({'match': len(results['results']) + 1, 'result': 'Player1Win', 'ended': time.time()})
+with open('results.json', 'w') as f:
+    json.dump(results, f, indent=4)
+"""
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(sc2_bootstrap_discord.__file__)))
+
+
+async def measure(tmpdir: str, command: str, agents: int, workers: int, matches: int) -> float:
+    coordinator = FarmCoordinator('127.0.0.1', 0)
+    await coordinator.start()
+    processes = []
+    for n in range(agents):
+        directories = [os.path.join(tmpdir, f'{agents}_{n}', f'w{w}') for w in range(workers)]
+        for directory in directories:
+            os.makedirs(directory)
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'sc2_bootstrap_discord.cli', 'farm-agent', '--coordinator',
+             f'127.0.0.1:{coordinator.port}', '--name', f'agent{n}', '--compose-command', command,
+             '--workers', *directories],
+            env=dict(os.environ, PYTHONPATH=SRC), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    while len(coordinator.agents) < agents:
+        await asyncio.sleep(0.05)
+    started = time.monotonic()
+    await asyncio.gather(*(coordinator.run(i, SC2Match('GresvanAIE', 'terranbot', 'zergbot', 3))
+                           for i in range(1, matches + 1)))
+    elapsed = time.monotonic() - started
+    await coordinator.close()
+    for process in processes:
+        process.kill()
+        process.wait()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--agents', default='1,2,4')
+    parser.add_argument('--matches', type=int, default=16)
+    parser.add_argument('--game', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        script = os.path.join(tmpdir, 'fake_compose.py')
+        with open(script, 'w') as f:
+            f.write(FAKE_COMPOSE)
+        command = f'{shlex.quote(sys.executable)} {shlex.quote(script)} {args.game}'
+        print(f"{args.matches} matches, {args.game:.0f}s game, {args.workers} worker(s) per agent")
+        print(f"{'agents':>6} {'wall time':>10} {'matches/min':>12}")
+        for agents in (int(n) for n in args.agents.split(',')):
+            elapsed = asyncio.run(measure(tmpdir, command, agents, args.workers, args.matches))
+            print(f"{agents:>6} {elapsed:>9.1f}s {args.matches / elapsed * 60:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
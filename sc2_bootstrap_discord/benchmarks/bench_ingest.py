@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for offline ingestion: parse time against worker count.
+
+Generates a multi-GB bot log (several matches back to back), then parses it
+into per-match columns with 1, 2, 4, ... up to one worker per core and reports
+the speedup over a single process.
+
+    python benchmarks/bench_ingest.py [--size-mb 2048] [--max-workers N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sc2_bootstrap_discord.ingest import parse_matches
+
+SAMPLE = ("{time} {step}  {ms}ms   380M 3702G 173/200U Level 20 "
+          "sharpy.managers.core.log_manager:71 [EnemyArmyPredicter] "
+          "Predicting negative free minerals for enemy: -{n}\n")
+STEPS_PER_MATCH = 40_000
+
+
+def write_log(path: str, size: int) -> int:
+    """Write about ``size`` bytes of log, restarting the step count every match."""
+    written = lines = 0
+    with open(path, 'w') as f:
+        while written < size:
+            step = lines % STEPS_PER_MATCH
+            seconds = int(step / 22.4)
+            chunk = ''.join(SAMPLE.format(time=f'{seconds // 60:02d}:{seconds % 60:02d}', step=step,
+                                          ms=40 + step % 60, n=lines + i) for i in range(10))
+            f.write(chunk)
+            written += len(chunk)
+            lines += 10
+    return lines
+
+
+def worker_counts(limit: int):
+    count = 1
+    while count < limit:
+        yield count
+        count *= 2
+    yield limit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=2048)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--range-mb', type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'stderr.log')
+        lines = write_log(path, args.size_mb * 1024 * 1024)
+        size = os.path.getsize(path)
+        print(f"{lines:,} lines, {size / 1e9:.2f} GB, {os.cpu_count()} cores")
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            start = time.perf_counter()
+            if workers == 1:
+                matches = parse_matches(path, range_size=args.range_mb * 1024 * 1024)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    matches = parse_matches(path, executor, range_size=args.range_mb * 1024 * 1024)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>3} workers: {elapsed:7.2f}s  {lines / elapsed:12,.0f} lines/s  "
+                  f"speedup {baseline / elapsed:5.2f}x  ({len(matches)} matches)")
+
+
+if __name__ == '__main__':
+    main()
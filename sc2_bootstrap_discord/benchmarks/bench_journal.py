@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cost of the durable match queue: bulk enqueueing and replay at startup.
+
+- enqueue: ``--matches`` ``queue_match`` calls in a row (a bulk submission),
+  with the journal and without. Reports the time per call on the loop thread,
+  the time until everything is on disk, and how many fsynced writes it took.
+- replay: a journal of ``--history`` finished matches plus ``--live`` still
+  queued, read back as written and after compaction.
+
+    python benchmarks/bench_journal.py [--matches 5000] [--history 100000] [--live 1000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import discord
+
+from sc2_bootstrap_discord.journal import FINISH, QUEUE, START, QueueJournal
+from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+MATCH = ['GresvanAIE', 'terranbot', 'zergbot', 3, 'alice']
+
+
+def enqueue(matches: int, journal: str | None) -> tuple:
+    runner = Sc2Runner('terranbot', intents=discord.Intents.none(), queue_journal=journal)
+    writes = 0
+    if runner.journal:
+        flush = runner.journal.flush
+
+        def counted():
+            nonlocal writes
+            writes += bool(runner.journal._buffer)
+            flush()
+        runner.journal.flush = counted
+    started = time.perf_counter()
+    for n in range(matches):
+        runner.queue_match(f'bot{n % 50}', 'GresvanAIE', requester=f'user{n % 7}')
+    queued = time.perf_counter() - started
+    runner.io_executor.shutdown(wait=True)
+    durable = time.perf_counter() - started
+    if runner.journal:
+        runner.journal.close()
+    runner.results.close()
+    return queued / matches * 1e6, durable, writes
+
+
+def write_history(path: str, history: int, live: int) -> None:
+    journal = QueueJournal(path, compact_min=1 << 62, fsync=False)
+    for ticket in range(1, history + live + 1):
+        journal.record(QUEUE, ticket, match=MATCH)
+        if ticket <= history:
+            journal.record(START, ticket, match_id=ticket)
+            journal.record(FINISH, ticket)
+        if ticket % 10000 == 0:
+            journal.flush()
+    journal.close()
+
+
+def replay(path: str) -> tuple:
+    started = time.perf_counter()
+    records = QueueJournal(path).replay()
+    return time.perf_counter() - started, len(records), os.path.getsize(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=100000)
+    parser.add_argument('--live', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        print(f"enqueue {args.matches} matches in a row")
+        print(f"{'journal':<8} {'us/call':>8} {'all on disk':>12} {'fsyncs':>7}")
+        for label, journal in (('off', None), ('on', 'queue.journal')):
+            per_call, durable, writes = enqueue(args.matches, journal)
+            print(f"{label:<8} {per_call:>8.1f} {durable * 1000:>10.1f}ms {writes:>7}")
+
+        path = os.path.join(tmpdir, 'history.journal')
+        write_history(path, args.history, args.live)
+        print(f"\nreplay {args.history} finished + {args.live} queued matches")
+        print(f"{'journal':<10} {'size':>9} {'replay':>9}")
+        seconds, live, size = replay(path)
+        print(f"{'as written':<10} {size / 1e6:>7.1f}MB {seconds * 1000:>7.0f}ms")
+        journal = QueueJournal(path, compact_min=0)
+        journal.replay()
+        with journal._write_lock:
+            journal._compact()
+        journal.close()
+        seconds, compacted_live, size = replay(path)
+        assert compacted_live == live
+        print(f"{'compacted':<10} {size / 1e6:>7.1f}MB {seconds * 1000:>7.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
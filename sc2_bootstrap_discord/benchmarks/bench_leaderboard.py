@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Leaderboard cost against history size: one recorded result, the !stats
+queries, and a full rebuild from results.json.
+
+    python benchmarks/bench_leaderboard.py [--matches 50000] [--opponents 60] [--maps 12]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sc2_bootstrap_discord.results import ResultsStore
+
+RESULTS = ('Player1Win', 'Player1Win', 'Player2Win', 'Tie', 'Player2Crash')
+RACES = ('Terran', 'Zerg', 'Protoss', 'Random')
+
+
+def entry(match: int, opponents: int, maps: int) -> dict:
+    return {'match': match, 'bot1': 'terranbot', 'bot2': f'bot{match % opponents}',
+            'map': f'Map{match % maps}AIE', 'result': RESULTS[match % len(RESULTS)]}
+
+
+def timed(func, *args, repeat: int = 20) -> float:
+    """Mean milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=50_000)
+    parser.add_argument('--opponents', type=int, default=60)
+    parser.add_argument('--maps', type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results_path = os.path.join(tmpdir, 'results.json')
+        entries = [entry(i, args.opponents, args.maps) for i in range(1, args.matches + 1)]
+        with open(results_path, 'w') as f:
+            json.dump({'results': entries}, f, indent=4)
+        store = ResultsStore(results_path, os.path.join(tmpdir, 'results.db'))
+        board = store.leaderboard
+
+        start = time.perf_counter()
+        counted = store.rebuild_stats()
+        print(f"ingest + rebuild of {counted:,} results: {time.perf_counter() - start:.2f}s")
+
+        # One more match, reported the way Sc2Runner does it
+        entries.append(entry(args.matches + 1, args.opponents, args.maps))
+        with open(results_path, 'w') as f:
+            json.dump({'results': entries}, f, indent=4)
+        start = time.perf_counter()
+        store.refresh()
+        store.annotate(args.matches + 1, race=RACES[args.matches % len(RACES)])
+        board.record(args.matches + 1)
+        print(f"record one result: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+        print(f"!stats (totals, by opponent, by race): "
+              f"{timed(lambda: (board.totals('terranbot'), board.by_opponent('terranbot'), board.by_race('terranbot'))):.2f}ms")
+        print(f"!stats bot1 (totals, by map): "
+              f"{timed(lambda: (board.totals('terranbot', 'bot1'), board.by_map('terranbot', 'bot1'))):.2f}ms")
+        print(f"!maps stats: {timed(board.by_map, 'terranbot'):.2f}ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+LogMonitor on the caller's event loop versus the old private loop on a thread.
+
+A writer on the main loop appends bot-style lines at a steady rate while the
+monitor follows the file. Each line carries the time it was written, so a
+handler on the shipper measures the latency from write to GELF send. Process
+CPU time over the run is reported alongside.
+
+    python benchmarks/bench_monitor_loop.py [--seconds S] [--rate LINES_PER_SEC]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+
+LINE = "14:25 {step} 50ms 195M 3650G 173/200U INFO bench.writer:1 t={written:.6f}\n"
+
+
+class LatencyRecorder(logging.Handler):
+    """Collect write-to-send latency from the timestamp in each message."""
+
+    def __init__(self):
+        super().__init__()
+        self.latencies = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if message.startswith('t='):
+            self.latencies.append(time.perf_counter() - float(message[2:]))
+
+
+def make_monitor(path: str) -> tuple:
+    monitor = LogMonitor(path, '127.0.0.1', 12201, rollup_window=0)
+    recorder = LatencyRecorder()
+    # Keep the real GELF handler, swap stdout for the recorder
+    monitor.shipper.handlers = [h for h in monitor.shipper.handlers
+                                if not isinstance(h, logging.StreamHandler)] + [recorder]
+    return monitor, recorder
+
+
+async def write_lines(path: str, seconds: float, rate: int) -> int:
+    """Append lines in batches every 10 ms, like a bot flushing stderr."""
+    per_tick = max(1, rate // 100)
+    end = time.perf_counter() + seconds
+    written = 0
+    with open(path, 'a') as f:
+        while time.perf_counter() < end:
+            for _ in range(per_tick):
+                f.write(LINE.format(step=written, written=time.perf_counter()))
+                written += 1
+            f.flush()
+            await asyncio.sleep(0.01)
+    return written
+
+
+async def run_on_caller_loop(path: str, seconds: float, rate: int) -> tuple:
+    monitor, recorder = make_monitor(path)
+    await monitor.start()
+    await asyncio.sleep(0.2)
+    written = await write_lines(path, seconds, rate)
+    await asyncio.sleep(0.5)
+    await monitor.aclose()
+    return written, recorder.latencies
+
+
+async def run_on_private_thread(path: str, seconds: float, rate: int) -> tuple:
+    """The previous start_monitoring: a second loop driven from a daemon thread."""
+    monitor, recorder = make_monitor(path)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(monitor._monitor_log_file())
+
+    def run_task():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run_task, daemon=True)
+    thread.start()
+    await asyncio.sleep(0.2)
+    written = await write_lines(path, seconds, rate)
+    await asyncio.sleep(0.5)
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+    loop.close()
+    monitor.shipper.stop()
+    return written, recorder.latencies
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rate', type=int, default=2000, help='lines written per second')
+    args = parser.parse_args()
+    logging.getLogger('starcraft_bot_controller').propagate = False
+
+    for name, runner in (('private thread loop', run_on_private_thread),
+                         ('caller loop', run_on_caller_loop)):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'stderr.log')
+            open(path, 'w').close()
+            cpu = cpu_seconds()
+            start = time.perf_counter()
+            written, latencies = asyncio.run(runner(path, args.seconds, args.rate))
+            elapsed = time.perf_counter() - start
+            cpu = cpu_seconds() - cpu
+            latencies.sort()
+            ms = [x * 1000 for x in latencies]
+            p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))] if ms else float('nan')
+            print(f"{name:>20}: {len(ms)}/{written} shipped  CPU {cpu / elapsed:6.1%}  "
+                  f"latency p50 {statistics.median(ms) if ms else float('nan'):6.2f}ms  p99 {p99:6.2f}ms")
+            logging.getLogger('starcraft_bot_controller').handlers.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark: compiled parse_debug_line versus the original per-call regex.
+
+Generates a synthetic multi-million-line log in memory (mostly debug lines with
+some tracebacks and unformatted output mixed in) and reports lines/sec.
+
+    python benchmarks/bench_parser.py [--lines N]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from sc2_bootstrap_discord.parser import parse_debug_line
+
+DEBUG_LINES = [
+    "14:25 19376  152ms   195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 self.ai.game_analyzer.enemy_power=(ExtendedPower) self.power=5.0",
+    "14:29 19476  170ms   380M 3702G 173/200U Level 20 sharpy.managers.core.log_manager:71 [EnemyArmyPredicter] Predicting negative free minerals for enemy: -1135",
+    "06:07 8232   86ms    61M  212G  84/110U DEBUG terranbot.builds.plans.acts.zone_defense:299 Number enemies near main natural: 2",
+    "09:21 12572 116ms 164M 993G 81/158U WARNING terranbot.builds.plans.acts.tbone_attack:747 No ground units for main_army, using center of group",
+]
+OTHER_LINES = [
+    "Traceback (most recent call last):",
+    '  File "/root/bot/sharpy/knowledges/knowledge_bot.py", line 144, in on_step',
+    "Starting game against TestBot on AcropolisAIE",
+]
+
+
+def legacy_parse(line: str):
+    """The original LogMonitor._parse_debug_line, kept for comparison."""
+    pattern = (
+        r'(\d{2}:\d{2})\s+'
+        r'(\d+)\s+'
+        r'(\d+ms)\s+'
+        r'(\d+M)\s+'
+        r'(\d+G)\s+'
+        r'(\d+)\s*/\s*(\d+)U\s+'
+        r'(INFO|DEBUG|WARNING|Level \d+)\s+'
+        r'([^\s:]+(?:\.[^\s:]+)*):'
+        r'(\d+)\s+'
+        r'(.*)'
+    )
+    match = re.match(pattern, line.strip())
+    if not match:
+        return None
+    return {
+        'game_time': match.group(1),
+        'game_step': int(match.group(2)),
+        'step_length': match.group(3),
+        'minerals': match.group(4),
+        'gas': match.group(5),
+        'supply_used': int(match.group(6)),
+        'supply_capacity': int(match.group(7)),
+        'log_level': match.group(8),
+        'source_file': match.group(9),
+        'line_number': int(match.group(10)),
+        'message': match.group(11)
+    }
+
+
+def generate(lines: int, debug_ratio: float = 0.9):
+    rng = random.Random(42)
+    return [rng.choice(DEBUG_LINES) if rng.random() < debug_ratio else rng.choice(OTHER_LINES)
+            for _ in range(lines)]
+
+
+def run(name, parse, lines):
+    start = time.perf_counter()
+    hits = 0
+    for line in lines:
+        if parse(line) is not None:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:>18}: {elapsed:7.3f}s  {len(lines) / elapsed:12,.0f} lines/s  ({hits} parsed)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=3_000_000)
+    args = parser.parse_args()
+    lines = generate(args.lines)
+    for line in DEBUG_LINES + OTHER_LINES:
+        record = parse_debug_line(line)
+        assert (record._asdict() if record else None) == legacy_parse(line)
+    run('legacy re.match', legacy_parse, lines)
+    run('parse_debug_line', parse_debug_line, lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Event-loop blocking while reading the last match result, against history size.
+
+For results.json files of increasing size, a ticker task on the loop records
+how late it wakes up while the last result is read 20 times:
+
+- ``json.load``: the old way, a full parse on the loop
+- ``tail, pooled``: ``ResultsFile.last`` on a thread pool (as ``Sc2Runner`` does)
+
+The worst stall is what holds up Discord's gateway heartbeat.
+
+    python benchmarks/bench_results.py [--sizes 1000,10000,100000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sc2_bootstrap_discord.results import ResultsFile
+
+READS = 20
+TICK = 0.001
+
+
+def write_results(path: str, count: int) -> None:
+    results = [{'match': i, 'bot1': 'terranbot', 'bot2': f'bot{i % 50}', 'result': 'Player1Win',
+                'winner': 'terranbot', 'game_time': 12000 + i % 5000, 'game_time_formatted': '08:55',
+                'bot1_avg_step_time': 0.021, 'bot1_tags': ['opening:proxy', 'build:bio'],
+                'bot2_avg_step_time': 0.034, 'bot2_tags': []} for i in range(1, count + 1)]
+    with open(path, 'w') as f:
+        json.dump({'results': results}, f, indent=4)
+
+
+async def worst_stall(read) -> float:
+    """Largest ticker lateness in seconds while ``read`` runs READS times."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            expected = loop.time() + TICK
+            await asyncio.sleep(TICK)
+            worst = max(worst, loop.time() - expected)
+
+    task = loop.create_task(ticker())
+    await asyncio.sleep(TICK * 5)
+    for _ in range(READS):
+        await read()
+        await asyncio.sleep(0)
+    done = True
+    await task
+    return worst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    args = parser.parse_args()
+    executor = ThreadPoolExecutor(max_workers=4)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'results.json')
+        print(f"{'results':>8} {'file MB':>8} {'json.load stall':>16} {'tail, pooled stall':>19} "
+              f"{'tail read':>10}")
+        for count in (int(size) for size in args.sizes.split(',')):
+            write_results(path, count)
+            results = ResultsFile(path)
+
+            async def blocking():
+                with open(path) as f:
+                    return json.load(f)['results'][-1]
+
+            async def pooled():
+                return await asyncio.get_running_loop().run_in_executor(executor, results.last)
+
+            old = asyncio.run(worst_stall(blocking))
+            new = asyncio.run(worst_stall(pooled))
+            start = time.perf_counter()
+            for _ in range(READS):
+                results.last()
+            tail = (time.perf_counter() - start) / READS
+            print(f"{count:>8} {os.path.getsize(path) / 1e6:>8.1f} {old * 1e3:>13.1f}ms "
+                  f"{new * 1e3:>16.1f}ms {tail * 1e6:>8.0f}us")
+    executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Match queue cost and fairness: the old FIFO list against ``MatchScheduler``.
+
+One requester queues ``--backlog`` matches at once. Then, for every match
+dispatched, with probability ``--arrival`` one of ``--requesters`` others
+queues a match at a random priority. The benchmark reports the wait, counted in
+dispatches, of the other requesters' matches (mean, and the worst priority-5
+one), plus the time per queue-and-dispatch pair.
+
+    python benchmarks/bench_scheduler.py [--backlog 20000] [--requesters 10] [--arrival 0.3]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from sc2_bootstrap_discord.scheduler import MatchScheduler
+from sc2_bootstrap_discord.workers import SC2Match
+
+
+class FifoQueue:
+    """The old queue: list.append and list.pop(0)."""
+
+    def __init__(self):
+        self.items = []
+
+    def push(self, match):
+        self.items.append(match)
+
+    def pop(self):
+        return self.items.pop(0)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def simulate(queue, backlog: int, requesters: int, arrival: float, seed: int = 1) -> tuple:
+    rng = random.Random(seed)
+    # bot2 carries the dispatch count at which the match was queued
+    for _ in range(backlog):
+        queue.push(SC2Match('GresvanAIE', 'terranbot', 0, 3, 'heavy'))
+    waits = {priority: [] for priority in range(1, 6)}
+    dispatched = 0
+    started = time.perf_counter()
+    while queue:
+        match = queue.pop()
+        if match.requester != 'heavy':
+            waits[match.priority].append(dispatched - match.bot2)
+        dispatched += 1
+        if dispatched < backlog and rng.random() < arrival:
+            queue.push(SC2Match('GresvanAIE', 'terranbot', dispatched, rng.randint(1, 5),
+                                f'user{rng.randrange(requesters)}'))
+    elapsed = time.perf_counter() - started
+    light = [wait for priority in waits.values() for wait in priority]
+    return (statistics.mean(light), max(waits[1]), max(waits[5]),
+            elapsed / (backlog + len(light)) * 1e6)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backlog', type=int, default=20000)
+    parser.add_argument('--requesters', type=int, default=10)
+    parser.add_argument('--arrival', type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.backlog} matches from one requester, others arriving at {args.arrival} per dispatch")
+    print(f"{'queue':<10} {'mean wait':>10} {'max wait p1':>12} {'max wait p5':>12} {'us/match':>9}")
+    for label, queue in (('fifo', FifoQueue()), ('scheduler', MatchScheduler())):
+        mean, worst_urgent, worst_low, per_match = simulate(queue, args.backlog, args.requesters, args.arrival)
+        print(f"{label:<10} {mean:>10.1f} {worst_urgent:>12} {worst_low:>12} {per_match:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
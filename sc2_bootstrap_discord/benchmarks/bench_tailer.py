@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: LogTailer versus the old `tail -f` subprocess path.
+
+Writes a synthetic bot log, then measures how long each reader takes to hand
+every line to the consumer.
+
+    python benchmarks/bench_tailer.py [--lines N]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sc2_bootstrap_discord.tailer import LogTailer
+
+SAMPLE = ("14:29 19476  170ms   380M 3702G 173/200U Level 20 "
+          "sharpy.managers.core.log_manager:71 [EnemyArmyPredicter] "
+          "Predicting negative free minerals for enemy: -{}\n")
+
+
+def write_log(path: str, lines: int) -> int:
+    """Write a synthetic log and return its size in bytes."""
+    with open(path, 'w') as f:
+        for i in range(lines):
+            f.write(SAMPLE.format(i))
+    return os.path.getsize(path)
+
+
+async def read_with_tail(path: str, lines: int) -> float:
+    """Consume the log the way LogMonitor used to: tail -f and readline."""
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        'tail', '-n', '+1', '-f', path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    seen = 0
+    while seen < lines:
+        line = await process.stdout.readline()
+        if line.decode().strip():
+            seen += 1
+    elapsed = time.perf_counter() - start
+    process.terminate()
+    await process.wait()
+    return elapsed
+
+
+async def read_with_tailer(path: str, lines: int) -> float:
+    """Consume the log with the in-process tailer."""
+    start = time.perf_counter()
+    tailer = LogTailer(path, from_end=False)
+    seen = 0
+    async for batch in tailer.follow():
+        for line in batch:
+            if line.strip():
+                seen += 1
+        if seen >= lines:
+            break
+    elapsed = time.perf_counter() - start
+    tailer.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'stderr.log')
+        size = write_log(path, args.lines)
+        print(f"{args.lines} lines, {size / 1e6:.1f} MB")
+        for name, reader in (('tail -f subprocess', read_with_tail),
+                             ('LogTailer', read_with_tailer)):
+            elapsed = asyncio.run(reader(path, args.lines))
+            print(f"{name:>20}: {elapsed:7.3f}s  "
+                  f"{args.lines / elapsed:12,.0f} lines/s  {size / elapsed / 1e6:8.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
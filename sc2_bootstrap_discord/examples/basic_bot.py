@@ -21,7 +21,7 @@ client = Sc2Runner(
     bot_name=os.getenv('PLAYER1', 'TBone'),
     graylog_host=os.getenv('GRAYLOG_HOST'),
     graylog_port=int(os.getenv('GRAYLOG_PORT', '12201')),
-    log_file_path=os.getenv('LOG_FILE_PATH', 'logs/bot_controller1/TBone/stderr.log'),
+    log_file_path=os.getenv('LOG_FILE_PATH', 'logs/bot_controller*/**/stderr.log'),
     intents=intents
 )
 
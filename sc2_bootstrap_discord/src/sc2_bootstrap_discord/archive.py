@@ -0,0 +1,237 @@
+"""
+Per-match log archive with seekable streaming compression and retention.
+
+At the end of a match the monitor hands over the match's logs (renamed aside,
+with their game-time index). ``LogArchive`` compresses each one on a worker
+thread as a series of independent gzip members (or zstd frames) of about
+1 MB, writing ``archive/<match_id>[.<controller>][.<bot>].log.gz`` plus two
+sidecars (the controller keeps the two logs of a mirror match apart):
+
+* ``.idx`` - the step index, unchanged (offsets into the uncompressed log)
+* ``.seek`` - one (uncompressed offset, compressed offset) pair per block
+
+so a lookup decompresses a single block rather than the whole file. After
+every archive the oldest matches are removed to stay within ``keep_matches``
+and ``max_bytes``.
+"""
+
+import bisect
+import glob
+import gzip
+import logging
+import os
+import re
+import struct
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .step_index import INDEX_RECORD, excerpt_lines
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install sc2-bootstrap-discord[zstd]
+    zstandard = None
+
+GZ = 'gz'
+ZSTD = 'zst'
+FORMATS = (GZ, ZSTD)
+BLOCK_SIZE = 1024 * 1024
+SEEK_RECORD = struct.Struct('<QQ')
+ARCHIVE_NAME = re.compile(r'^(\d+)(?:\.([^/]+))?\.log\.(gz|zst)$')
+
+
+@dataclass
+class MatchLog:
+    """A finished match log handed over for archiving."""
+    path: str
+    index_path: Optional[str]
+    tags: Dict[str, str] = field(default_factory=dict)
+
+
+def _compress_block(fmt: str, data: bytes, level: int) -> bytes:
+    if fmt == ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level)
+
+
+def _decompress_block(fmt: str, data: bytes) -> bytes:
+    if fmt == ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def compress_log(src: str, dest: str, fmt: str = GZ, level: int = 6,
+                 block_size: int = BLOCK_SIZE) -> int:
+    """Stream ``src`` into ``dest`` block by block and write ``dest.seek``; return bytes written."""
+    seek_path = f'{dest}.seek'
+    tmp = f'{dest}.tmp'
+    with open(src, 'rb') as f, open(tmp, 'wb') as out, open(f'{seek_path}.tmp', 'wb') as seek:
+        uncompressed = 0
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            if len(block) == block_size:
+                # Keep blocks on line boundaries so an excerpt rarely spans two
+                rest = f.readline()
+                block += rest
+            seek.write(SEEK_RECORD.pack(uncompressed, out.tell()))
+            out.write(_compress_block(fmt, block, level))
+            uncompressed += len(block)
+        # Final entry closes the last block
+        seek.write(SEEK_RECORD.pack(uncompressed, out.tell()))
+        written = out.tell()
+    os.replace(f'{seek_path}.tmp', seek_path)
+    os.replace(tmp, dest)
+    return written
+
+
+def read_range(path: str, start: int, length: int) -> bytes:
+    """Uncompressed bytes [start, start + length) of an archived log."""
+    fmt = ZSTD if path.endswith('.zst') else GZ
+    with open(f'{path}.seek', 'rb') as f:
+        table = [SEEK_RECORD.unpack(chunk) for chunk in iter(lambda: f.read(SEEK_RECORD.size), b'')]
+    if len(table) < 2:
+        return b''
+    offsets = [entry[0] for entry in table]
+    first = block = max(0, bisect.bisect_right(offsets, start) - 1)
+    parts = []
+    with open(path, 'rb') as f:
+        while block < len(table) - 1 and offsets[block] < start + length:
+            f.seek(table[block][1])
+            parts.append(_decompress_block(fmt, f.read(table[block + 1][1] - table[block][1])))
+            block += 1
+    skip = start - offsets[first]
+    return b''.join(parts)[skip:skip + length]
+
+
+class LogArchive:
+    """Compress finished match logs off the event loop and apply retention."""
+
+    def __init__(self, directory: str = 'archive', fmt: str = GZ, level: int = 6,
+                 keep_matches: int | None = None, max_bytes: int | None = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format {fmt!r}, expected one of {FORMATS}")
+        if fmt == ZSTD and zstandard is None:
+            raise RuntimeError("zstd archives need zstandard: pip install 'sc2-bootstrap-discord[zstd]'")
+        self.directory = directory
+        self.fmt = fmt
+        self.level = level
+        self.keep_matches = keep_matches
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('starcraft_bot_controller')
+        os.makedirs(directory, exist_ok=True)
+        # One worker: archives are written in match order, never two at once
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-archive')
+        # Apply retention to whatever is already there
+        self._executor.submit(self.sweep)
+
+    def archive_path(self, match_id: int, tags: Dict[str, str]) -> str:
+        name = '.'.join([str(match_id), *archive_label(tags)])
+        return os.path.join(self.directory, f'{name}.log.{self.fmt}')
+
+    def submit(self, match_id: int, logs: List[MatchLog]) -> Future:
+        """Archive a match's logs on the worker thread, then sweep."""
+        return self._executor.submit(self._archive, match_id, logs)
+
+    def _archive(self, match_id: int, logs: List[MatchLog]) -> List[str]:
+        written = []
+        for log in logs:
+            dest = self.archive_path(match_id, log.tags)
+            try:
+                size = compress_log(log.path, dest, self.fmt, self.level)
+                if log.index_path and os.path.exists(log.index_path):
+                    os.replace(log.index_path, f'{dest}.idx')
+                os.remove(log.path)
+            except OSError as e:
+                self.logger.error(f"Failed to archive {log.path}: {e}")
+                continue
+            self.logger.info(f"Archived {log.path} to {dest} ({size} bytes)")
+            written.append(dest)
+        self.sweep()
+        return written
+
+    def matches(self) -> Dict[int, List[str]]:
+        """Archived files (with sidecars) by match id."""
+        found: Dict[int, List[str]] = {}
+        for path in glob.glob(os.path.join(self.directory, '*.log.*')):
+            name = ARCHIVE_NAME.match(os.path.basename(path))
+            if name:
+                found.setdefault(int(name.group(1)), []).append(path)
+        return found
+
+    def sweep(self) -> List[int]:
+        """Delete the oldest matches beyond ``keep_matches`` or ``max_bytes``; return their ids."""
+        matches = self.matches()
+        sizes = {match_id: sum(os.path.getsize(p) + self._sidecar_bytes(p) for p in paths)
+                 for match_id, paths in matches.items()}
+        total = sum(sizes.values())
+        removed = []
+        for match_id in sorted(matches):
+            over_count = self.keep_matches is not None and len(matches) - len(removed) > self.keep_matches
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            if not over_count and not over_size:
+                break
+            for path in matches[match_id]:
+                for victim in (path, f'{path}.idx', f'{path}.seek'):
+                    try:
+                        os.remove(victim)
+                    except FileNotFoundError:
+                        pass
+            total -= sizes[match_id]
+            removed.append(match_id)
+        if removed:
+            self.logger.info(f"Archive retention removed matches {removed}")
+        return removed
+
+    @staticmethod
+    def _sidecar_bytes(path: str) -> int:
+        return sum(os.path.getsize(p) for p in (f'{path}.idx', f'{path}.seek') if os.path.exists(p))
+
+    def log_excerpt(self, match_id: int, game_seconds: int, lines: int = 20,
+                    bot_name: str | None = None,
+                    controller: str | None = None) -> Optional[Tuple[str, List[str]]]:
+        """(path, lines) around a game time in an archived match, or None.
+
+        Prefers the log archived under ``controller`` and ``bot_name``, then any of ``bot_name``'s.
+        """
+        wanted = '.'.join(archive_label({'controller': controller, 'bot_name': bot_name}))
+
+        def rank(path: str) -> tuple:
+            label = ARCHIVE_NAME.match(os.path.basename(path)).group(2) or ''
+            return label != wanted, label.rpartition('.')[2] != bot_name
+
+        for path in sorted(self.matches().get(match_id, []), key=rank):
+            offset = find_archived_offset(f'{path}.idx', match_id, game_seconds)
+            if offset is None:
+                continue
+            # Read a window around the offset; blocks are decompressed individually
+            start = max(0, offset - 64 * 1024)
+            data = read_range(path, start, 256 * 1024 + offset - start)
+            return path, excerpt_lines(data, offset - start, game_seconds, lines)
+        return None
+
+    def close(self) -> None:
+        """Wait for pending archives and stop the worker."""
+        self._executor.shutdown(wait=True)
+
+
+def archive_label(tags: Dict[str, Optional[str]]) -> List[str]:
+    """The controller and bot name parts of an archive name, where known."""
+    return [tags[key] for key in ('controller', 'bot_name') if tags.get(key)]
+
+
+def find_archived_offset(index_path: str, match_id: int, game_seconds: int) -> Optional[int]:
+    """Binary-search an archived step index for a match's game time."""
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    usable = len(data) - len(data) % INDEX_RECORD.size
+    entries = [entry for entry in INDEX_RECORD.iter_unpack(data[:usable]) if entry[0] == match_id]
+    if not entries:
+        return None
+    position = bisect.bisect_right([entry[2] for entry in entries], game_seconds)
+    return entries[max(0, position - 1)][3]
@@ -3,20 +3,161 @@
 Command-line interface for SC2 Bootstrap Discord bot.
 """
 
+import argparse
 import asyncio
+import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 import discord
+from .farm import DEFAULT_PORT, FarmAgent
+from .ingest import ingest_to_gelf, ingest_to_npz
+from .log_monitor import LogMonitor
+from .results import ResultsStore
+from .scheduler import DEFAULT_PRIORITY, MAX_PRIORITY, MIN_PRIORITY, check_priority
 from .sc2_runner import Sc2Runner
+from .transports import transport_options_from_env
+from .workers import make_workers
+
+logger = logging.getLogger('starcraft_bot_controller')
+
+
+def ingest(args: argparse.Namespace) -> None:
+    """Reprocess finished logs into Graylog or per-match .npz files."""
+    if args.npz:
+        written = ingest_to_npz(args.paths, args.npz, workers=args.workers)
+        print(f"Wrote {len(written)} match files to {args.npz}")
+        return
+    host = args.host or os.getenv('GRAYLOG_HOST')
+    if not host:
+        print("Error: --host or GRAYLOG_HOST is required to send to Graylog (or use --npz)")
+        sys.exit(1)
+    gelf_transport = args.transport or os.getenv('GELF_TRANSPORT', 'udp')
+    sent = ingest_to_gelf(
+        args.paths, host, args.port or int(os.getenv('GRAYLOG_PORT', '12201')),
+        transport=gelf_transport, transport_options=transport_options_from_env(gelf_transport),
+        rate=args.rate, workers=args.workers, match_id=args.match
+    )
+    print(f"Sent {sent} records to {host}")
+
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    """Recompute the leaderboard from results.json."""
+    store = ResultsStore(args.results or os.getenv('RESULTS_PATH', 'results.json'),
+                         args.db or os.getenv('RESULTS_DB', 'results.db'))
+    try:
+        counted = store.rebuild_stats()
+    finally:
+        store.close()
+    print(f"Counted {counted} results")
+
+
+def worker_dirs() -> list | None:
+    """WORKER_DIRS as a list, or None for the current directory alone."""
+    return [d for d in os.getenv('WORKER_DIRS', '').split(',') if d] or None
+
+
+def match_executor_from_env() -> tuple:
+    """MATCH_EXECUTOR (compose, warm or docker) and its options.
+
+    warm: WARM_COMMAND and WARM_POOL_SIZE. docker: DOCKER_SERVICES (a JSON file) and DOCKER_SOCKET.
+    """
+    kind = os.getenv('MATCH_EXECUTOR', 'compose')
+    if kind == 'warm':
+        if not os.getenv('WARM_COMMAND'):
+            print("Error: MATCH_EXECUTOR=warm needs WARM_COMMAND, a command that starts an environment, "
+                  "prints 'ready' and then plays the match line it reads from stdin (local-bootstrap has none)")
+            sys.exit(1)
+        return kind, {'command': os.getenv('WARM_COMMAND'), 'size': int(os.getenv('WARM_POOL_SIZE', '1'))}
+    if kind == 'docker':
+        if not os.getenv('DOCKER_SERVICES'):
+            print("Error: MATCH_EXECUTOR=docker needs DOCKER_SERVICES")
+            sys.exit(1)
+        return kind, {'services': os.getenv('DOCKER_SERVICES'),
+                      'socket_path': os.getenv('DOCKER_SOCKET', '/var/run/docker.sock')}
+    return kind, None
+
+
+def farm_agent(args: argparse.Namespace) -> None:
+    """Play matches for a farm coordinator on this machine's workers."""
+    coordinator = args.coordinator or os.getenv('FARM_COORDINATOR')
+    if not coordinator:
+        print("Error: --coordinator or FARM_COORDINATOR (host[:port]) is required")
+        sys.exit(1)
+    host, _, port = coordinator.partition(':')
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sc2-io')
+    match_executor, executor_options = match_executor_from_env()
+    workers = make_workers(args.workers or worker_dirs(), args.compose_command or os.getenv('COMPOSE_COMMAND'),
+                           executor=executor, match_executor=match_executor, executor_options=executor_options)
+
+    async def run():
+        log_monitor = None
+        if os.getenv('GRAYLOG_HOST'):
+            # Log summaries go back with each result
+            gelf_transport = os.getenv('GELF_TRANSPORT', 'udp')
+            log_monitor = LogMonitor(os.getenv('LOG_FILE_PATH', 'logs/bot_controller*/**/stderr.log'),
+                                     os.getenv('GRAYLOG_HOST'), int(os.getenv('GRAYLOG_PORT', '12201')),
+                                     transport=gelf_transport,
+                                     transport_options=transport_options_from_env(gelf_transport))
+            await log_monitor.start()
+        agent = FarmAgent(host, int(port or DEFAULT_PORT), workers, name=args.name, log_monitor=log_monitor,
+                          token=args.token or os.getenv('FARM_TOKEN') or None)
+        logger.info(f"Farm agent {agent.name} with {len(workers)} workers, coordinator {host}:{agent.port}")
+        await agent.run()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='sc2-bootstrap-discord',
+                                     description='SC2 Bootstrap Discord bot (runs the bot without a command).')
+    commands = parser.add_subparsers(dest='command')
+    ingest_parser = commands.add_parser('ingest', help='Reprocess finished stderr.log files')
+    ingest_parser.add_argument('paths', nargs='+', help='log files to ingest')
+    ingest_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                               help='parser processes (default: one per core)')
+    ingest_parser.add_argument('--npz', metavar='DIR',
+                               help='write one .npz per match to DIR instead of sending to Graylog')
+    ingest_parser.add_argument('--rate', type=float, default=0,
+                               help='maximum records/second sent to Graylog (default: unlimited)')
+    ingest_parser.add_argument('--match', type=int, help='match id to tag the records with')
+    ingest_parser.add_argument('--host', help='Graylog host (default: GRAYLOG_HOST)')
+    ingest_parser.add_argument('--port', type=int, help='Graylog port (default: GRAYLOG_PORT)')
+    ingest_parser.add_argument('--transport', choices=['udp', 'tcp', 'http'],
+                               help='GELF transport (default: GELF_TRANSPORT)')
+    stats_parser = commands.add_parser('rebuild-stats', help='Recompute win rates and ratings from results.json')
+    stats_parser.add_argument('--results', help='results.json path (default: RESULTS_PATH)')
+    stats_parser.add_argument('--db', help='results database (default: RESULTS_DB)')
+    agent_parser = commands.add_parser('farm-agent', help="Play matches for a coordinator's farm")
+    agent_parser.add_argument('--coordinator', help='host[:port] (default: FARM_COORDINATOR)')
+    agent_parser.add_argument('--workers', nargs='+', help='local-bootstrap worker directories '
+                              '(default: WORKER_DIRS, or the current directory)')
+    agent_parser.add_argument('--name', help='agent name (default: host name)')
+    agent_parser.add_argument('--token', help="the coordinator's token (default: FARM_TOKEN)")
+    agent_parser.add_argument('--compose-command', help='default: COMPOSE_COMMAND')
+    return parser.parse_args(argv)
 
 
 def main():
     """Main CLI entry point."""
     # Load environment variables
     load_dotenv()
-    
+    args = parse_args()
+    if args.command == 'ingest':
+        ingest(args)
+        return
+    if args.command == 'rebuild-stats':
+        rebuild_stats(args)
+        return
+    if args.command == 'farm-agent':
+        farm_agent(args)
+        return
+
     # Check required environment variables
     required_vars = ['DISCORD_TOKEN', 'PLAYER1']
     missing_vars = [var for var in required_vars if not os.getenv(var)]
@@ -30,12 +171,65 @@ def main():
     intents = discord.Intents.default()
     intents.message_content = True
     
+    # GELF transport: udp (default), tcp or http, each with its own GELF_* settings
+    gelf_transport = os.getenv('GELF_TRANSPORT', 'udp')
+    # Duplicate rollup window in game steps (0 disables) and optional per-source rate limit;
+    # LOG_ECHO=1 also prints every bot log line to stdout
+    log_options = {'rollup_window': int(os.getenv('LOG_ROLLUP_WINDOW', '224')),
+                   'echo': os.getenv('LOG_ECHO', '') not in ('', '0')}
+    if os.getenv('LOG_RATE_LIMIT'):
+        log_options['rate_limit'] = float(os.getenv('LOG_RATE_LIMIT'))
+    if os.getenv('LOG_RATE_BURST'):
+        log_options['rate_burst'] = float(os.getenv('LOG_RATE_BURST'))
+    # Live slow-step alerts: p95 step time over SLOW_STEP_WINDOW steps above SLOW_STEP_MS
+    if os.getenv('SLOW_STEP_MS'):
+        log_options['slow_step_ms'] = int(os.getenv('SLOW_STEP_MS'))
+        log_options['slow_step_window'] = int(os.getenv('SLOW_STEP_WINDOW', '224'))
+        log_options['alert_interval'] = float(os.getenv('SLOW_STEP_ALERT_INTERVAL', '300'))
+
+    # Per-match log archive, opt-in with ARCHIVE_DIR, with retention by count and/or size
+    archive_options = None
+    if os.getenv('ARCHIVE_DIR'):
+        archive_options = {
+            'directory': os.getenv('ARCHIVE_DIR'),
+            'fmt': os.getenv('ARCHIVE_FORMAT', 'gz'),
+            'keep_matches': int(os.getenv('ARCHIVE_KEEP_MATCHES', '100')),
+        }
+        if os.getenv('ARCHIVE_MAX_MB'):
+            archive_options['max_bytes'] = int(os.getenv('ARCHIVE_MAX_MB')) * 1024 * 1024
+
+    # results.json is indexed into SQLite for reports and !history
+    results_options = {'results_path': os.getenv('RESULTS_PATH', 'results.json'),
+                       'db_path': os.getenv('RESULTS_DB', 'results.db')}
+
+    # compose, warm (environments started ahead of each match) or docker (Docker Engine API)
+    match_executor, executor_options = match_executor_from_env()
+
+    # Farm coordinator on FARM_HOST (default localhost; 0.0.0.0 for other machines), agents must send FARM_TOKEN
+    farm_options = None
+    if os.getenv('FARM_PORT'):
+        farm_options = {'host': os.getenv('FARM_HOST', '127.0.0.1'), 'port': int(os.getenv('FARM_PORT')),
+                        'token': os.getenv('FARM_TOKEN') or None}
+
     # Create the bot client
     client = Sc2Runner(
         bot_name=os.getenv('PLAYER1'),
         graylog_host=os.getenv('GRAYLOG_HOST'),
         graylog_port=int(os.getenv('GRAYLOG_PORT', '12201')),
-        log_file_path=os.getenv('LOG_FILE_PATH', 'logs/bot_controller1/TBone/stderr.log'),
+        log_file_path=os.getenv('LOG_FILE_PATH', 'logs/bot_controller*/**/stderr.log'),
+        gelf_transport=gelf_transport,
+        gelf_options=transport_options_from_env(gelf_transport),
+        log_options=log_options,
+        archive_options=archive_options,
+        results_options=results_options,
+        compose_command=os.getenv('COMPOSE_COMMAND'),
+        workers=worker_dirs(),
+        concurrency=int(os.getenv('MATCH_CONCURRENCY')) if os.getenv('MATCH_CONCURRENCY') else None,
+        farm_options=farm_options,
+        # '' keeps the queue in memory only
+        queue_journal=os.getenv('QUEUE_JOURNAL', 'queue.journal') or None,
+        match_executor=match_executor,
+        executor_options=executor_options,
         intents=intents
     )
     
@@ -52,17 +246,98 @@ def main():
         
         if message.content.startswith('!match'):
             _, *match_params = message.content.split()
+            priority = DEFAULT_PRIORITY
+            if '--priority' in match_params:
+                at = match_params.index('--priority')
+                try:
+                    priority = check_priority(int(match_params[at + 1]))
+                except (IndexError, ValueError):
+                    await message.channel.send(f'Priority is {MIN_PRIORITY} (first) to {MAX_PRIORITY} (last)')
+                    return
+                del match_params[at:at + 2]
+            if not match_params:
+                await message.channel.send('Usage: `!match <opponent> [map] [--priority 1-5]`')
+                return
             if len(match_params) == 2:
                 opponent, the_map = match_params
             else:
                 opponent = match_params[0]
                 the_map = "Acropolis"  # Default map
-            await message.channel.send(f'Queueing match against: {opponent} on map: {the_map}')
-            client.queue_match(opponent, the_map + 'AIE')
+            ticket = client.queue_match(opponent, the_map + 'AIE', priority, str(message.author))
+            await message.channel.send(f'Queueing match #{ticket} against: {opponent} on map: {the_map} '
+                                       f'(priority {priority}, {len(client.match_queue)} queued)')
+        elif message.content.startswith('!bump'):
+            _, *params = message.content.split()
+            try:
+                ticket = int(params[0].lstrip('#'))
+                priority = check_priority(int(params[1])) if len(params) > 1 else None
+            except (IndexError, ValueError):
+                await message.channel.send(f'Usage: `!bump <queued match #> [priority {MIN_PRIORITY}-{MAX_PRIORITY}]`')
+                return
+            await message.channel.send(client.bump_match(ticket, priority))
+        elif message.content.startswith('!cancel'):
+            _, *params = message.content.split()
+            try:
+                ticket = int(params[0].lstrip('#'))
+            except (IndexError, ValueError):
+                await message.channel.send('Usage: `!cancel <queued match #>`')
+                return
+            await message.channel.send(client.cancel_match(ticket))
+        elif message.content.startswith('!queue'):
+            await message.channel.send(client.queue_status())
+        elif message.content.startswith('!pause'):
+            client.pause()
+            await message.channel.send(f'Queue paused: {len(client.match_tasks)} running matches will finish, '
+                                       f'{len(client.match_queue)} stay queued. `!resume` to continue.')
+        elif message.content.startswith('!resume'):
+            client.resume()
+            await message.channel.send(f'Queue resumed: {len(client.match_queue)} queued.')
+        elif message.content.startswith('!drain'):
+            await message.channel.send(f'Draining: waiting for {len(client.match_tasks)} running matches; '
+                                       'nothing new will start.')
+            await client.drain()
+            await message.channel.send('Drained: no matches running. `!resume` to continue.')
+        elif message.content.startswith('!history'):
+            # !history [opponent] [map] [limit]; '*' skips a filter
+            _, *params = message.content.split()
+            limit = 10
+            if params and params[-1].isdigit():
+                limit = min(int(params.pop()), 50)
+            opponent, map_name = (params + [None, None])[:2]
+            await message.channel.send(await client.history(
+                None if opponent == '*' else opponent, None if map_name == '*' else map_name, limit))
+        elif message.content.startswith('!stats'):
+            _, *params = message.content.split()
+            await message.channel.send(await client.stats(params[0] if params else None))
+        elif message.content.split()[:2] == ['!maps', 'stats']:
+            await message.channel.send(await client.map_stats())
+        elif message.content.startswith('!farm'):
+            await message.channel.send(client.farm_status())
+        elif message.content.startswith('!logstats'):
+            await message.channel.send(client.log_stats())
+        elif message.content.startswith('!log'):
+            _, *log_params = message.content.split()
+            try:
+                match_id, game_time = int(log_params[0]), log_params[1]
+                lines = min(int(log_params[2]), 50) if len(log_params) > 2 else 20
+                await message.channel.send(await client.log_excerpt(match_id, game_time, lines))
+            except (IndexError, ValueError):
+                await message.channel.send('Usage: `!log <match> <mm:ss> [lines]`')
         elif message.content.startswith('!help'):
             help_text = """
 **SC2 Bootstrap Discord Bot Commands:**
-- `!match <opponent> [map]` - Queue a match against the specified opponent (optional map)
+- `!match <opponent> [map] [--priority 1-5]` - Queue a match against the specified opponent (optional map; 1 plays first, default 3)
+- `!queue` - Show queued matches in the order they will play
+- `!bump <#> [priority]` - Raise a queued match's priority (default: one level)
+- `!cancel <#>` - Take a match out of the queue
+- `!pause` / `!resume` - Stop / restart starting queued matches (running ones finish)
+- `!drain` - Pause and report once every running match has finished
+- `!log <match> <mm:ss> [lines]` - Show the bot's log around a game time
+- `!history [opponent] [map] [limit]` - Show recent results (`*` for any opponent)
+- `!stats [opponent]` - Win rates and Elo, by opponent and race or against one opponent by map
+- `!maps stats` - Win rates by map
+- `!logstats` - Show log pipeline throughput and stage timings
+- `!farm` - Show local workers and farm agents with their matches
 - `!help` - Show this help message
             """
             await message.channel.send(help_text)
@@ -0,0 +1,109 @@
+"""
+Notice the end of a match as it happens, not when docker-compose exits.
+
+local-bootstrap writes the result to ``results.json`` as soon as the game is
+over, and python-sc2 logs ``Result for player 1 - ...: Victory`` in each
+bot's log; stopping and removing the containers takes tens of seconds more.
+``CompletionWatcher`` is armed with the last result before a match starts and
+``wait`` returns at whichever comes first: a new last entry in results.json, a
+game-result log line, or the compose process exiting. ``result`` then waits
+for the new entry itself (the log line can beat it by a moment) for as long
+as the process is running.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor
+from typing import Optional, Tuple
+
+from .results import ResultsFile
+
+# How a match was seen to finish
+RESULTS = 'results'
+LOG = 'log'
+EXIT = 'exit'
+
+
+class CompletionWatcher:
+    """Waits for one match at a time to finish; reads results.json on ``executor``."""
+
+    def __init__(self, results_file: ResultsFile, poll_interval: float = 0.5,
+                 executor: Executor | None = None):
+        self.results_file = results_file
+        self.poll_interval = poll_interval
+        self.executor = executor
+        self._key: Tuple[int, int] | None = None
+        self._baseline: dict | None = None
+        self.entry: dict | None = None
+        # (player id, player, result) from the first game-result log line
+        self.game_result: Tuple[int, str, str] | None = None
+
+    def _stat_key(self) -> Tuple[int, int] | None:
+        try:
+            stat = os.stat(self.results_file.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def arm(self) -> None:
+        """Note the last result before a match starts (blocking; run it on the I/O pool)."""
+        self._key = self._stat_key()
+        self._baseline = self.results_file.last()
+        self.entry = None
+        self.game_result = None
+
+    def new_result(self) -> Optional[dict]:
+        """The last result if it is not the one armed with, else None (blocking).
+
+        Only a stat call until results.json changes.
+        """
+        if self.entry is not None:
+            return self.entry
+        key = self._stat_key()
+        if key is None or key == self._key:
+            return None
+        entry = self.results_file.last()
+        if entry is None:
+            # Caught mid-write; read again next time
+            return None
+        if entry == self._baseline:
+            # Rewritten with the same last result
+            self._key = key
+            return None
+        self.entry = entry
+        return entry
+
+    def log_result(self, player_id: int, player: str, result: str) -> None:
+        """``LogMonitor.on_game_result`` callback; the first line of a match wins."""
+        if self.game_result is None:
+            self.game_result = (player_id, player, result)
+
+    async def _poll(self) -> Optional[dict]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.new_result)
+
+    async def wait(self, process: asyncio.subprocess.Process) -> str:
+        """Return RESULTS, LOG or EXIT as soon as the match is seen to be over."""
+        exited = asyncio.ensure_future(process.wait())
+        try:
+            while True:
+                if await self._poll() is not None:
+                    return RESULTS
+                if self.game_result is not None:
+                    return LOG
+                done, _ = await asyncio.wait({exited}, timeout=self.poll_interval)
+                if done:
+                    return EXIT
+        finally:
+            # Only our waiter goes; the process carries on tearing down
+            exited.cancel()
+
+    async def result(self, process: asyncio.subprocess.Process) -> Optional[dict]:
+        """The match's results.json entry, or None if the process exits without writing one."""
+        while True:
+            running = process.returncode is None
+            entry = await self._poll()
+            if entry is not None or not running:
+                return entry
+            exited = asyncio.ensure_future(process.wait())
+            await asyncio.wait({exited}, timeout=self.poll_interval)
+            exited.cancel()
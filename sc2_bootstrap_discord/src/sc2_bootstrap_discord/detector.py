@@ -0,0 +1,134 @@
+"""
+Streaming slow-step detection for live matches.
+
+``StepTimeWindow`` keeps the step times of the last N game steps as a ring of
+histogram bucket indices plus per-bucket counts, so memory is fixed however
+long the game runs and a percentile is one walk over the buckets.
+``SlowStepDetector`` watches that percentile and raises one alert per incident
+(the percentile staying above the threshold), with a cooldown between alerts.
+"""
+
+import time
+from array import array
+from typing import Callable, NamedTuple, Optional
+
+from .parser import DebugRecord
+
+
+class SlowStepAlert(NamedTuple):
+    """A sustained step-time spike, as posted to Discord."""
+    match_id: Optional[int]
+    bot_name: Optional[str]
+    game_time: str
+    game_step: int
+    supply_used: int
+    supply_capacity: int
+    percentile: int
+    step_time_ms: int
+    threshold_ms: int
+    window_steps: int
+    source_file: str
+    line_number: int
+
+
+class StepTimeWindow:
+    """Step-time distribution of the last ``size`` steps in fixed-width buckets."""
+
+    def __init__(self, size: int = 224, bucket_ms: int = 5, max_ms: int = 2000):
+        self.size = size
+        self.bucket_ms = bucket_ms
+        # The last bucket collects everything at or above max_ms
+        self.last_bucket = max_ms // bucket_ms
+        self.counts = array('I', bytes(4 * (self.last_bucket + 1)))
+        self.ring = array('H', bytes(2 * size))
+        self.count = 0
+        self._next = 0
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def add(self, step_ms: int) -> None:
+        bucket = min(step_ms // self.bucket_ms, self.last_bucket)
+        if self.count == self.size:
+            self.counts[self.ring[self._next]] -= 1
+        else:
+            self.count += 1
+        self.ring[self._next] = bucket
+        self.counts[bucket] += 1
+        self._next = (self._next + 1) % self.size
+
+    def percentile(self, p: int) -> int:
+        """Nearest-rank percentile in ms (lower edge of its bucket)."""
+        if not self.count:
+            return 0
+        rank = -(-p * self.count // 100) or 1
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket * self.bucket_ms
+        return self.last_bucket * self.bucket_ms
+
+    def clear(self) -> None:
+        self.counts = array('I', bytes(len(self.counts) * 4))
+        self.count = 0
+        self._next = 0
+
+
+class SlowStepDetector:
+    """Flag when the step-time percentile over the window exceeds a threshold."""
+
+    def __init__(self, threshold_ms: int, window_steps: int = 224, percentile: int = 95,
+                 cooldown: float = 300.0, on_alert: Callable[[SlowStepAlert], None] | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold_ms = threshold_ms
+        self.percentile = percentile
+        # Minimum seconds between alerts, even across separate incidents
+        self.cooldown = cooldown
+        self.on_alert = on_alert
+        self.clock = clock
+        self.window = StepTimeWindow(window_steps)
+        self.in_incident = False
+        self.incidents = 0
+        self.alerts = 0
+        self._last_alert: float | None = None
+        self._last_step = -1
+
+    def add(self, record: DebugRecord, match_id: int | None = None,
+            bot_name: str | None = None) -> Optional[SlowStepAlert]:
+        """Feed a parsed line; return (and pass to ``on_alert``) a new alert, if any."""
+        step = record.game_step
+        if step == self._last_step:
+            # Every line of a step repeats the same step time
+            return None
+        if step < self._last_step:
+            # Step counter went backwards: a new match started
+            self.window.clear()
+            self.in_incident = False
+        self._last_step = step
+        window = self.window
+        window.add(record.step_length_ms)
+        if not window.full:
+            return None
+        value = window.percentile(self.percentile)
+        if value <= self.threshold_ms:
+            self.in_incident = False
+            return None
+        if self.in_incident:
+            return None
+        self.in_incident = True
+        self.incidents += 1
+        now = self.clock()
+        if self._last_alert is not None and now - self._last_alert < self.cooldown:
+            return None
+        self._last_alert = now
+        self.alerts += 1
+        alert = SlowStepAlert(
+            match_id, bot_name, record.game_time, step, record.supply_used,
+            record.supply_capacity, self.percentile, value, self.threshold_ms,
+            window.size, record.source_file, record.line_number
+        )
+        if self.on_alert is not None:
+            self.on_alert(alert)
+        return alert
@@ -0,0 +1,116 @@
+"""
+A small asyncio client for the Docker Engine API on its unix socket.
+
+Only what the docker match executor needs: create, start, wait for, kill,
+inspect and remove containers, and follow their output. The output of a
+container without a TTY arrives multiplexed. Each frame is an 8-byte header
+(stream: 1 stdout, 2 stderr; then the payload size, big-endian) followed by
+the payload. aiohttp comes with discord.py.
+"""
+
+from typing import Any, AsyncIterator, Tuple
+
+import aiohttp
+
+DOCKER_SOCKET = '/var/run/docker.sock'
+API_VERSION = 'v1.41'
+STDOUT = 1
+STDERR = 2
+
+
+class DockerError(Exception):
+    """An error reply from the Docker Engine."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f'{status}: {message}')
+        self.status = status
+
+
+class DockerClient:
+    """Docker Engine API calls over ``socket_path``; one session, opened on first use."""
+
+    def __init__(self, socket_path: str = DOCKER_SOCKET, api_version: str = API_VERSION):
+        self.socket_path = socket_path
+        self.api_version = api_version
+        self._session: aiohttp.ClientSession | None = None
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            # No overall timeout: waits and log streams last as long as a match
+            self._session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=self.socket_path),
+                                                  timeout=aiohttp.ClientTimeout(total=None))
+        return self._session
+
+    def _url(self, path: str) -> str:
+        # The host is ignored on a unix socket
+        return f'http://docker/{self.api_version}{path}'
+
+    async def _request(self, method: str, path: str, params: dict | None = None,
+                       json: dict | None = None) -> Any:
+        async with self.session().request(method, self._url(path), params=params, json=json) as response:
+            if response.status >= 400:
+                raise DockerError(response.status, await self._message(response))
+            if response.content_type == 'application/json':
+                return await response.json()
+            return None
+
+    @staticmethod
+    async def _message(response: aiohttp.ClientResponse) -> str:
+        text = await response.text()
+        if response.content_type == 'application/json':
+            try:
+                return (await response.json()).get('message', text)
+            except ValueError:
+                pass
+        return text.strip()
+
+    async def create(self, name: str, config: dict) -> str:
+        """Create container ``name`` from ``config``; returns its id."""
+        return (await self._request('POST', '/containers/create', {'name': name}, config))['Id']
+
+    async def start(self, container: str) -> None:
+        await self._request('POST', f'/containers/{container}/start')
+
+    async def wait(self, container: str) -> int:
+        """Wait for the container to stop; returns its exit code."""
+        return (await self._request('POST', f'/containers/{container}/wait'))['StatusCode']
+
+    async def inspect(self, container: str) -> dict:
+        return await self._request('GET', f'/containers/{container}/json')
+
+    async def kill(self, container: str, signal: str = 'SIGTERM') -> None:
+        """Signal the container; nothing happens if it is gone or not running."""
+        try:
+            await self._request('POST', f'/containers/{container}/kill', {'signal': signal})
+        except DockerError as e:
+            if e.status not in (404, 409):
+                raise
+
+    async def remove(self, container: str) -> None:
+        """Remove the container (stopping it first) with its anonymous volumes; fine if it is gone."""
+        try:
+            await self._request('DELETE', f'/containers/{container}', {'force': 'true', 'v': 'true'})
+        except DockerError as e:
+            if e.status != 404:
+                raise
+
+    async def logs(self, container: str) -> AsyncIterator[Tuple[int, bytes]]:
+        """(stream, bytes) of the container's output from the start, until it stops."""
+        params = {'follow': 'true', 'stdout': 'true', 'stderr': 'true'}
+        async with self.session().get(self._url(f'/containers/{container}/logs'), params=params) as response:
+            if response.status >= 400:
+                raise DockerError(response.status, await self._message(response))
+            content = response.content
+            while True:
+                try:
+                    header = await content.readexactly(8)
+                except (EOFError, aiohttp.ClientPayloadError):
+                    # The container stopped and the stream ended
+                    return
+                size = int.from_bytes(header[4:8], 'big')
+                yield header[0], await content.readexactly(size)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,100 @@
+"""
+Direct GELF encoding for per-line records, bypassing ``logging``.
+
+Going through ``logger.info`` costs a ``LogRecord`` (with caller lookup), an
+extra dict and graypy's generic serialisation for every bot log line. The
+fields that never change within a match - version, host, facility, source,
+match id and the file's tags - are serialised once into a cached JSON prefix;
+each line only appends its message, timestamp and parsed fields and closes
+the object. The result is the uncompressed GELF payload the transports send.
+"""
+
+import json
+import logging
+import socket
+import time
+from typing import Dict, Hashable, Mapping, Optional, Tuple
+
+from graypy.handler import SYSLOG_LEVELS
+
+# C implementation from the json module; ASCII output, so str.encode is a copy
+_quote = json.encoder.encode_basestring_ascii
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+# Cached prefixes before the cache is cleared (one per match and file)
+MAX_PREFIXES = 256
+
+
+def encode_value(value) -> str:
+    if type(value) is int:
+        return str(value)
+    if type(value) is str:
+        return _quote(value)
+    return _dumps(value)
+
+
+class GelfEmitter:
+    """Builds GELF payloads from a message and its extra fields."""
+
+    def __init__(self, facility: str = 'starcraft_bot_controller', source: str = 'sc2_test_runner',
+                 host: str | None = None, level: int = logging.INFO):
+        self.facility = facility
+        self.source = source
+        # Resolved once rather than per line
+        self.host = host or socket.gethostname()
+        self.level = SYSLOG_LEVELS.get(level, level)
+        self._prefixes: Dict[Tuple[Optional[int], Hashable], str] = {}
+        self._keys: Dict[str, str] = {}
+
+    def prefix(self, match_id: int | None, tags: Mapping[str, str] | None = None,
+               key: Hashable = None) -> str:
+        """Serialised static fields for one match and file (``key``), cached."""
+        cache_key = (match_id, key)
+        prefix = self._prefixes.get(cache_key)
+        if prefix is None:
+            static = {
+                'version': '1.1',
+                'host': self.host,
+                'level': self.level,
+                'facility': self.facility,
+                '_match': match_id,
+                '_source': self.source,
+                '_host': self.host,
+            }
+            for name, value in (tags or {}).items():
+                static[f'_{name}'] = value
+            if len(self._prefixes) >= MAX_PREFIXES:
+                self._prefixes.clear()
+            # Drop the closing brace; per-line fields follow
+            prefix = self._prefixes[cache_key] = _dumps(static)[:-1]
+        return prefix
+
+    def _key(self, name: str) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            key = self._keys[name] = f',{_quote("_" + name)}:'
+        return key
+
+    def encode(self, prefix: str, message: str, fields: Mapping[str, object],
+               timestamp: float | None = None) -> bytes:
+        """One GELF payload: ``prefix`` plus the message, timestamp and ``fields``."""
+        parts = [prefix, ',"short_message":', _quote(message), ',"timestamp":',
+                 repr(time.time() if timestamp is None else timestamp)]
+        keys = self._keys
+        for name, value in fields.items():
+            parts.append(keys.get(name) or self._key(name))
+            parts.append(str(value) if type(value) is int else encode_value(value))
+        parts.append('}')
+        return ''.join(parts).encode()
+
+
+def decode_record(payload: bytes, name: str = 'starcraft_bot_controller') -> logging.LogRecord:
+    """A ``LogRecord`` equivalent to an encoded payload, for echoing to non-GELF handlers."""
+    gelf = json.loads(payload)
+    attributes = {key[1:]: value for key, value in gelf.items() if key.startswith('_')}
+    attributes.update({
+        'name': name, 'msg': gelf['short_message'], 'levelno': logging.INFO,
+        'levelname': 'INFO', 'created': gelf['timestamp'],
+    })
+    record = logging.makeLogRecord(attributes)
+    record.msecs = (record.created - int(record.created)) * 1000
+    return record
@@ -0,0 +1,440 @@
+"""
+How a worker runs a match: the executor behind ``Worker.launch``.
+
+An executor starts the match written to the worker's ``matches`` file and
+returns a process-like handle: ``wait()`` and ``returncode`` as on an asyncio
+subprocess (all ``CompletionWatcher`` needs), and ``terminate()`` to stop it
+early. ``teardown`` waits until a finished match's environment is gone.
+``start`` and ``close`` bracket the executor's life.
+
+- ``compose`` (``ComposeExecutor``, the default) runs the worker's compose
+  command for every match, so containers are created and SC2 starts from
+  scratch each time.
+- ``warm`` (``WarmPoolExecutor``, experimental) keeps ``size`` environments
+  started ahead of time and hands the next match to one that is ready.
+  local-bootstrap has no such mode yet: the ``command`` is up to the user, and
+  there is no default. A replacement starts
+  warming up while the match plays. Its ``command`` (``{project}`` is a fresh
+  compose project name per environment) must create its containers and start
+  SC2, print a line ``ready``, then read the match line from stdin and play
+  it. End of input before a match means shut down without playing.
+- ``docker`` (``DockerExecutor``) creates and starts the match's containers
+  itself over the Docker Engine API (docker_api.py). ``services`` lists them in
+  start order, each a name and a container create body; ``{project}``,
+  ``{directory}`` (the worker's, absolute), ``{bot1}``, ``{bot2}`` and
+  ``{map}`` in its strings are filled in. Each container's stdout and stderr
+  go straight to ``log_monitor`` as they arrive, under
+  ``<directory>/docker/<container>/<stream>`` so they take the worker's match.
+  The handle (``DockerMatch``) shows every container's state, exit code and
+  timings. It exits once all the containers have, like ``docker-compose up``,
+  with the first non-zero exit code.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+from .docker_api import API_VERSION, DOCKER_SOCKET, STDERR, STDOUT, DockerClient, DockerError
+
+logger = logging.getLogger(__name__)
+
+# What a warm environment prints once it can take a match
+READY = b'ready'
+# Seconds an idle warm environment gets to exit at close before it is killed
+CLOSE_TIMEOUT = 30.0
+
+
+class MatchExecutor:
+    """Runs ``worker``'s matches, one at a time."""
+
+    def __init__(self, worker: Any):
+        self.worker = worker
+        # Set by the runner; executors that stream container output ship it here
+        self.log_monitor: Any = None
+
+    async def start(self) -> None:
+        """Get ready ahead of the first match."""
+
+    async def launch(self, match_string: str) -> Any:
+        """Start the match ``match_string``; returns its process-like handle."""
+        raise NotImplementedError
+
+    async def teardown(self, process: Any) -> None:
+        """Wait until a finished (or terminated) match's environment is gone."""
+        await process.wait()
+
+    async def close(self) -> None:
+        """Stop anything started ahead of a match."""
+
+    def status(self) -> str:
+        """A few words for ``!farm``; empty if there is nothing to say."""
+        return ''
+
+
+class ComposeExecutor(MatchExecutor):
+    """docker-compose up from scratch for every match."""
+
+    async def launch(self, match_string: str) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_shell(self.worker.compose_command, shell=True,
+                                                     executable='/bin/bash', cwd=self.worker.directory)
+
+    async def teardown(self, process: asyncio.subprocess.Process) -> None:
+        await process.communicate()
+
+
+class WarmPoolExecutor(MatchExecutor):
+    """Keeps ``size`` environments started ahead, each playing one match and then replaced.
+
+    Experimental: ``command`` must speak the ``ready``/stdin protocol, which
+    local-bootstrap itself does not.
+    """
+
+    def __init__(self, worker: Any, command: str | None = None, size: int = 1, ready_timeout: float = 600.0):
+        super().__init__(worker)
+        if not command:
+            raise ValueError('The warm executor needs a command (WARM_COMMAND) that starts an environment, '
+                             'prints "ready" and then plays the match line it reads from stdin')
+        if size < 1:
+            raise ValueError(f'A warm pool needs at least one environment, not {size}')
+        self.command = command
+        self.size = size
+        self.ready_timeout = ready_timeout
+        # Environments warming up or ready, oldest first
+        self.pool: Deque[asyncio.Task] = deque()
+        self.serial = 0
+        # Matches handed to a ready environment, and those that waited for one to warm up
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.failures = 0
+        # Each environment's output, copied to ours until it exits
+        self._output: Dict[Any, asyncio.Task[None]] = {}
+
+    @property
+    def ready(self) -> int:
+        """Environments that could take a match right now."""
+        return sum(1 for task in self.pool if task.done() and not task.cancelled()
+                   and task.exception() is None and task.result().returncode is None)
+
+    async def start(self) -> None:
+        self._fill()
+
+    def _fill(self) -> None:
+        while len(self.pool) < self.size:
+            self.serial += 1
+            self.pool.append(asyncio.create_task(self._warm_up(f'{self.worker.name}_{self.serial}')))
+
+    async def _warm_up(self, project: str) -> asyncio.subprocess.Process:
+        """Start one environment and wait for its ``ready`` line."""
+        process = await asyncio.create_subprocess_shell(
+            # Only {project} is filled in; other braces (${VAR}, JSON) are the shell's
+            self.command.replace('{project}', project), executable='/bin/bash', cwd=self.worker.directory,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        try:
+            await asyncio.wait_for(self._until_ready(process), self.ready_timeout)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+            raise
+        self._output[process] = asyncio.create_task(self._forward(process))
+        return process
+
+    async def _until_ready(self, process: asyncio.subprocess.Process) -> None:
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                raise RuntimeError(f'Warm environment exited with {await process.wait()} before it was ready')
+            if line.strip() == READY:
+                return
+            sys.stdout.write(line.decode('utf-8', 'replace'))
+
+    async def _forward(self, process: asyncio.subprocess.Process) -> None:
+        while line := await process.stdout.readline():
+            sys.stdout.write(line.decode('utf-8', 'replace'))
+
+    async def launch(self, match_string: str) -> asyncio.subprocess.Process:
+        """Hand the match to the oldest environment, waiting for it if none is ready yet."""
+        for _ in range(self.size + 1):
+            self._fill()
+            task = self.pool.popleft()
+            warm = task.done()
+            # Its replacement warms up while this match plays
+            self._fill()
+            try:
+                process = await task
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f'Warm environment for {self.worker.name} failed: {e!r}')
+                continue
+            if process.returncode is not None:
+                # Died while idle
+                self.failures += 1
+                continue
+            try:
+                process.stdin.write(match_string.encode('utf-8') + b'\n')
+                await process.stdin.drain()
+                process.stdin.close()
+            except ConnectionError as e:
+                self.failures += 1
+                logger.warning(f'Warm environment for {self.worker.name} went away: {e!r}')
+                continue
+            if warm:
+                self.warm_starts += 1
+            else:
+                self.cold_starts += 1
+            return process
+        raise RuntimeError(f'No warm environment could be started for {self.worker.name}')
+
+    async def teardown(self, process: asyncio.subprocess.Process) -> None:
+        await process.wait()
+        output = self._output.pop(process, None)
+        if output is not None:
+            await output
+
+    async def close(self) -> None:
+        """Stop environments still warming up; tell ready ones to exit (end of input)."""
+        pool, self.pool = list(self.pool), deque()
+        for task in pool:
+            if not task.done():
+                task.cancel()
+        for task in pool:
+            try:
+                process = await task
+            except (asyncio.CancelledError, Exception):
+                continue
+            if process.returncode is None:
+                process.stdin.close()
+                try:
+                    await asyncio.wait_for(process.wait(), CLOSE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    process.kill()
+            await self.teardown(process)
+
+    def status(self) -> str:
+        return (f'{self.ready}/{self.size} warm, {self.warm_starts} warm starts, '
+                f'{self.cold_starts} waited, {self.failures} failed')
+
+
+class Container:
+    """One container of a match: what it is, its state and when things happened (monotonic)."""
+
+    def __init__(self, service: str, name: str, tags: Dict[str, str] | None = None):
+        self.service = service
+        self.name = name
+        self.tags = tags or {}
+        self.id: str | None = None
+        self.created: float | None = None
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.exit_code: int | None = None
+        self.lines = 0
+        self.error: str | None = None
+
+    @property
+    def state(self) -> str:
+        if self.error is not None:
+            return 'failed'
+        if self.exit_code is not None:
+            return 'exited'
+        return 'running' if self.started is not None else 'created'
+
+    def timings(self) -> dict:
+        """Exit code, seconds to start and seconds run, and lines of output."""
+        return {'state': self.state, 'exit_code': self.exit_code,
+                'start_s': round(self.started - self.created, 3) if self.started else None,
+                'run_s': round((self.finished or time.monotonic()) - self.started, 3) if self.started else None,
+                'lines': self.lines}
+
+    def describe(self) -> str:
+        timings = self.timings()
+        if self.state == 'exited':
+            return f"{self.service} exited {self.exit_code} after {timings['run_s']:.1f}s ({self.lines} lines)"
+        if self.state == 'running':
+            return f"{self.service} running {timings['run_s']:.1f}s ({self.lines} lines)"
+        return f'{self.service} {self.state}'
+
+
+class DockerMatch:
+    """A match's containers, as a process-like handle: ``wait``, ``returncode``, ``terminate``."""
+
+    def __init__(self, client: DockerClient):
+        self.client = client
+        self.containers: List[Container] = []
+        self.returncode: int | None = None
+        self.launched = time.monotonic()
+        self.tasks: List[asyncio.Task] = []
+        self._done = asyncio.Event()
+
+    async def wait(self) -> int:
+        await self._done.wait()
+        return self.returncode
+
+    def _exited(self) -> None:
+        """Called once every container has stopped."""
+        codes = [container.exit_code for container in self.containers]
+        self.returncode = next((code for code in codes if code), 0)
+        self._done.set()
+
+    def terminate(self) -> None:
+        """Stop every container that is still running."""
+        for container in self.containers:
+            if container.id is not None and container.state == 'running':
+                self.tasks.append(asyncio.create_task(self.client.kill(container.id)))
+
+    kill = terminate
+
+    def timings(self) -> Dict[str, dict]:
+        """Each container's ``Container.timings``, by service."""
+        return {container.service: container.timings() for container in self.containers}
+
+    def describe(self) -> str:
+        return ', '.join(container.describe() for container in self.containers)
+
+
+class DockerExecutor(MatchExecutor):
+    """Runs the match's containers over the Docker Engine API and streams their output to the log monitor."""
+
+    def __init__(self, worker: Any, services: List[dict] | str, socket_path: str = DOCKER_SOCKET,
+                 api_version: str = API_VERSION):
+        super().__init__(worker)
+        if isinstance(services, str):
+            # A JSON file holding the list
+            with open(services) as f:
+                services = json.load(f)
+        if not services:
+            raise ValueError('The docker executor needs at least one service')
+        self.services = services
+        self.client = DockerClient(socket_path, api_version)
+        # The match being played, or the last one
+        self.current: DockerMatch | None = None
+
+    def _values(self, match_string: str) -> Dict[str, str]:
+        values = {'project': self.worker.name, 'directory': os.path.abspath(self.worker.directory)}
+        fields = match_string.strip().split(',')
+        if len(fields) == 9:
+            values.update(bot1=fields[1], bot2=fields[5], map=fields[8])
+        return values
+
+    async def _create(self, name: str, config: dict) -> str:
+        try:
+            return await self.client.create(name, config)
+        except DockerError as e:
+            if e.status != 409:
+                raise
+        # Left over from a crash
+        await self.client.remove(name)
+        return await self.client.create(name, config)
+
+    async def launch(self, match_string: str) -> DockerMatch:
+        values = self._values(match_string)
+        run = DockerMatch(self.client)
+        try:
+            for service in self.services:
+                container = Container(service['name'], f"{self.worker.name}-{service['name']}",
+                                      fill(service.get('tags'), values))
+                container.created = time.monotonic()
+                config = dict(fill(service.get('config', {}), values), Tty=False,
+                              AttachStdout=True, AttachStderr=True)
+                container.id = await self._create(container.name, config)
+                run.containers.append(container)
+            for container in run.containers:
+                await self.client.start(container.id)
+                container.started = time.monotonic()
+                run.tasks.append(asyncio.create_task(self._follow(container)))
+        except Exception:
+            await self._remove(run)
+            raise
+        run.tasks.append(asyncio.create_task(self._wait(run)))
+        self.current = run
+        return run
+
+    async def _wait(self, run: DockerMatch) -> None:
+        async def wait(container: Container) -> None:
+            try:
+                container.exit_code = await self.client.wait(container.id)
+            except (DockerError, OSError) as e:
+                container.error = repr(e)
+                container.exit_code = 1
+            container.finished = time.monotonic()
+        await asyncio.gather(*(wait(container) for container in run.containers))
+        run._exited()
+
+    async def _follow(self, container: Container) -> None:
+        """Split the container's output into lines and hand them to the log monitor as they arrive."""
+        directory = os.path.abspath(self.worker.directory)
+        names = {STDOUT: os.path.join(directory, 'docker', container.name, 'stdout'),
+                 STDERR: os.path.join(directory, 'docker', container.name, 'stderr')}
+        partial = {STDOUT: b'', STDERR: b''}
+        try:
+            async for stream, data in self.client.logs(container.id):
+                stream = stream if stream in names else STDOUT
+                *lines, partial[stream] = (partial[stream] + data).split(b'\n')
+                if lines:
+                    self._ship(container, names[stream], lines)
+        except (DockerError, OSError) as e:
+            logger.warning(f'Lost the output of {container.name}: {e!r}')
+        for stream, rest in partial.items():
+            if rest:
+                self._ship(container, names[stream], [rest])
+            if self.log_monitor is not None:
+                self.log_monitor.end_stream(names[stream])
+
+    def _ship(self, container: Container, name: str, lines: List[bytes]) -> None:
+        container.lines += len(lines)
+        text = [line.decode('utf-8', 'replace') for line in lines]
+        if self.log_monitor is not None:
+            self.log_monitor.feed(name, text, container.tags)
+        else:
+            # Where docker-compose would have printed it
+            sys.stdout.write(''.join(f'{container.name} | {line}\n' for line in text))
+
+    async def _remove(self, run: DockerMatch) -> None:
+        for container in run.containers:
+            if container.id is not None:
+                try:
+                    await self.client.remove(container.id)
+                except (DockerError, OSError) as e:
+                    logger.warning(f'Could not remove {container.name}: {e!r}')
+
+    async def teardown(self, run: DockerMatch) -> None:
+        """Wait for the containers and their output, log the timings, then remove them."""
+        await run.wait()
+        await asyncio.gather(*run.tasks, return_exceptions=True)
+        logger.info(f'{self.worker.name}: {run.describe()}')
+        await self._remove(run)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def status(self) -> str:
+        return self.current.describe() if self.current is not None else 'docker, no match yet'
+
+
+def fill(value: Any, values: Dict[str, str]) -> Any:
+    """``value`` with ``{key}`` replaced in every string, through lists and dicts."""
+    if isinstance(value, str):
+        for key, replacement in values.items():
+            value = value.replace('{' + key + '}', replacement)
+        return value
+    if isinstance(value, list):
+        return [fill(item, values) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, values) for key, item in value.items()}
+    return value
+
+
+EXECUTORS = {'compose': ComposeExecutor, 'warm': WarmPoolExecutor, 'docker': DockerExecutor}
+
+
+def make_executor(kind: str, worker: Any, **options) -> MatchExecutor:
+    """The ``kind`` executor (compose, warm or docker) for ``worker``."""
+    try:
+        executor_type = EXECUTORS[kind]
+    except KeyError:
+        raise ValueError(f'Unknown match executor {kind!r}; choose from {", ".join(EXECUTORS)}') from None
+    return executor_type(worker, **options)
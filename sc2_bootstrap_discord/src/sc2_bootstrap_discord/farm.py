@@ -0,0 +1,365 @@
+"""
+A match farm: ``Sc2Runner`` coordinates, agents on other machines play.
+
+Agents connect to the coordinator over TCP and speak newline-delimited JSON:
+
+- agent -> coordinator: ``register`` (name, capacity, token), ``heartbeat`` (the
+  match ids it is playing), ``result`` (match id, results.json entry or
+  None, log summary, error)
+- coordinator -> agent: ``welcome`` (heartbeat interval), ``job`` (match id
+  and the ``SC2Match`` fields)
+
+The coordinator hands each job to the agent with the most free slots. A job
+carries the match id the runner gave it, so however often it is replayed, its
+result merges in at the same place. When an agent disconnects, or stays silent
+for ``heartbeat_timeout`` seconds, its jobs go back to the front of the queue
+for the next free agent. An agent plays jobs on its own local-bootstrap
+``Worker`` directories, the same way ``Sc2Runner`` does locally.
+
+The coordinator listens on localhost unless given another host. When it has a
+``token``, agents must register with the same one.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import socket
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from .workers import SC2Match, Worker, bot_exe_type, match_string
+
+DEFAULT_PORT = 8765
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 15.0
+# Largest message line; results.json entries are a few KB
+LINE_LIMIT = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+class AgentLost(Exception):
+    pass
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+class FarmJob:
+    __slots__ = ('match_id', 'match', 'future', 'agent', 'attempts')
+
+    def __init__(self, match_id: int, match: Any, future: asyncio.Future):
+        self.match_id = match_id
+        self.match = match
+        self.future = future
+        self.agent: Optional['AgentConnection'] = None
+        self.attempts = 0
+
+
+class AgentConnection:
+    """The coordinator's view of one registered agent."""
+
+    def __init__(self, name: str, capacity: int, writer: asyncio.StreamWriter):
+        self.name = name
+        self.capacity = capacity
+        self.writer = writer
+        self.jobs: Dict[int, FarmJob] = {}
+        self.last_seen = time.monotonic()
+        self.completed = 0
+
+    @property
+    def free(self) -> int:
+        return self.capacity - len(self.jobs)
+
+    def send(self, message: dict) -> None:
+        self.writer.write(encode(message))
+
+
+class FarmCoordinator:
+    """Accepts agents and runs jobs on them; ``run`` returns a job's result message."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT, token: str | None = None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.agents: Dict[str, AgentConnection] = {}
+        self.pending: Deque[FarmJob] = deque()
+        # Slots promised to matches on their way to submit()
+        self.reserved = 0
+        self.requeued = 0
+        self.server: asyncio.AbstractServer | None = None
+        self.watch_task: asyncio.Task[None] | None = None
+        self._handlers: Set[asyncio.Task] = set()
+        # Called when an agent registers or finishes a job, i.e. free_capacity() may have grown
+        self.on_free: Callable[[], None] | None = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=LINE_LIMIT)
+        # With port 0 the system picks one
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.watch_task = asyncio.get_running_loop().create_task(self._watch())
+        logger.info(f"Farm coordinator listening on {self.host}:{self.port}")
+
+    def free_capacity(self) -> int:
+        """Slots on connected agents not yet spoken for by running, waiting or reserved jobs."""
+        return sum(agent.free for agent in self.agents.values()) - len(self.pending) - self.reserved
+
+    def reserve(self) -> None:
+        """Hold a slot for a match that is about to be submitted."""
+        self.reserved += 1
+
+    def release(self) -> None:
+        """Give back a reserved slot."""
+        self.reserved = max(self.reserved - 1, 0)
+
+    def submit(self, match_id: int, match: Any, reserved: bool = False) -> asyncio.Future:
+        """Queue ``match`` for an agent (taking over its reserved slot); the future gets its result."""
+        if reserved:
+            self.release()
+        job = FarmJob(match_id, match, asyncio.get_running_loop().create_future())
+        self.pending.append(job)
+        self._dispatch()
+        return job.future
+
+    async def run(self, match_id: int, match: Any, reserved: bool = False) -> dict:
+        """Play ``match`` on some agent; returns its ``result`` message (with ``agent``)."""
+        return await self.submit(match_id, match, reserved)
+
+    def _dispatch(self) -> None:
+        while self.pending:
+            agent = max(self.agents.values(), key=lambda a: a.free, default=None)
+            if agent is None or agent.free <= 0:
+                return
+            job = self.pending.popleft()
+            if job.future.done():
+                continue
+            job.agent = agent
+            job.attempts += 1
+            agent.jobs[job.match_id] = job
+            agent.send({'type': 'job', 'match_id': job.match_id, 'match': list(job.match)})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers.add(asyncio.current_task())
+        agent = None
+        try:
+            hello = json.loads(await reader.readline() or b'null')
+            if not isinstance(hello, dict) or hello.get('type') != 'register':
+                return
+            if self.token and not hmac.compare_digest(str(hello.get('token', '')), self.token):
+                logger.warning(f"Farm agent {writer.get_extra_info('peername')} rejected: wrong token")
+                return
+            name = str(hello.get('name') or writer.get_extra_info('peername'))
+            if name in self.agents:
+                # Re-registered after a reconnect: the old connection is gone
+                self._lost(self.agents[name])
+            agent = self.agents[name] = AgentConnection(name, max(int(hello.get('capacity', 1)), 0), writer)
+            agent.send({'type': 'welcome', 'heartbeat_interval': self.heartbeat_interval})
+            logger.info(f"Farm agent {name} registered with capacity {agent.capacity}")
+            self._dispatch()
+            self._freed()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                agent.last_seen = time.monotonic()
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    logger.warning(f"Skipped farm message from {agent.name}: {line[:200]!r}")
+                    continue
+                if message.get('type') == 'result':
+                    self._result(agent, message)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Farm agent connection failed: {e!r}")
+        finally:
+            if agent is not None and self.agents.get(agent.name) is agent:
+                self._lost(agent)
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+    def _result(self, agent: AgentConnection, message: dict) -> None:
+        job = agent.jobs.pop(message.get('match_id'), None)
+        if job is None:
+            return
+        agent.completed += 1
+        message['agent'] = agent.name
+        if not job.future.done():
+            job.future.set_result(message)
+        self._dispatch()
+        self._freed()
+
+    def _freed(self) -> None:
+        if self.on_free is not None:
+            self.on_free()
+
+    def _lost(self, agent: AgentConnection) -> None:
+        """Drop an agent and put its jobs back at the front of the queue."""
+        if self.agents.get(agent.name) is agent:
+            del self.agents[agent.name]
+        jobs = list(agent.jobs.values())
+        agent.jobs.clear()
+        for job in reversed(jobs):
+            job.agent = None
+            self.pending.appendleft(job)
+        self.requeued += len(jobs)
+        agent.writer.close()
+        logger.warning(f"Farm agent {agent.name} lost; requeued matches {[job.match_id for job in jobs]}")
+        self._dispatch()
+
+    async def _watch(self) -> None:
+        """Drop agents whose heartbeats stopped."""
+        while True:
+            await asyncio.sleep(self.heartbeat_timeout / 3)
+            now = time.monotonic()
+            for agent in list(self.agents.values()):
+                if now - agent.last_seen > self.heartbeat_timeout:
+                    self._lost(agent)
+
+    def status(self) -> List[dict]:
+        return [{'name': agent.name, 'capacity': agent.capacity, 'running': sorted(agent.jobs),
+                 'completed': agent.completed} for agent in self.agents.values()]
+
+    async def close(self) -> None:
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+        if self.server is not None:
+            self.server.close()
+        agents = list(self.agents.values())
+        # Forget the agents first so their handlers end without requeueing
+        self.agents.clear()
+        for agent in agents:
+            agent.writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        for job in self.pending:
+            if not job.future.done():
+                job.future.set_exception(AgentLost('coordinator closed'))
+
+
+class FarmAgent:
+    """Plays the coordinator's jobs on local workers and reports back."""
+
+    def __init__(self, host: str, port: int, workers: List[Worker], name: str | None = None,
+                 log_monitor=None, reconnect_interval: float = 5.0, token: str | None = None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.workers = workers
+        self.name = name or socket.gethostname()
+        self.log_monitor = log_monitor
+        self.reconnect_interval = reconnect_interval
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.writer: asyncio.StreamWriter | None = None
+        self.jobs: Set[asyncio.Task] = set()
+        if log_monitor is not None:
+            log_monitor.on_game_result = self._on_game_result
+        for worker in workers:
+            worker.match_executor.log_monitor = log_monitor
+
+    def _on_game_result(self, match_id: int | None, player_id: int, player: str, result: str) -> None:
+        for worker in self.workers:
+            if worker.busy and worker.match_id == match_id:
+                worker.completion.log_result(player_id, player, result)
+
+    def _send(self, message: dict) -> None:
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(encode(message))
+
+    async def run(self) -> None:
+        """Stay connected to the coordinator, reconnecting when the connection drops."""
+        for worker in self.workers:
+            await worker.match_executor.start()
+        try:
+            while True:
+                try:
+                    await self.serve()
+                except (ConnectionError, OSError) as e:
+                    logger.warning(f"Farm coordinator {self.host}:{self.port} unreachable: {e!r}")
+                await asyncio.sleep(self.reconnect_interval)
+        finally:
+            for worker in self.workers:
+                await worker.match_executor.close()
+
+    async def serve(self) -> None:
+        """One connection: register, then play jobs until the coordinator goes away."""
+        reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+        heartbeat = None
+        try:
+            register = {'type': 'register', 'name': self.name, 'capacity': len(self.workers)}
+            if self.token:
+                register['token'] = self.token
+            self._send(register)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                try:
+                    message = json.loads(line)
+                    if message.get('type') == 'welcome':
+                        self.heartbeat_interval = message.get('heartbeat_interval', self.heartbeat_interval)
+                        if heartbeat is None:
+                            heartbeat = asyncio.create_task(self._heartbeat())
+                    elif message.get('type') == 'job':
+                        task = asyncio.create_task(self._play(message['match_id'], message['match']))
+                        self.jobs.add(task)
+                        task.add_done_callback(self.jobs.discard)
+                except (ValueError, KeyError, AttributeError) as e:
+                    # One bad message should not cost the jobs already running
+                    logger.warning(f"Skipped farm message {line[:200]!r}: {e!r}")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            # The coordinator has requeued whatever is still running here
+            for task in list(self.jobs):
+                task.cancel()
+            self.writer.close()
+            self.writer = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._send({'type': 'heartbeat', 'running': [w.match_id for w in self.workers if w.busy]})
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _play(self, match_id: int, fields: list) -> None:
+        match = SC2Match(*fields)
+        worker = next((w for w in self.workers if not w.busy), None)
+        if worker is None:
+            self._send({'type': 'result', 'match_id': match_id, 'entry': None, 'error': 'no free worker'})
+            return
+        worker.match, worker.match_id = match, match_id
+        reply = {'type': 'result', 'match_id': match_id, 'entry': None, 'worker': worker.name}
+        loop = asyncio.get_running_loop()
+        process = None
+        try:
+            bot_type = await loop.run_in_executor(worker.completion.executor, bot_exe_type, match.bot2)
+            await loop.run_in_executor(worker.completion.executor, worker.write_matches_file,
+                                       match_string(match, bot_type))
+            await worker.wait_teardown()
+            if self.log_monitor:
+                await self.log_monitor.set_match(match_id, worker.log_directory)
+            started = time.monotonic()
+            process = await worker.launch(match_string(match, bot_type))
+            await worker.completion.wait(process)
+            reply['entry'] = await worker.completion.result(process)
+            reply['seconds'] = round(time.monotonic() - started, 1)
+            worker.teardown_task = asyncio.create_task(worker.teardown(process))
+            if self.log_monitor:
+                reply['summary'] = self.log_monitor.match_summary(match_id, match.bot1)
+        except asyncio.CancelledError:
+            if process is not None and process.returncode is None:
+                # docker-compose stops the containers on SIGTERM
+                process.terminate()
+                worker.teardown_task = asyncio.create_task(worker.teardown(process))
+            raise
+        except Exception as e:
+            reply['error'] = repr(e)
+        finally:
+            worker.match = None
+        self._send(reply)
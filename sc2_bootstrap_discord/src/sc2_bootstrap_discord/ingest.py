@@ -0,0 +1,243 @@
+"""
+Offline bulk ingestion of finished ``stderr.log`` files.
+
+Each file is split into byte ranges that start and end on line boundaries,
+and the ranges are parsed on a process pool with the same parser as
+``LogMonitor``. Results either go to Graylog, sent by the workers themselves
+at a capped total rate, or to one columnar ``.npz`` file per match. A match
+boundary is where the game step goes backwards, just as in the live rollup.
+
+``.npz`` output needs numpy (``pip install sc2-bootstrap-discord[ingest]``).
+"""
+
+import logging
+import os
+import socket
+import time
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .log_monitor import record_fields, source_tags
+from .parser import DebugRecord, parse_debug_line
+from .transports import UDP, GelfTransportHandler, make_transport
+
+DEFAULT_RANGE_SIZE = 64 * 1024 * 1024
+SEND_BATCH_SIZE = 500
+
+ByteRange = Tuple[str, int, int]
+
+
+def line_ranges(path: str, range_size: int = DEFAULT_RANGE_SIZE) -> List[ByteRange]:
+    """Split a file into (path, start, end) ranges of about ``range_size`` bytes.
+
+    Every range but the first starts just after a newline, so no line is cut.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            end = start + range_size
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((path, start, end))
+            start = end
+    return ranges
+
+
+def _read_lines(path: str, start: int, end: int) -> Iterator[str]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    for line in data.decode('utf-8', errors='replace').splitlines():
+        line = line.strip()
+        if line:
+            yield line
+
+
+class ColumnBatch:
+    """Per-line columns of parsed debug lines (numeric columns are typed arrays)."""
+    NUMERIC = (('game_step', 'I'), ('game_seconds', 'I'), ('step_length_ms', 'I'),
+               ('minerals', 'I'), ('gas', 'I'), ('supply_used', 'H'),
+               ('supply_capacity', 'H'), ('line_number', 'I'))
+    TEXT = ('log_level', 'source_file', 'message')
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {name: array(code) for name, code in self.NUMERIC}
+        self.text: Dict[str, List[str]] = {name: [] for name in self.TEXT}
+
+    def __len__(self) -> int:
+        return len(self.columns['game_step'])
+
+    @property
+    def first_step(self) -> int:
+        return self.columns['game_step'][0]
+
+    @property
+    def last_step(self) -> int:
+        return self.columns['game_step'][-1]
+
+    def append(self, record: DebugRecord) -> None:
+        columns = self.columns
+        columns['game_step'].append(record.game_step)
+        columns['game_seconds'].append(record.game_seconds)
+        columns['step_length_ms'].append(record.step_length_ms)
+        columns['minerals'].append(record.minerals_count)
+        columns['gas'].append(record.gas_count)
+        columns['supply_used'].append(min(record.supply_used, 0xFFFF))
+        columns['supply_capacity'].append(min(record.supply_capacity, 0xFFFF))
+        columns['line_number'].append(record.line_number)
+        text = self.text
+        text['log_level'].append(record.log_level)
+        text['source_file'].append(record.source_file)
+        text['message'].append(record.message)
+
+    def extend(self, other: 'ColumnBatch') -> None:
+        for name, column in other.columns.items():
+            self.columns[name].extend(column)
+        for name, values in other.text.items():
+            self.text[name].extend(values)
+
+    def save_npz(self, path: str) -> None:
+        """Write the columns to a compressed ``.npz`` file."""
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("npz output needs numpy: pip install 'sc2-bootstrap-discord[ingest]'")
+        arrays = {name: np.frombuffer(column, dtype=column.typecode)
+                  for name, column in self.columns.items()}
+        arrays.update({name: np.array(values, dtype=str) for name, values in self.text.items()})
+        np.savez_compressed(path, **arrays)
+
+
+def parse_range(path: str, start: int, end: int) -> List[ColumnBatch]:
+    """Parse one byte range; a new batch starts wherever the game step goes backwards."""
+    batches: List[ColumnBatch] = []
+    batch: Optional[ColumnBatch] = None
+    last_step = -1
+    for line in _read_lines(path, start, end):
+        record = parse_debug_line(line)
+        if record is None:
+            continue
+        if batch is None or record.game_step < last_step:
+            batch = ColumnBatch()
+            batches.append(batch)
+        last_step = record.game_step
+        batch.append(record)
+    return batches
+
+
+def send_range(path: str, start: int, end: int, host: str, port: int, transport: str = UDP,
+               transport_options: Optional[dict] = None, rate: float = 0,
+               match_id: Optional[int] = None) -> int:
+    """Parse one byte range and send its records to Graylog, at most ``rate`` per second."""
+    handler = GelfTransportHandler(make_transport(transport, host, port, **(transport_options or {})))
+    common = {'source': 'sc2_test_runner', 'host': socket.gethostname(), **source_tags(path)}
+    if match_id is not None:
+        common['match'] = match_id
+    sent = 0
+    batch: List[logging.LogRecord] = []
+    started = time.monotonic()
+
+    def flush() -> None:
+        nonlocal sent
+        handler.ship_batch(batch)
+        sent += len(batch)
+        batch.clear()
+        if rate:
+            # Pace against the start so short stalls are made up afterwards
+            delay = started + sent / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    try:
+        for line in _read_lines(path, start, end):
+            record = parse_debug_line(line)
+            if record is None:
+                fields, message = common, line
+            else:
+                fields, message = {**common, **record_fields(record)}, record.message
+            batch.append(logging.makeLogRecord({
+                'name': 'starcraft_bot_controller', 'msg': message,
+                'levelno': logging.INFO, 'levelname': 'INFO', **fields
+            }))
+            if len(batch) >= SEND_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    finally:
+        handler.close()
+    return sent
+
+
+def _executor(workers: int) -> Optional[Executor]:
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+
+def _match_name(path: str) -> str:
+    tags = source_tags(path)
+    return '_'.join(tags[key] for key in ('controller', 'bot_name') if key in tags) or Path(path).stem
+
+
+def parse_matches(path: str, executor: Optional[Executor] = None,
+                  range_size: int = DEFAULT_RANGE_SIZE) -> List[ColumnBatch]:
+    """Parse a whole file, in parallel if given an executor; one batch per match."""
+    ranges = line_ranges(path, range_size)
+    results = (executor.map(parse_range, *zip(*ranges)) if executor is not None and ranges
+               else (parse_range(*r) for r in ranges))
+    matches: List[ColumnBatch] = []
+    for batches in results:
+        for batch in batches:
+            # A range boundary inside a match continues the previous batch
+            if matches and batch is batches[0] and batch.first_step >= matches[-1].last_step:
+                matches[-1].extend(batch)
+            else:
+                matches.append(batch)
+    return matches
+
+
+def ingest_to_npz(paths: List[str], out_dir: str, workers: int = 1,
+                  range_size: int = DEFAULT_RANGE_SIZE) -> List[str]:
+    """Parse ``paths`` and write one ``.npz`` per match; return the files written."""
+    os.makedirs(out_dir, exist_ok=True)
+    written: List[str] = []
+    executor = _executor(workers)
+    try:
+        for path in paths:
+            name = _match_name(path)
+            for number, match in enumerate(parse_matches(path, executor, range_size), 1):
+                out_path = os.path.join(out_dir, f'{name}_match{number:03d}.npz')
+                match.save_npz(out_path)
+                written.append(out_path)
+    finally:
+        if executor:
+            executor.shutdown()
+    return written
+
+
+def ingest_to_gelf(paths: List[str], host: str, port: int, transport: str = UDP,
+                   transport_options: Optional[dict] = None, rate: float = 0,
+                   workers: int = 1, match_id: Optional[int] = None,
+                   range_size: int = DEFAULT_RANGE_SIZE) -> int:
+    """Send every line of ``paths`` to Graylog; ``rate`` caps the total messages/sec."""
+    ranges = [r for path in paths for r in line_ranges(path, range_size)]
+    if not ranges:
+        return 0
+    workers = max(1, min(workers, len(ranges)))
+    # Every worker sends on its own transport, so each gets a share of the rate
+    options = (host, port, transport, transport_options, rate / workers if rate else 0, match_id)
+    executor = _executor(workers)
+    try:
+        if executor is None:
+            return sum(send_range(*r, *options) for r in ranges)
+        futures = [executor.submit(send_range, *r, *options) for r in ranges]
+        return sum(future.result() for future in futures)
+    finally:
+        if executor:
+            executor.shutdown()
@@ -0,0 +1,123 @@
+"""
+Always-on, constant-memory instrumentation for the log pipeline.
+
+Stage times go into ``Histogram``: power-of-two microsecond buckets, so an
+observation is a ``bit_length`` and an increment and memory never grows.
+Per-line stages (parse, build) are timed on one line in ``sample_every`` to
+keep the clock reads off most of the hot loop; counters are exact.
+"""
+
+import time
+from array import array
+from typing import Dict, Optional, Tuple
+
+# Bucket i holds durations below 2**i microseconds; the last one is open-ended
+HISTOGRAM_BUCKETS = 24
+
+
+class Histogram:
+    """Fixed power-of-two histogram of durations."""
+    __slots__ = ('counts', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * HISTOGRAM_BUCKETS))
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, ns: int) -> None:
+        bucket = (ns // 1000).bit_length()
+        self.counts[bucket if bucket < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS - 1] += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, in microseconds."""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = max(1, -(-p * count // 100))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return float(2 ** bucket)
+        return float(2 ** (HISTOGRAM_BUCKETS - 1))
+
+    def summary(self) -> Dict[str, float]:
+        count = self.count
+        return {
+            'count': count,
+            'mean_us': round(self.total_ns / count / 1000, 1) if count else 0.0,
+            'p50_us': self.percentile(50),
+            'p99_us': self.percentile(99),
+            'max_us': round(self.max_ns / 1000, 1),
+        }
+
+
+class PipelineStats:
+    """Counters and stage histograms for ``LogMonitor``."""
+
+    def __init__(self, sample_every: int = 64, clock=time.monotonic):
+        self.sample_every = sample_every
+        self.clock = clock
+        self.started = clock()
+        self.lines = 0
+        self.parsed = 0
+        self.unparsed = 0
+        self.bytes_read = 0
+        self.max_queue_depth = 0
+        # Read: one tailer poll; parse and build: one sampled line each
+        self.read = Histogram()
+        self.parse = Histogram()
+        self.build = Histogram()
+        self._countdown = sample_every
+
+    def sample(self) -> bool:
+        """True for one line in ``sample_every``."""
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        self._countdown = self.sample_every
+        return True
+
+    def observe_queue(self, depth: int) -> None:
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def mark(self) -> Tuple[int, float]:
+        """Lines so far and the time, for a later ``lines_per_second(since=...)``."""
+        return self.lines, self.clock()
+
+    def lines_per_second(self, since: Optional[Tuple[int, float]] = None) -> float:
+        """Rate since a ``mark()`` (or since start).
+
+        Each reader keeps its own mark, so one asking does not reset another's window.
+        """
+        lines, then = since if since is not None else (0, self.started)
+        elapsed = self.clock() - then
+        return (self.lines - lines) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self, send: Optional[Histogram] = None, since: Optional[Tuple[int, float]] = None) -> dict:
+        """``lines_per_sec`` is the rate since ``since`` (a ``mark()``), or since start."""
+        elapsed = self.clock() - self.started
+        seen = self.parsed + self.unparsed
+        stats = {
+            'lines': self.lines,
+            'lines_per_sec': round(self.lines_per_second(since), 1),
+            'lines_per_sec_avg': round(self.lines / elapsed, 1) if elapsed > 0 else 0.0,
+            'parse_hit_ratio': round(self.parsed / seen, 4) if seen else 0.0,
+            'parse_miss_ratio': round(self.unparsed / seen, 4) if seen else 0.0,
+            'bytes_read': self.bytes_read,
+            'max_queue_depth': self.max_queue_depth,
+            'read': self.read.summary(),
+            'parse': self.parse.summary(),
+            'build': self.build.summary(),
+        }
+        if send is not None:
+            stats['send'] = send.summary()
+        return stats
@@ -0,0 +1,160 @@
+"""
+An append-only journal of the match queue, so queued matches survive a restart.
+
+Each change to the queue is one JSON line, written by ticket:
+
+- ``queue`` (match fields), ``bump`` (the match's new fields): the match is queued
+- ``start`` (match id): it was handed to a worker or the farm
+- ``finish``, ``cancel``: it is gone
+
+``record`` only appends the event to an in-memory buffer, so the Discord handler
+never waits on the disk. ``flush``, run on a worker thread, writes everything
+buffered since the last flush with one write and one fsync, so a bulk
+submission of thousands of matches costs a few disk syncs, not thousands.
+Flushes write in order under a lock. ``replay`` reads the journal back at
+startup. It stops at a torn last line, which it cuts off. It returns every match
+still queued or in flight, and a match that was in flight is queued again.
+Once the journal has ``compact_min`` lines and four times as many lines as live
+matches, ``flush`` rewrites it as one ``queue`` line per live match (plus
+``start`` for those in flight) and swaps it in with ``os.replace``.
+"""
+
+import json
+import os
+import threading
+from collections import namedtuple
+from typing import Dict, List
+
+QUEUE = 'queue'
+BUMP = 'bump'
+START = 'start'
+FINISH = 'finish'
+CANCEL = 'cancel'
+# The first line of a compacted journal: tickets already handed out
+NEXT = 'next'
+
+# match: the SC2Match fields; match_id: set if it was in flight
+JournalRecord = namedtuple('JournalRecord', ['ticket', 'match', 'match_id'])
+
+
+def encode(event: dict) -> bytes:
+    return json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+class QueueJournal:
+    """The match queue's event log; ``record`` from the loop, ``flush`` from a worker thread."""
+
+    def __init__(self, path: str = 'queue.journal', compact_min: int = 1000, fsync: bool = True):
+        self.path = path
+        self.compact_min = compact_min
+        self.fsync = fsync
+        # ticket -> [match fields, match id or None], as of the last flush
+        self.live: Dict[int, list] = {}
+        self.lines = 0
+        self.next_ticket = 1
+        self.compactions = 0
+        self._buffer: List[dict] = []
+        # Held briefly to swap the buffer; the write lock keeps flushes in order
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file = None
+
+    def replay(self) -> List[JournalRecord]:
+        """The matches queued or in flight when the journal was last written, by ticket (blocking)."""
+        live: Dict[int, list] = {}
+        lines = good = 0
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            size = 0
+        else:
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    self._apply(live, event)
+                    lines += 1
+                    good += len(line)
+        if good < size:
+            # A write cut short by a crash; later appends start on a clean line
+            with open(self.path, 'r+b') as f:
+                f.truncate(good)
+        records = [JournalRecord(ticket, match, match_id) for ticket, (match, match_id) in sorted(live.items())]
+        for record in live.values():
+            # Whatever was in flight is queued again
+            record[1] = None
+        self.live, self.lines = live, lines
+        return records
+
+    def record(self, op: str, ticket: int, **fields) -> None:
+        """Buffer one event; cheap enough for the event loop."""
+        fields['op'] = op
+        fields['ticket'] = ticket
+        with self._buffer_lock:
+            self._buffer.append(fields)
+
+    def flush(self) -> None:
+        """Write buffered events (blocking); compacts when the journal is mostly dead events."""
+        with self._write_lock:
+            with self._buffer_lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return
+            for event in events:
+                self._apply(self.live, event)
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            self._file.write(b''.join(encode(event) for event in events))
+            self._sync(self._file)
+            self.lines += len(events)
+            if self.lines >= self.compact_min and self.lines > 4 * len(self.live):
+                self._compact()
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _apply(self, live: Dict[int, list], event: dict) -> None:
+        op, ticket = event.get('op'), event.get('ticket')
+        if op == NEXT:
+            self.next_ticket = max(self.next_ticket, ticket)
+            return
+        self.next_ticket = max(self.next_ticket, ticket + 1)
+        if op == QUEUE:
+            live[ticket] = [event['match'], None]
+        elif op == BUMP and ticket in live:
+            live[ticket][0] = event['match']
+        elif op == START and ticket in live:
+            live[ticket][1] = event['match_id']
+        elif op in (FINISH, CANCEL):
+            live.pop(ticket, None)
+
+    def _compact(self) -> None:
+        events = [{'op': NEXT, 'ticket': self.next_ticket}]
+        for ticket, (match, match_id) in sorted(self.live.items()):
+            events.append({'op': QUEUE, 'ticket': ticket, 'match': match})
+            if match_id is not None:
+                events.append({'op': START, 'ticket': ticket, 'match_id': match_id})
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(b''.join(encode(event) for event in events))
+            self._sync(f)
+        if self._file is not None:
+            self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'ab')
+        self.lines = len(events)
+        self.compactions += 1
+
+    def _sync(self, f) -> None:
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
@@ -0,0 +1,198 @@
+"""
+Win/loss aggregates and Elo ratings, kept up to date one result at a time.
+
+``Leaderboard`` lives in the results database next to the ``results`` table.
+``standings`` holds one row of counts per (bot, opponent, map, opponent race),
+so recording a result is a single upsert plus two rating updates. The
+per-opponent, per-map and per-race views sum over those rows, and there are
+only as many of them as distinct pairings, not matches. A ``counted`` flag on
+each result makes ``record`` idempotent. ``rebuild`` replays every ingested
+result in match order in one pass, for a fresh database or after
+``results.json`` was rewritten.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+UNKNOWN = '?'
+
+# local-bootstrap result strings from bot1's point of view
+WIN_RESULTS = frozenset({'Player1Win', 'Player2Crash', 'Player2TimeOut'})
+LOSS_RESULTS = frozenset({'Player2Win', 'Player1Crash', 'Player1TimeOut'})
+TIE_RESULTS = frozenset({'Tie'})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS standings (
+    bot TEXT NOT NULL COLLATE NOCASE,
+    opponent TEXT NOT NULL COLLATE NOCASE,
+    map TEXT NOT NULL COLLATE NOCASE,
+    race TEXT NOT NULL COLLATE NOCASE,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    ties INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bot, opponent, map, race)
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    rating REAL NOT NULL,
+    games INTEGER NOT NULL
+);
+"""
+
+UPSERT_STANDING = """
+INSERT INTO standings (bot, opponent, map, race, games, wins, losses, ties)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (bot, opponent, map, race) DO UPDATE SET
+    games = games + 1,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    ties = ties + excluded.ties
+"""
+
+TOTALS = 'SUM(games) AS games, SUM(wins) AS wins, SUM(losses) AS losses, SUM(ties) AS ties'
+
+
+def score(result: str | None) -> Optional[float]:
+    """1 for a bot1 win, 0 for a loss, 0.5 for a tie; None when nothing was decided."""
+    if result in WIN_RESULTS:
+        return 1.0
+    if result in LOSS_RESULTS:
+        return 0.0
+    if result in TIE_RESULTS:
+        return 0.5
+    return None
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+def elo(rating: float, opponent_rating: float, result: float, k: float = K_FACTOR):
+    """New (rating, opponent_rating) after a game scored ``result`` for the first player."""
+    change = k * (result - expected_score(rating, opponent_rating))
+    return rating + change, opponent_rating - change
+
+
+def _standing(row: sqlite3.Row, key: str) -> dict:
+    games = row['games'] or 0
+    return {
+        key: row[key],
+        'games': games,
+        'wins': row['wins'] or 0,
+        'losses': row['losses'] or 0,
+        'ties': row['ties'] or 0,
+        # Ties count as half a win
+        'win_rate': round(((row['wins'] or 0) + (row['ties'] or 0) / 2) / games, 3) if games else 0.0,
+    }
+
+
+class Leaderboard:
+    """Aggregates over the ``results`` table of a ``ResultsStore`` database."""
+
+    def __init__(self, db: sqlite3.Connection, lock: threading.Lock, k: float = K_FACTOR):
+        self._db = db
+        self._lock = lock
+        self.k = k
+        db.executescript(SCHEMA)
+
+    def _ratings(self, names) -> Dict[str, list]:
+        """[rating, games, name] by lower-case name (names are matched without case)."""
+        ratings = {}
+        for name in names:
+            row = self._db.execute('SELECT rating, games FROM ratings WHERE name = ?', (name,)).fetchone()
+            ratings[name.lower()] = [row['rating'], row['games'], name] if row else [INITIAL_RATING, 0, name]
+        return ratings
+
+    def _save_ratings(self, ratings: Dict[str, list]) -> None:
+        self._db.executemany('INSERT OR REPLACE INTO ratings (name, rating, games) VALUES (?, ?, ?)',
+                             [(name, rating, games) for rating, games, name in ratings.values()])
+
+    def _count(self, row: sqlite3.Row, ratings: Dict[str, list]) -> bool:
+        """Add one result row to the standings and to ``ratings`` (caller holds the transaction)."""
+        result = score(row['result'])
+        bot, opponent = row['bot'], row['opponent']
+        if result is None or not bot or not opponent:
+            return False
+        self._db.execute(UPSERT_STANDING, (bot, opponent, row['map'] or UNKNOWN, row['race'] or UNKNOWN,
+                                           int(result == 1.0), int(result == 0.0), int(result == 0.5)))
+        bot_rating = ratings.setdefault(bot.lower(), [INITIAL_RATING, 0, bot])
+        opponent_rating = ratings.setdefault(opponent.lower(), [INITIAL_RATING, 0, opponent])
+        bot_rating[0], opponent_rating[0] = elo(bot_rating[0], opponent_rating[0], result, self.k)
+        bot_rating[1] += 1
+        opponent_rating[1] += 1
+        return True
+
+    def record(self, match_id: int) -> bool:
+        """Add one result to the aggregates, once; False if it is unknown, undecided or counted."""
+        with self._lock, self._db:
+            row = self._db.execute('SELECT * FROM results WHERE match_id = ? AND counted = 0',
+                                   (match_id,)).fetchone()
+            if row is None or not row['bot'] or not row['opponent']:
+                return False
+            ratings = self._ratings((row['bot'], row['opponent']))
+            if not self._count(row, ratings):
+                return False
+            self._save_ratings(ratings)
+            self._db.execute('UPDATE results SET counted = 1 WHERE match_id = ?', (match_id,))
+            return True
+
+    def rebuild(self) -> int:
+        """Recompute everything from the ingested results in match order; return results counted."""
+        counted = 0
+        ratings: Dict[str, list] = {}
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM standings')
+            self._db.execute('DELETE FROM ratings')
+            # One pass over a cursor; Elo depends on the order games were played
+            for row in self._db.cursor().execute('SELECT * FROM results ORDER BY match_id'):
+                counted += self._count(row, ratings)
+            self._save_ratings(ratings)
+            decided = WIN_RESULTS | LOSS_RESULTS | TIE_RESULTS
+            self._db.execute(f"UPDATE results SET counted = (bot IS NOT NULL AND opponent IS NOT NULL "
+                             f"AND result IN ({','.join('?' * len(decided))}))", tuple(decided))
+        return counted
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM standings LIMIT 1').fetchone() is None
+
+    def _grouped(self, key: str, bot: str, where: str = '', params: tuple = ()) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(f'SELECT {key}, {TOTALS} FROM standings WHERE bot = ? {where} '
+                                    f'GROUP BY {key} ORDER BY SUM(games) DESC, {key}',
+                                    (bot, *params)).fetchall()
+        return [_standing(row, key) for row in rows]
+
+    def by_opponent(self, bot: str) -> List[dict]:
+        return self._grouped('opponent', bot)
+
+    def by_map(self, bot: str, opponent: str | None = None) -> List[dict]:
+        if opponent:
+            return self._grouped('map', bot, 'AND opponent = ?', (opponent,))
+        return self._grouped('map', bot)
+
+    def by_race(self, bot: str) -> List[dict]:
+        return self._grouped('race', bot)
+
+    def totals(self, bot: str, opponent: str | None = None) -> dict:
+        where, params = ('AND opponent = ?', (opponent,)) if opponent else ('', ())
+        with self._lock:
+            row = self._db.execute(f"SELECT 'all' AS total, {TOTALS} FROM standings WHERE bot = ? {where}",
+                                   (bot, *params)).fetchone()
+        return _standing(row, 'total')
+
+    def rating(self, name: str) -> Optional[dict]:
+        """Rating and rated games for one bot, or None if it has not played."""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM ratings WHERE name = ?', (name,)).fetchone()
+        return {'rating': round(row['rating']), 'games': row['games']} if row else None
+
+    def ratings(self) -> Dict[str, dict]:
+        """Every rated bot, highest first."""
+        with self._lock:
+            rows = self._db.execute('SELECT * FROM ratings ORDER BY rating DESC').fetchall()
+        return {row['name']: {'rating': round(row['rating']), 'games': row['games']} for row in rows}
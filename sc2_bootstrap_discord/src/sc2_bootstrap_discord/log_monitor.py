@@ -1,16 +1,33 @@
 import asyncio
+import glob
 import json
 import os
 import logging
 import re
+import threading
+import time
 from pathlib import Path
-from typing import TypeVar, TypedDict, Optional
-import graypy
+from typing import Callable, Dict, List, Tuple, TypeVar, TypedDict, Optional
 from datetime import datetime
+from .archive import MatchLog
+from .detector import SlowStepAlert, SlowStepDetector
+from .emitter import GelfEmitter
+from .instrumentation import PipelineStats
+from .parser import DebugRecord, parse_debug_line, parse_game_result
+from .rollup import LogRollup, RollupEntry, SourceRateLimiter
+from .step_index import StepIndex, read_excerpt
+from .shipping import DEBUG_LOG_LEVELS, DROP_OLDEST, GelfShipper, ShippingHandler
+from .transports import UDP, GelfTransportHandler, make_transport
+from .tailer import LogTailer, make_waker
+from .timeseries import MatchSeries, SeriesStore
 
 T = TypeVar('T')
 
 class DebugLine(TypedDict):
+    """A parsed debug line as a dict, returned by ``LogMonitor._parse_debug_line``.
+
+    The pipeline itself passes ``DebugRecord`` tuples, whose fields these are.
+    """
     game_time: str
     game_step: int
     step_length: str
@@ -23,10 +40,100 @@ class DebugLine(TypedDict):
     line_number: int
     message: str
 
+CONTROLLER_DIR = re.compile(r'bot_controller\d+$')
+
+
+def source_tags(path: str) -> Dict[str, str]:
+    """Derive controller and bot name from a logs/bot_controllerN/<bot>/stderr.log path."""
+    parts = Path(path).parts
+    for i, part in enumerate(parts[:-1]):
+        if CONTROLLER_DIR.match(part):
+            tags = {'controller': part}
+            if i + 2 < len(parts):
+                tags['bot_name'] = parts[i + 1]
+            return tags
+    return {}
+
+
+def record_fields(record: DebugRecord) -> dict:
+    """GELF extra fields for a parsed debug line."""
+    # Numeric values so Graylog can chart and aggregate without extractors
+    return {
+        'game_time': record.game_time,
+        'game_seconds': record.game_seconds,
+        'game_step': record.game_step,
+        'step_length_ms': record.step_length_ms,
+        'minerals': record.minerals_count,
+        'gas': record.gas_count,
+        'supply_used': record.supply_used,
+        'supply_capacity': record.supply_capacity,
+        'source_file': record.source_file,
+        'line_number': record.line_number,
+        'log_level': record.log_level,
+        # Override GELF fields with parsed data
+        # '_file': record.source_file,
+        # '_line': record.line_number,
+        # '_function': record.source_file.split('.')[-1]  # Use last part of source file as function name
+    }
+
+
+class LogSource:
+    """Per-file state: the tailer, static tags and the file's own rollup."""
+
+    def __init__(self, path: str, offset_path: str | None, rollup_window: int,
+                 from_end: bool = True, indexed: bool = True, tail: bool = True):
+        self.path = path
+        self.offset_path = offset_path
+        self.tags = source_tags(path)
+        # None for a stream fed by LogMonitor.feed
+        self.tailer = LogTailer(path, offset_path=offset_path, from_end=from_end) if tail else None
+        # Identical lines within rollup_window game steps become one record (0 disables)
+        self.rollup = LogRollup(rollup_window) if rollup_window else None
+        self.rollup_match_id: int | None = None
+        self.series: MatchSeries | None = None
+        # Worker directory whose match this file belongs to (None: current_match_id)
+        self.scope: str | None = None
+        self.detector: SlowStepDetector | None = None
+        # Game-time sidecar index (<path>.idx), opened on the first indexed line
+        self.indexed = indexed
+        self.index: StepIndex | None = None
+        if indexed and os.path.exists(f'{path}.idx'):
+            # Keep earlier matches searchable across a restart
+            self.index = StepIndex(path)
+
+    def close(self) -> None:
+        if self.tailer is not None:
+            self.tailer.close()
+        if self.index is not None:
+            self.index.close()
+
+    def reopen(self) -> None:
+        """Replace the tailer after an error, resuming from the saved offset."""
+        self.tailer.close()
+        self.tailer = LogTailer(self.path, offset_path=self.offset_path)
+
+
 class LogMonitor:
-    def __init__(self, log_file_path: str, graylog_host: str, graylog_port: int):
+    def __init__(self, log_file_path: str, graylog_host: str, graylog_port: int,
+                 offset_path: str | None = None, queue_size: int = 10000,
+                 overflow: str = DROP_OLDEST, transport: str = UDP,
+                 transport_options: dict | None = None, rollup_window: int = 224,
+                 rate_limit: float | None = None, rate_burst: float | None = None,
+                 discover_interval: float = 2.0, slow_step_ms: int | None = None,
+                 slow_step_window: int = 224, slow_step_percentile: int = 95,
+                 alert_interval: float = 300.0, step_index: bool = True,
+                 instrument: bool = True, stats_interval: float = 60.0, echo: bool = False):
+        # A single path, or a glob such as logs/bot_controller*/**/stderr.log
         self.log_file_path = log_file_path
-        # Set up proper logging with graypy
+        self.is_glob = glob.has_magic(log_file_path)
+        # Where the tailer persists its byte offset so a restart resumes in place;
+        # with a glob every file gets its own <path>.offset
+        self.offset_path = offset_path if offset_path is not None or self.is_glob else f'{log_file_path}.offset'
+        self.rollup_window = rollup_window
+        # Keep a <log>.idx game-time index next to each log for !log lookups
+        self.step_index = step_index
+        self.discover_interval = discover_interval
+        # Set up proper logging with GELF output
         self.logger = logging.getLogger('starcraft_bot_controller')
         self.logger.setLevel(logging.INFO)
         # Add a default stdout handler
@@ -34,162 +141,461 @@ class LogMonitor:
         stdout_handler.setLevel(logging.INFO)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         stdout_handler.setFormatter(formatter)
-        self.logger.addHandler(stdout_handler)
-        # Add graypy handler
-        handler = graypy.GELFUDPHandler(graylog_host, graylog_port, debugging_fields=False)
-        self.logger.addHandler(handler)
+        # Add GELF handler on the configured transport (udp, tcp or http)
+        handler = GelfTransportHandler(
+            make_transport(transport, graylog_host, graylog_port, **(transport_options or {}))
+        )
+        # Both handlers run on the shipper's sender thread, never on the tail loop.
+        # Bot log lines skip logging altogether and reach stdout only with echo.
+        self.shipper = GelfShipper([stdout_handler, handler], maxsize=queue_size, overflow=overflow,
+                                   echo=echo)
+        self.emitter = GelfEmitter()
+        self.shipper.start()
+        self.logger.addHandler(ShippingHandler(self.shipper))
         self.current_match_id: int | None = None
+        # Match ids of worker directories playing side by side, by absolute path
+        self.scopes: Dict[str, int | None] = {}
+        self.sources: Dict[str, LogSource] = {}
+        # Output streamed in by feed (e.g. from the Docker API), by name
+        self.streams: Dict[str, LogSource] = {}
+        # Per-step metrics of recent matches, for match reports
+        self.series = SeriesStore()
+        # Optional token bucket per source_file, in records per second
+        self.rate_limiter = SourceRateLimiter(rate_limit, rate_burst) if rate_limit else None
+        # Live slow-step detection: alert when the step-time percentile over the
+        # last slow_step_window steps exceeds slow_step_ms (None disables)
+        self.slow_step_ms = slow_step_ms
+        self.slow_step_window = slow_step_window
+        self.slow_step_percentile = slow_step_percentile
+        self.alert_interval = alert_interval
+        self.on_slow_step: Callable[[SlowStepAlert], None] | None = None
+        # Called with (match id, player id, player, result) when python-sc2 logs the end of a game
+        self.on_game_result: Callable[[int | None, int, str, str], None] | None = None
+        # Stage timings and counters, summarised to the log every stats_interval seconds
+        self.stats = PipelineStats() if instrument else None
+        # Held while cut_logs moves logs and indexes aside, and while log_excerpt reads them
+        self._cut_lock = threading.Lock()
+        self.stats_interval = stats_interval
+        # Start of the periodic summary's rate window
+        self._stats_mark = self.stats.mark() if self.stats is not None else None
         self.monitor_task: asyncio.Task[None] | None = None
-        self.process: asyncio.subprocess.Process | None = None
-        self._loop: asyncio.AbstractEventLoop | None = None
         self.logger.info("LogMonitor.__init__ completed")
 
     def _parse_debug_line(self, line: str) -> Optional[DebugLine]:
-        """Parse a debug line into structured data."""
-        # Improved regex: allow for any whitespace (spaces/tabs) between columns and handle log level
-        pattern = (
-            r'(\d{2}:\d{2})\s+'         # game_time
-            r'(\d+)\s+'                 # game_step
-            r'(\d+ms)\s+'               # step_length
-            r'(\d+M)\s+'                # minerals
-            r'(\d+G)\s+'                # gas
-            r'(\d+)\s*/\s*(\d+)U\s+'   # supply used/capacity (allow spaces around /)
-            r'(INFO|DEBUG|WARNING|Level \d+)\s+' # log level (added WARNING)
-            r'([^\s:]+(?:\.[^\s:]+)*):' # source_file (allow dots, no spaces or colons)
-            r'(\d+)\s+'                 # line_number
-            r'(.*)'                     # message
-        )
-        match = re.match(pattern, line.strip())
-        if not match:
+        """Parse a debug line into a ``DebugLine`` dict, or None if it is not one."""
+        record = parse_debug_line(line.strip())
+        if record is None:
             return None
-        return {
-            'game_time': match.group(1),
-            'game_step': int(match.group(2)),
-            'step_length': match.group(3),
-            'minerals': match.group(4),
-            'gas': match.group(5),
-            'supply_used': int(match.group(6)),
-            'supply_capacity': int(match.group(7)),
-            'log_level': match.group(8),
-            'source_file': match.group(9),
-            'line_number': int(match.group(10)),
-            'message': match.group(11)
+        return DebugLine(**record._asdict())
+
+    def _source(self, path: str, from_end: bool = True) -> LogSource:
+        """Return the LogSource for ``path``, creating it on first sight."""
+        source = self.sources.get(path)
+        if source is None:
+            offset_path = self.offset_path if not self.is_glob else f'{path}.offset'
+            source = self.sources[path] = LogSource(path, offset_path, self.rollup_window, from_end,
+                                                    self.step_index)
+            self._init_source(source)
+            self.logger.info(f"Watching log file {path} {source.tags}")
+        return source
+
+    def _init_source(self, source: LogSource) -> None:
+        source.scope = self._scope_of(source.path)
+        if self.slow_step_ms:
+            source.detector = SlowStepDetector(
+                self.slow_step_ms, self.slow_step_window, self.slow_step_percentile,
+                self.alert_interval, on_alert=self._slow_step
+            )
+
+    def _scope_of(self, path: str) -> Optional[str]:
+        """The innermost worker directory containing ``path``, if any."""
+        path = os.path.abspath(path)
+        scopes = [scope for scope in self.scopes if path.startswith(scope + os.sep)]
+        return max(scopes, key=len) if scopes else None
+
+    def _match_id(self, source: LogSource) -> int | None:
+        """The match a file's lines belong to."""
+        return self.current_match_id if source.scope is None else self.scopes[source.scope]
+
+    def _discover(self, first: bool = False) -> None:
+        """Pick up log files matching the glob and drop ones that are gone."""
+        if not self.is_glob:
+            self._source(self.log_file_path)
+            return
+        found = set(glob.glob(self.log_file_path, recursive=True))
+        for path in found:
+            # Files that appear after startup are new matches: read them from the start
+            self._source(path, from_end=first)
+        for path in list(self.sources):
+            if path not in found and not os.path.exists(path):
+                source = self.sources.pop(path)
+                self._flush_source(source)
+                source.close()
+                self.logger.info(f"Stopped watching removed log file {path}")
+
+    def _handle_line(self, line_str: str, source: LogSource | None = None,
+                     offset: int | None = None) -> None:
+        """Parse a single log line (starting at byte ``offset``) and forward it to Graylog."""
+        line_str = line_str.strip()
+        if not line_str:
+            return
+        if source is None:
+            source = self._source(self.log_file_path)
+
+        self.logger.debug("Read line: %.100s...", line_str)  # Print first 100 chars of line
+
+        # Parse the debug line; one line in stats.sample_every is timed per stage
+        stats = self.stats
+        timed = stats is not None and stats.sample()
+        if timed:
+            started = time.perf_counter_ns()
+        record = parse_debug_line(line_str)
+        if timed:
+            parsed_at = time.perf_counter_ns()
+            stats.parse.observe(parsed_at - started)
+        self.logger.debug("Debug data: %s", record)
+        if record is None:
+            if stats is not None:
+                stats.unparsed += 1
+            # Use the raw line if it doesn't match the debug format
+            self._emit(line_str, {}, source=source)
+            if self.on_game_result is not None:
+                self._game_result(line_str, source)
+        else:
+            if stats is not None:
+                stats.parsed += 1
+            self._forward_record(record, source, offset)
+        if timed:
+            stats.build.observe(time.perf_counter_ns() - parsed_at)
+
+    def _forward_record(self, record: DebugRecord, source: LogSource, offset: int | None) -> None:
+        """Feed a parsed line to the per-match state and on towards Graylog."""
+        match_id = self._match_id(source)
+        series = source.series
+        if series is None or series.match_id != match_id:
+            series = source.series = self.series.get_or_create(match_id, source.tags.get('bot_name'))
+        series.append(record)
+        if offset is not None and source.indexed:
+            if source.index is None:
+                source.index = StepIndex(source.path)
+            source.index.add(record, offset, match_id)
+        if source.detector is not None:
+            source.detector.add(record, match_id, source.tags.get('bot_name'))
+        if source.rollup is None:
+            self._emit_record(record, match_id, source)
+        else:
+            if source.rollup_match_id != match_id:
+                # Close the previous match's groups under its own match id
+                self._flush_source(source)
+                source.rollup_match_id = match_id
+            closed, first = source.rollup.add(record)
+            self._emit_rollup(source, closed)
+            if first:
+                self._emit_record(record, match_id, source)
+
+    def _flush_source(self, source: LogSource) -> None:
+        if source.rollup is not None:
+            self._emit_rollup(source, source.rollup.flush())
+
+    def _emit_rollup(self, source: LogSource, entries: List[RollupEntry]) -> None:
+        """Forward the repeats of closed rollup groups."""
+        for entry in entries:
+            self._emit_record(entry.record, source.rollup_match_id, source, entry)
+
+    def _emit_record(self, record: DebugRecord, match_id: int | None, source: LogSource,
+                     entry: RollupEntry | None = None) -> None:
+        """Forward a parsed debug line, subject to the per-source rate limit."""
+        if self.rate_limiter is not None and not self.rate_limiter.allow(record.source_file):
+            return
+        extra = record_fields(record)
+        if entry is not None:
+            extra.update({
+                'repeat_count': entry.repeat_count,
+                'first_game_step': entry.first_game_step,
+                'last_game_step': entry.last_game_step,
+            })
+        # Use the parsed message
+        self._emit(record.message, extra, match_id, source)
+
+    def _emit(self, message: str, fields: dict, match_id: int | None = None,
+              source: LogSource | None = None) -> None:
+        """Encode a message with the common extra fields and queue it for Graylog."""
+        if match_id is None:
+            match_id = self.current_match_id if source is None else self._match_id(source)
+        if source is None:
+            prefix = self.emitter.prefix(match_id)
+        else:
+            prefix = self.emitter.prefix(match_id, source.tags, source.path)
+        self.shipper.submit_raw(self.emitter.encode(prefix, message, fields),
+                                fields.get('log_level') in DEBUG_LOG_LEVELS)
+
+    def _log_stats(self) -> None:
+        """Periodic pipeline summary, with the headline numbers as fields for Graylog."""
+        stats = self.pipeline_stats(since=self._stats_mark)
+        self._stats_mark = self.stats.mark()
+        fields = {
+            'pipeline_lines_per_sec': stats['lines_per_sec'],
+            'pipeline_parse_hit_ratio': stats['parse_hit_ratio'],
+            'pipeline_queue_depth': stats['queued'],
+            'pipeline_send_errors': stats['send_errors'],
         }
+        for stage in ('read', 'parse', 'build', 'send'):
+            fields[f'pipeline_{stage}_p99_us'] = stats[stage]['p99_us']
+        self.logger.info(
+            f"Pipeline: {stats['lines_per_sec']} lines/s, parse hit {stats['parse_hit_ratio']:.1%}, "
+            f"p99 read {stats['read']['p99_us']:.0f}us parse {stats['parse']['p99_us']:.0f}us "
+            f"build {stats['build']['p99_us']:.0f}us send {stats['send']['p99_us']:.0f}us, "
+            f"queue {stats['queued']}, send errors {stats['send_errors']}",
+            extra=fields
+        )
 
-    async def _monitor_log_file(self) -> None:
-        """Monitor the log file and forward entries to Graylog using tail -f."""
-        self.logger.info(f"Starting log monitoring for file: {self.log_file_path}")
-        while True:
+    def _slow_step(self, alert: SlowStepAlert) -> None:
+        """Log a slow-step alert and pass it on to ``on_slow_step``."""
+        self.logger.warning(
+            f"Slow steps: p{alert.percentile} {alert.step_time_ms}ms over {alert.window_steps} steps "
+            f"(threshold {alert.threshold_ms}ms) at {alert.game_time}"
+        )
+        if self.on_slow_step is not None:
             try:
-                self.logger.info(f"Attempting to start tail -f process for {self.log_file_path}")
-                # Start tail -f process
-                self.process = await asyncio.create_subprocess_exec(
-                    'tail', '-f', self.log_file_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                self.logger.info("tail -f process started successfully")
-
-                # Read output line by line
-                while True:
-                    if self.process.stdout is None:
-                        self.logger.warning("Process stdout is None, breaking")
-                        break
-                    line = await self.process.stdout.readline()
-                    if not line:
-                        self.logger.warning("No more lines to read, breaking")
-                        break
-                    
-                    line_str = line.decode().strip()
-                    if not line_str:
-                        continue
+                self.on_slow_step(alert)
+            except Exception as e:
+                self.logger.error(f"Error in slow step alert callback: {e}")
 
-                    self.logger.debug(f"Read line: {line_str[:100]}...")  # Print first 100 chars of line
-
-                    # Parse the debug line
-                    debug_data = self._parse_debug_line(line_str)
-                    self.logger.debug(f"Debug data: {debug_data}")
-                    # Log to Graylog with extra fields
-                    extra = {
-                        'match': self.current_match_id,
-                        'source': 'sc2_test_runner',
-                        'host': os.uname().nodename
-                    }
-                    
-                    # Add parsed debug data if available
-                    if debug_data:
-                        extra.update({
-                            'game_time': debug_data['game_time'],
-                            'game_step': debug_data['game_step'],
-                            'step_length': debug_data['step_length'],
-                            'minerals': debug_data['minerals'],
-                            'gas': debug_data['gas'],
-                            'supply_used': debug_data['supply_used'],
-                            'supply_capacity': debug_data['supply_capacity'],
-                            'source_file': debug_data['source_file'],
-                            'line_number': debug_data['line_number'],
-                            'log_level': debug_data['log_level'],
-                            # Override GELF fields with parsed data
-                            # '_file': debug_data['source_file'],
-                            # '_line': debug_data['line_number'],
-                            # '_function': debug_data['source_file'].split('.')[-1]  # Use last part of source file as function name
-                        })
-                        # Use the parsed message
-                        message = debug_data['message']
-                    else:
-                        # Use the raw line if it doesn't match the debug format
-                        message = line_str
-
-                    self.logger.info(message, extra=extra)
-                    self.logger.debug("GELF message emitted")
+    def _game_result(self, line: str, source: LogSource) -> None:
+        """Pass python-sc2's game-result line on to ``on_game_result``."""
+        game_result = parse_game_result(line)
+        if game_result is None:
+            return
+        try:
+            self.on_game_result(self._match_id(source), *game_result)
+        except Exception as e:
+            self.logger.error(f"Error in game result callback: {e}")
 
+    def _poll_sources(self) -> bool:
+        """Read new lines from every source; True if any source has more waiting."""
+        busy = False
+        for source in list(self.sources.values()):
+            tailer = source.tailer
+            stats = self.stats
+            try:
+                if stats is not None:
+                    started = time.perf_counter_ns()
+                    lines = tailer.poll()
+                    stats.read.observe(time.perf_counter_ns() - started)
+                    stats.lines += len(lines)
+                    if tailer.batch_first_line == 0:
+                        stats.bytes_read += tailer.offset - tailer.batch_offset
+                else:
+                    lines = tailer.poll()
+                if source.indexed:
+                    # Byte offsets for the index; lines before batch_first_line
+                    # belong to a file that has been rotated away
+                    first, offsets = tailer.batch_first_line, tailer.line_offsets()
+                    for i, line_str in enumerate(lines):
+                        if i < first:
+                            self._handle_line(line_str, source)
+                            continue
+                        self._handle_line(line_str, source, offsets[i - first])
+                else:
+                    for line_str in lines:
+                        self._handle_line(line_str, source)
+                tailer.commit()
+                if stats is not None:
+                    stats.observe_queue(self.shipper.queued)
             except Exception as e:
-                self.logger.error(f"Error in log monitoring: {e}")
-                if self.process:
-                    self.process.terminate()
-                await asyncio.sleep(5)  # Wait before retrying
+                self.logger.error(f"Error in log monitoring for {source.path}: {e}")
+                source.reopen()
                 continue
+            if not source.tailer.at_eof:
+                busy = True
+        return busy
 
-    def start_monitoring(self) -> None:
-        """Start the log monitoring process."""
-        self.logger.info("start_monitoring called")
+    def _expire_rollups(self) -> None:
+        """Close rollup groups that have waited too long, e.g. at the end of a match."""
+        for source in [*self.sources.values(), *self.streams.values()]:
+            if source.rollup is not None:
+                self._emit_rollup(source, source.rollup.expire())
+
+    async def _monitor_log_file(self) -> None:
+        """Monitor every matching log file on one loop and forward entries to Graylog."""
+        self.logger.info(f"Starting log monitoring for: {self.log_file_path}")
+        # One waker for all files: a single inotify descriptor however many are watched
+        waker = make_waker()
+        next_discover = 0.0
+        next_expire = time.monotonic() + 1.0
+        next_stats = time.monotonic() + self.stats_interval
+        first = True
         try:
-            self._loop = asyncio.get_event_loop()
-            self.logger.info("Got existing event loop")
-        except RuntimeError:
-            self.logger.info("No event loop found, creating new one")
-            self._loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self._loop)
-        
+            while True:
+                now = time.monotonic()
+                if now >= next_discover:
+                    self._discover(first)
+                    first = False
+                    next_discover = now + self.discover_interval
+                    for source in self.sources.values():
+                        waker.watch(os.path.dirname(os.path.abspath(source.path)))
+                busy = self._poll_sources()
+                if now >= next_expire:
+                    self._expire_rollups()
+                    next_expire = now + 1.0
+                if self.stats is not None and now >= next_stats:
+                    self._log_stats()
+                    next_stats = now + self.stats_interval
+                if busy:
+                    # More data waiting; let other tasks run before the next read
+                    await asyncio.sleep(0)
+                else:
+                    await waker.wait(max(0.0, min(next_discover, next_expire) - time.monotonic()))
+        finally:
+            waker.close()
+            for source in [*self.sources.values(), *self.streams.values()]:
+                self._flush_source(source)
+                source.close()
+
+    async def start(self) -> None:
+        """Start monitoring as a task on the running event loop (e.g. the Discord client's)."""
         if self.monitor_task is None or self.monitor_task.done():
-            self.logger.info("Creating new monitor task")
-            self.monitor_task = self._loop.create_task(self._monitor_log_file())
-            self.logger.info("Monitor task created")
-            
-            # Run the task in the background
-            def run_task():
+            self.monitor_task = asyncio.get_running_loop().create_task(self._monitor_log_file())
+            self.logger.info("Log monitoring started")
+
+    async def set_match(self, match_id: int | None, directory: str | None = None) -> None:
+        """Switch the match context, first shipping lines already written under the old one.
+
+        With ``directory``, only logs under that worker directory change
+        match; the others keep theirs.
+        """
+        if self.monitor_task is not None and not self.monitor_task.done():
+            self._poll_sources()
+        if directory is None:
+            self.current_match_id = match_id
+            return
+        scope = os.path.abspath(directory)
+        self.scopes[scope] = match_id
+        for source in [*self.sources.values(), *self.streams.values()]:
+            source.scope = self._scope_of(source.path)
+
+    def feed(self, name: str, lines: List[str], tags: Dict[str, str] | None = None) -> None:
+        """Parse and ship lines that arrive without a file, e.g. a container's output.
+
+        ``name`` stands in for a path: under a worker directory the lines take
+        that worker's match, and ``tags`` (controller, bot_name) are added to
+        those a path gives. Streams are not indexed for ``!log``.
+        """
+        source = self.streams.get(name)
+        if source is None:
+            source = self.streams[name] = LogSource(name, None, self.rollup_window, indexed=False, tail=False)
+            source.tags.update(tags or {})
+            self._init_source(source)
+            self.logger.info(f"Receiving log stream {name} {source.tags}")
+        if self.stats is not None:
+            self.stats.lines += len(lines)
+        for line in lines:
+            self._handle_line(line, source)
+
+    def end_stream(self, name: str) -> None:
+        """Ship what a finished stream's rollup still holds and forget it."""
+        source = self.streams.pop(name, None)
+        if source is not None:
+            self._flush_source(source)
+            source.close()
+
+    async def cut_logs(self, directory: str | None = None) -> List[MatchLog]:
+        """Move every log (or those under worker ``directory``) aside at the end of a match.
+
+        Lines still unread are shipped first. Each log is renamed to
+        ``<path>.<match_id>`` with its index and returned for archiving; the
+        tailer follows the fresh file the next match creates.
+        """
+        while self._poll_sources():
+            await asyncio.sleep(0)
+        scope = os.path.abspath(directory) if directory is not None else None
+        logs = []
+        for source in list(self.sources.values()):
+            if scope is not None and source.scope != scope:
+                continue
+            match_id = self._match_id(source) or 0
+            self._flush_source(source)
+            # An excerpt being read waits for this, and this for it (a few pages at most)
+            with self._cut_lock:
                 try:
-                    if self._loop and self.monitor_task:
-                        self._loop.run_until_complete(self.monitor_task)
-                except asyncio.CancelledError:
-                    self.logger.info("Monitor task was cancelled")
-                except Exception as e:
-                    self.logger.error(f"Error in monitor task: {e}")
-            
-            import threading
-            thread = threading.Thread(target=run_task, daemon=True)
-            thread.start()
-            self.logger.info("Monitor task started in background thread")
-
-    def stop_monitoring(self) -> None:
-        """Stop the log monitoring process."""
-        self.logger.info("stop_monitoring called")
-        if self.process:
-            self.logger.info("Terminating tail process")
-            self.process.terminate()
-        if self.monitor_task and not self.monitor_task.done():
-            self.logger.info("Cancelling monitor task")
+                    if os.path.getsize(source.path) == 0:
+                        continue
+                    cut_path = f'{source.path}.{match_id}'
+                    os.replace(source.path, cut_path)
+                except FileNotFoundError:
+                    continue
+                index_path = None
+                if source.index is not None:
+                    source.index.close()
+                    source.index = None
+                    index_path = f'{cut_path}.idx'
+                    os.replace(f'{source.path}.idx', index_path)
+            logs.append(MatchLog(cut_path, index_path, dict(source.tags)))
+        return logs
+
+    async def aclose(self) -> None:
+        """Stop monitoring, flush open rollups and drain the shipping queue."""
+        if self.monitor_task is not None and not self.monitor_task.done():
             self.monitor_task.cancel()
-            if self._loop:
-                self.logger.info("Running until monitor task completes")
-                self._loop.run_until_complete(self.monitor_task) 
\ No newline at end of file
+            try:
+                await self.monitor_task
+            except asyncio.CancelledError:
+                pass
+        self.monitor_task = None
+        # Joining the sender thread blocks, so keep it off the loop
+        await asyncio.to_thread(self.shipper.stop)
+        self.logger.info("Log monitoring stopped")
+
+    def match_summary(self, match_id: int | None, bot_name: str | None = None) -> dict | None:
+        """Step-time percentiles and peak supply for a match, if it was seen."""
+        series = self.series.get(match_id, bot_name)
+        return series.summary() if series is not None and len(series) else None
+
+    def log_excerpt(self, match_id: int, game_seconds: int, lines: int = 20,
+                    bot_name: str | None = None, controller: str | None = None) -> Optional[tuple]:
+        """(path, lines) around a game time in a match's log, or None if not indexed.
+
+        Prefers ``bot_name``'s log when several logs cover the match, and of
+        those (a mirror match) ``controller``'s. Reads only the index and a few
+        pages of the log. Safe to call from a thread: ``cut_logs`` cannot move
+        the log or its index away in the middle.
+        """
+        with self._cut_lock:
+            candidates = [(source, source.index) for source in list(self.sources.values())
+                          if source.index is not None and match_id in source.index.runs]
+            candidates.sort(key=lambda item: (item[0].tags.get('bot_name') != bot_name,
+                                              item[0].tags.get('controller') != controller))
+            for source, index in candidates:
+                offset = index.lookup(match_id, game_seconds)
+                if offset is not None:
+                    return source.path, read_excerpt(source.path, offset, game_seconds, lines)
+            return None
+
+    def pipeline_stats(self, since: Tuple[int, float] | None = None) -> dict | None:
+        """Throughput (the rate since ``since``, a ``stats.mark()``), parse ratios, stage
+        histograms and queue state, or None if disabled."""
+        if self.stats is None:
+            return None
+        stats = self.stats.summary(send=self.shipper.send_time, since=since)
+        stats.update({
+            'queued': self.shipper.queued,
+            'dropped': self.shipper.dropped,
+            'failed': self.shipper.failed,
+            'send_errors': self.shipper.send_errors,
+        })
+        return stats
+
+    def shipping_stats(self) -> dict:
+        """Counters for records sent to and dropped before Graylog."""
+        stats = self.shipper.stats()
+        rollups = [source.rollup for source in self.sources.values() if source.rollup is not None]
+        if rollups:
+            stats['rollup_in'] = sum(rollup.records_in for rollup in rollups)
+            stats['rollup_out'] = sum(rollup.records_out for rollup in rollups)
+        stats['files'] = len(self.sources)
+        detectors = [source.detector for source in self.sources.values() if source.detector is not None]
+        if detectors:
+            stats['slow_step_alerts'] = sum(detector.alerts for detector in detectors)
+        if self.rate_limiter is not None:
+            stats['rate_limited'] = sum(self.rate_limiter.dropped.values())
+        return stats 
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Fast parser for StarCraft 2 bot debug lines.
+
+The pattern is compiled once at import, lines that cannot be debug lines are
+rejected by a prefix check before any regex runs, and results are tuple-backed
+``DebugRecord`` objects rather than per-line dicts.
+"""
+
+import re
+from typing import NamedTuple, Optional, Tuple
+
+# `(?:\.[^\s:]+)*` in the original source_file group was redundant with
+# `[^\s:]+` (which already admits dots) and only added backtracking.
+DEBUG_LINE_PATTERN = re.compile(
+    r'(\d{2}:\d{2})\s+'         # game_time
+    r'(\d+)\s+'                 # game_step
+    r'(\d+ms)\s+'               # step_length
+    r'(\d+M)\s+'                # minerals
+    r'(\d+G)\s+'                # gas
+    r'(\d+)\s*/\s*(\d+)U\s+'    # supply used/capacity (allow spaces around /)
+    r'(INFO|DEBUG|WARNING|Level \d+)\s+'  # log level
+    r'([^\s:]+):'               # source_file (allow dots, no spaces or colons)
+    r'(\d+)\s+'                 # line_number
+    r'(.*)'                     # message
+)
+
+# python-sc2's last word on a game, e.g.
+# "... sc2.main:_play_game:228 - Result for player 1 - Bot TerranBot(Terran): Victory"
+GAME_RESULT_MARKER = 'Result for player '
+GAME_RESULT_PATTERN = re.compile(r'Result for player (\d+) - (.*): (\w+)\s*$')
+
+# Shortest line the pattern can match: "00:00 0 0ms 0M 0G 0/0U INFO a:0 "
+MIN_DEBUG_LINE_LENGTH = 32
+
+_DIGITS = frozenset('0123456789')
+
+
+class DebugRecord(NamedTuple):
+    """A parsed debug line; field names match ``DebugLine``.
+
+    The raw columns keep their units as logged; the properties below give the
+    numeric values shipped to Graylog.
+    """
+    game_time: str
+    game_step: int
+    step_length: str
+    minerals: str
+    gas: str
+    supply_used: int
+    supply_capacity: int
+    log_level: str
+    source_file: str
+    line_number: int
+    message: str
+
+    @property
+    def step_length_ms(self) -> int:
+        """'152ms' -> 152"""
+        return int(self.step_length[:-2])
+
+    @property
+    def minerals_count(self) -> int:
+        """'195M' -> 195"""
+        return int(self.minerals[:-1])
+
+    @property
+    def gas_count(self) -> int:
+        """'3650G' -> 3650"""
+        return int(self.gas[:-1])
+
+    @property
+    def game_seconds(self) -> int:
+        """'14:25' -> 865"""
+        return int(self.game_time[:2]) * 60 + int(self.game_time[3:])
+
+
+_new_record = tuple.__new__
+_match = DEBUG_LINE_PATTERN.match
+
+
+def parse_debug_line(line: str) -> Optional[DebugRecord]:
+    """Parse an already-stripped debug line, or return None.
+
+    Every debug line starts with a ``mm:ss`` game time, so anything else is
+    rejected without touching the regex engine.
+    """
+    if (len(line) < MIN_DEBUG_LINE_LENGTH or line[2] != ':'
+            or line[0] not in _DIGITS or line[4] not in _DIGITS):
+        return None
+    match = _match(line)
+    if match is None:
+        return None
+    (game_time, game_step, step_length, minerals, gas, supply_used,
+     supply_capacity, log_level, source_file, line_number, message) = match.groups()
+    return _new_record(DebugRecord, (
+        game_time, int(game_step), step_length, minerals, gas, int(supply_used),
+        int(supply_capacity), log_level, source_file, int(line_number), message
+    ))
+
+
+def parse_game_result(line: str) -> Optional[Tuple[int, str, str]]:
+    """(player id, player, result) from python-sc2's game-result line, or None."""
+    if GAME_RESULT_MARKER not in line:
+        return None
+    match = GAME_RESULT_PATTERN.search(line)
+    if match is None:
+        return None
+    return int(match.group(1)), match.group(2), match.group(3)
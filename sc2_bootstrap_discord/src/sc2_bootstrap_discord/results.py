@@ -0,0 +1,342 @@
+"""
+Match results in an indexed SQLite database, fed incrementally from results.json.
+
+local-bootstrap rewrites ``results.json`` (``{"results": [...]}``) after every
+match and the file only ever grows. Rather than loading it whole for each
+report, ``ResultsStore.refresh`` remembers the byte offset just past the last
+entry it ingested and decodes only what follows, one entry at a time with
+``JSONDecoder.raw_decode``. A copy of the bytes before that offset shows
+whether the file was replaced by a different history, in which case it is
+ingested again from the start. Entries are keyed by match id, so latest
+result, next match id and ``!history`` queries are index lookups.
+
+``ResultsFile`` answers the one question asked after every match - what was
+the last result - without the database: it reads back from the end of the
+file to the start of the last complete entry, falling back to a full parse
+that is cached until the file's mtime or size changes.
+
+``append_results`` adds entries at the end of the file in the same layout,
+for results merged in from worker directories.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from .leaderboard import Leaderboard
+
+# Columns added since the results table was first created
+ADDED_COLUMNS = (('race', 'TEXT COLLATE NOCASE'), ('counted', 'INTEGER NOT NULL DEFAULT 0'))
+# Bytes before the saved offset compared on refresh to detect a rewritten file
+TAIL_CHECK = 64
+# First read from the end of results.json; doubled until the last entry fits
+TAIL_BLOCK = 16 * 1024
+RESULTS_END = re.compile(r'\s*\]\s*\}\s*$')
+RESULTS_ARRAY = re.compile(r'"results"\s*:\s*\[')
+_decoder = json.JSONDecoder()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    match_id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    bot TEXT COLLATE NOCASE,
+    opponent TEXT COLLATE NOCASE,
+    map TEXT COLLATE NOCASE,
+    race TEXT COLLATE NOCASE,
+    result TEXT,
+    winner TEXT,
+    game_time REAL,
+    entry TEXT NOT NULL,
+    counted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_position ON results (position);
+CREATE INDEX IF NOT EXISTS results_opponent ON results (opponent, match_id);
+CREATE INDEX IF NOT EXISTS results_map ON results (map, match_id);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    tail BLOB NOT NULL,
+    entries INTEGER NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO results (match_id, position, bot, opponent, map, result, winner, game_time, entry)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (match_id) DO UPDATE SET
+    position = excluded.position,
+    bot = COALESCE(excluded.bot, bot),
+    opponent = COALESCE(excluded.opponent, opponent),
+    map = COALESCE(excluded.map, map),
+    result = excluded.result,
+    winner = excluded.winner,
+    game_time = excluded.game_time,
+    entry = excluded.entry
+"""
+
+
+def decode_entries(text: str, pos: int) -> List[Tuple[dict, int]]:
+    """Decode array entries from ``text[pos:]`` as (entry, end index) pairs.
+
+    Stops at the closing bracket, or quietly at a truncated entry, as when
+    the file is read mid-write.
+    """
+    entries = []
+    size = len(text)
+    while True:
+        while pos < size and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= size or text[pos] == ']':
+            return entries
+        try:
+            entry, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return entries
+        entries.append((entry, pos))
+
+
+def last_entry(data: str) -> Optional[dict]:
+    """The last entry of a ``{"results": [...]}`` document's tail, or None if it is not all there.
+
+    Tries each ``{`` from the end backwards; the last entry is the object
+    followed only by the closing ``]}``. Nested objects end before an entry's
+    own brace, so they never qualify.
+    """
+    start = len(data)
+    while True:
+        start = data.rfind('{', 0, start)
+        if start < 0:
+            return None
+        try:
+            entry, end = _decoder.raw_decode(data, start)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(entry, dict) and RESULTS_END.match(data, end):
+            return entry
+
+
+def append_results(path: str, entries: List[dict]) -> None:
+    """Add entries to the end of a ``{"results": [...]}`` file, creating it if needed.
+
+    Only the closing ``]}`` is rewritten, so ``ResultsStore.refresh`` still
+    reads just the new entries.
+    """
+    if not entries:
+        return
+    # Laid out as json.dump(..., indent=4) would
+    text = ',\n'.join('        ' + json.dumps(entry, indent=4).replace('\n', '\n        ')
+                       for entry in entries)
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        with open(path, 'w') as f:
+            f.write(f'{{\n    "results": [\n{text}\n    ]\n}}')
+        return
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - TAIL_BLOCK))
+        tail = f.read().decode('utf-8', errors='replace')
+        end = RESULTS_END.search(tail)
+        if end is None:
+            raise ValueError(f'{path} does not end with a results array')
+        before = tail[:end.start()].rstrip()
+        # Byte position of the closing bracket's whitespace
+        f.seek(size - len(tail[end.start():].encode('utf-8')))
+        separator = '\n' if before.endswith('[') else ',\n'
+        f.write(f'{separator}{text}\n    ]\n}}'.encode('utf-8'))
+        f.truncate()
+
+
+class ResultsFile:
+    """Last entry of ``results.json`` from its tail; full parses cached by mtime."""
+
+    def __init__(self, path: str = 'results.json', block_size: int = TAIL_BLOCK):
+        self.path = path
+        self.block_size = block_size
+        self._cached: Tuple[Tuple[int, int], List[dict]] | None = None
+        self.tail_reads = 0
+        self.full_reads = 0
+
+    def last(self) -> Optional[dict]:
+        """The last result, reading only the end of the file when it can."""
+        try:
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                block = self.block_size
+                while True:
+                    f.seek(max(0, size - block))
+                    entry = last_entry(f.read(block).decode('utf-8', errors='replace'))
+                    if entry is not None:
+                        self.tail_reads += 1
+                        return entry
+                    if block >= size or block >= 64 * self.block_size:
+                        break
+                    block *= 4
+        except FileNotFoundError:
+            return None
+        # Empty, mid-write or not the usual layout: parse the whole thing
+        results = self.all()
+        # A copy, so callers may add to it without touching the cache
+        return dict(results[-1]) if results else None
+
+    def all(self) -> List[dict]:
+        """Every result; the parse is reused until the file changes."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._cached is None or self._cached[0] != key:
+            try:
+                with open(self.path, 'rb') as f:
+                    results = json.load(f).get('results', [])
+            except (json.JSONDecodeError, AttributeError):
+                results = []
+            self.full_reads += 1
+            self._cached = (key, results)
+        return self._cached[1]
+
+    def next_match_id(self) -> int:
+        """One past the last result's match id (1 for no results)."""
+        last = self.last()
+        return (last or {}).get('match', 0) + 1
+
+
+class ResultsStore:
+    """SQLite index of ``results.json``; safe to call from worker threads."""
+
+    def __init__(self, results_path: str = 'results.json', db_path: str = 'results.db'):
+        self.results_path = results_path
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        columns = {row['name'] for row in self._db.execute('PRAGMA table_info(results)')}
+        for name, declaration in ADDED_COLUMNS:
+            if name not in columns:
+                self._db.execute(f'ALTER TABLE results ADD COLUMN {name} {declaration}')
+        # Win rates and ratings, kept in the same database
+        self.leaderboard = Leaderboard(self._db, self._lock)
+
+    def _state(self) -> Tuple[int, bytes, int]:
+        row = self._db.execute('SELECT offset, tail, entries FROM ingest_state WHERE path = ?',
+                               (self.results_path,)).fetchone()
+        return (row['offset'], row['tail'], row['entries']) if row else (0, b'', 0)
+
+    def refresh(self) -> int:
+        """Ingest entries added to results.json since the last call; return how many."""
+        with self._lock:
+            try:
+                f = open(self.results_path, 'rb')
+            except FileNotFoundError:
+                return 0
+            with f:
+                offset, tail, position = self._state()
+                size = os.fstat(f.fileno()).st_size
+                if offset:
+                    f.seek(offset - len(tail))
+                    if size < offset or f.read(len(tail)) != tail:
+                        # Replaced by a different history: start over
+                        offset = position = 0
+                        tail = b''
+                if offset == size:
+                    return 0
+                f.seek(offset)
+                data = f.read()
+            return self._ingest(data, offset, tail, position)
+
+    def _ingest(self, data: bytes, offset: int, tail: bytes, position: int) -> int:
+        text = data.decode('utf-8', errors='replace')
+        pos = 0
+        if offset == 0:
+            array = RESULTS_ARRAY.search(text)
+            if array is None:
+                return 0
+            pos = array.end()
+        entries = decode_entries(text, pos)
+        if not entries:
+            return 0
+        rows = []
+        for entry, _ in entries:
+            position += 1
+            # Older files may lack the match id; their place in the file stands in
+            match_id = entry.get('match') if isinstance(entry.get('match'), int) else position
+            rows.append((match_id, position, entry.get('bot1'), entry.get('bot2'), entry.get('map'),
+                         entry.get('result'), entry.get('winner'), entry.get('game_time'),
+                         json.dumps(entry)))
+        end = offset + len(text[:entries[-1][1]].encode('utf-8'))
+        tail = (tail + data[:end - offset])[-TAIL_CHECK:]
+        with self._db:
+            if offset == 0:
+                # Entries re-ingested below take their new places; any others sort first
+                self._db.execute('UPDATE results SET position = 0')
+            self._db.executemany(UPSERT, rows)
+            self._db.execute('INSERT OR REPLACE INTO ingest_state (path, offset, tail, entries) '
+                             'VALUES (?, ?, ?, ?)', (self.results_path, end, tail, position))
+        return len(rows)
+
+    @staticmethod
+    def _row(row: sqlite3.Row | None) -> Optional[dict]:
+        if row is None:
+            return None
+        entry = json.loads(row['entry'])
+        entry['match'] = row['match_id']
+        if row['opponent'] is not None:
+            entry['opponent'] = row['opponent']
+        if row['map'] is not None:
+            entry['map'] = row['map']
+        return entry
+
+    def latest(self) -> Optional[dict]:
+        """The last entry of results.json as ingested, or None."""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM results ORDER BY position DESC LIMIT 1').fetchone()
+        return self._row(row)
+
+    def get(self, match_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute('SELECT * FROM results WHERE match_id = ?', (match_id,)).fetchone()
+        return self._row(row)
+
+    def next_match_id(self) -> int:
+        """One past the last ingested match id (1 when there are none)."""
+        with self._lock:
+            row = self._db.execute('SELECT match_id FROM results ORDER BY position DESC LIMIT 1').fetchone()
+        return row['match_id'] + 1 if row else 1
+
+    def annotate(self, match_id: int, bot: str | None = None, opponent: str | None = None,
+                 map_name: str | None = None, race: str | None = None) -> None:
+        """Record who played where (and the opponent's race), for entries results.json leaves without them."""
+        with self._lock, self._db:
+            self._db.execute('UPDATE results SET bot = COALESCE(?, bot), opponent = COALESCE(?, opponent), '
+                             'map = COALESCE(?, map), race = COALESCE(?, race) WHERE match_id = ?',
+                             (bot, opponent, map_name, race, match_id))
+
+    def rebuild_stats(self) -> int:
+        """Ingest anything new from results.json, then recompute the leaderboard in one pass."""
+        self.refresh()
+        return self.leaderboard.rebuild()
+
+    def history(self, opponent: str | None = None, map_name: str | None = None,
+                limit: int = 10) -> List[dict]:
+        """Most recent results first, optionally for one opponent and/or map (prefix match)."""
+        clauses, params = [], []
+        if opponent:
+            clauses.append('opponent = ?')
+            params.append(opponent)
+        if map_name:
+            clauses.append("map LIKE ? ESCAPE '\\'")
+            params.append(map_name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._db.execute(f'SELECT * FROM results {where} ORDER BY match_id DESC LIMIT ?',
+                                    (*params, limit)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,152 @@
+"""
+Duplicate-message rollup and per-source rate limiting for LogMonitor.
+
+Bots print many messages every step. ``LogRollup`` passes the first of a run
+of identical ``(source_file, line_number, message)`` records straight on, and
+folds the repeats seen within a window of game steps into one record carrying
+``repeat_count``, ``first_game_step`` and ``last_game_step``. So a line is
+shipped in order with the lines around it (tracebacks included), and only the
+repeats arrive later. ``SourceRateLimiter`` then applies an optional token
+bucket per ``source_file``.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from .parser import DebugRecord
+
+RollupKey = Tuple[str, int, str]
+
+
+class RollupEntry:
+    """Repeats of a shipped record: ``repeat_count`` of them, ``record`` is the latest.
+
+    ``first_game_step`` is the step of the shipped first occurrence.
+    """
+    __slots__ = ('record', 'repeat_count', 'first_game_step', 'last_game_step', 'opened_at')
+
+    def __init__(self, record: DebugRecord, opened_at: float):
+        self.record = record
+        self.repeat_count = 0
+        self.first_game_step = record.game_step
+        self.last_game_step = record.game_step
+        self.opened_at = opened_at
+
+
+class LogRollup:
+    """Group identical records within a sliding window of game steps."""
+
+    def __init__(self, window_steps: int = 224, max_age: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window_steps = window_steps
+        # Wall-clock bound so the last groups of a match are not held forever
+        self.max_age = max_age
+        self.clock = clock
+        # Insertion order is first_game_step order, so expiry only looks at the front
+        self._groups: 'OrderedDict[RollupKey, RollupEntry]' = OrderedDict()
+        self._last_step = -1
+        self.records_in = 0
+        self.records_out = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._groups)
+
+    def add(self, record: DebugRecord) -> Tuple[List[RollupEntry], bool]:
+        """Add a record; return the repeats whose window has closed, and whether to ship ``record`` now.
+
+        The closed repeats come before ``record`` and are shipped first.
+        """
+        self.records_in += 1
+        step = record.game_step
+        closed: List[RollupEntry] = []
+        if step < self._last_step:
+            # Step counter went backwards: a new match started
+            closed = self.flush()
+        self._last_step = step
+        groups = self._groups
+        if groups:
+            limit = step - self.window_steps
+            while groups:
+                entry = next(iter(groups.values()))
+                if entry.first_game_step > limit:
+                    break
+                groups.popitem(last=False)
+                if entry.repeat_count:
+                    closed.append(entry)
+                    self.records_out += 1
+        key = (record.source_file, record.line_number, record.message)
+        entry = groups.get(key)
+        if entry is None:
+            groups[key] = RollupEntry(record, self.clock())
+            self.records_out += 1
+            return closed, True
+        entry.record = record
+        entry.repeat_count += 1
+        entry.last_game_step = step
+        return closed, False
+
+    def expire(self) -> List[RollupEntry]:
+        """Close groups that have been open longer than ``max_age`` seconds."""
+        groups = self._groups
+        limit = self.clock() - self.max_age
+        closed = []
+        while groups:
+            entry = next(iter(groups.values()))
+            if entry.opened_at > limit:
+                break
+            groups.popitem(last=False)
+            if entry.repeat_count:
+                closed.append(entry)
+        self.records_out += len(closed)
+        return closed
+
+    def flush(self) -> List[RollupEntry]:
+        """Close every open group."""
+        closed = [entry for entry in self._groups.values() if entry.repeat_count]
+        self._groups.clear()
+        self.records_out += len(closed)
+        return closed
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, up to ``burst``."""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def allow(self, now: float) -> bool:
+        tokens = self.tokens + (now - self.updated) * self.rate
+        self.tokens = tokens if tokens < self.burst else self.burst
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class SourceRateLimiter:
+    """One token bucket per source_file."""
+
+    def __init__(self, rate: float, burst: float | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.dropped: Dict[str, int] = {}
+
+    def allow(self, source_file: str) -> bool:
+        now = self.clock()
+        bucket = self._buckets.get(source_file)
+        if bucket is None:
+            bucket = self._buckets[source_file] = TokenBucket(self.rate, self.burst, now)
+        if bucket.allow(now):
+            return True
+        self.dropped[source_file] = self.dropped.get(source_file, 0) + 1
+        return False
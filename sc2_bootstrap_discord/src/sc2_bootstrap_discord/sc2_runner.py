@@ -1,104 +1,575 @@
-from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import List, Set, Tuple
 import random
 import json
+import logging
+import threading
 import discord
 import asyncio
 import os
+from .archive import LogArchive
+from .detector import SlowStepAlert
+from .farm import FarmCoordinator
+from .journal import BUMP, CANCEL, FINISH, QUEUE, START, QueueJournal
 from .log_monitor import LogMonitor
+from .results import ResultsFile, ResultsStore, append_results
+from .scheduler import DEFAULT_PRIORITY, MIN_PRIORITY, MatchScheduler
+from .step_index import parse_game_time
+from .workers import SC2Match, ResultsMerger, Worker, bot_exe_type, bot_info, make_workers, match_string
 
-SC2Match = namedtuple('SC2Match', ['map', 'bot1', 'bot2', 'priority'])
+DISCORD_MESSAGE_LIMIT = 2000
+# local-bootstrap plays bot1, our bot, under this controller
+BOT_CONTROLLER = 'bot_controller1'
 
 class Sc2Runner(discord.Client):
     def __init__(self, bot_name: str, graylog_host: str | None = None, graylog_port: int = 12201, 
-                 log_file_path: str | None = None, *args, **kwargs):
+                 log_file_path: str | None = None, gelf_transport: str = 'udp',
+                 gelf_options: dict | None = None, log_options: dict | None = None,
+                 archive_options: dict | None = None, results_options: dict | None = None,
+                 compose_command: str | None = None, workers: List[str] | None = None,
+                 concurrency: int | None = None, farm_options: dict | None = None,
+                 queue_journal: str | None = 'queue.journal', match_executor: str = 'compose',
+                 executor_options: dict | None = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.bot_name = bot_name
-        self.match_queue = []
+        # Priority heap, taking turns between requesters
+        self.match_queue = MatchScheduler()
         self.queue_task = None
-        self.current_match = None
+        # Set whenever a match is queued or a worker or farm agent frees up; process_queue waits on it
+        self.queue_changed = asyncio.Event()
+        self.paused = False
         self.channel_id = None
+        # Same logger as LogMonitor and LogArchive, so these reach stdout and Graylog too
+        self.logger = logging.getLogger('starcraft_bot_controller')
         
         # Initialize log monitor if Graylog is configured
         if graylog_host and log_file_path:
-            self.log_monitor = LogMonitor(log_file_path, graylog_host, graylog_port)
-            self.log_monitor.start_monitoring()
+            self.log_monitor = LogMonitor(log_file_path, graylog_host, graylog_port,
+                                          transport=gelf_transport, transport_options=gelf_options,
+                                          **(log_options or {}))
+            self.log_monitor.on_slow_step = self._on_slow_step
         else:
             self.log_monitor = None
+        # Start of the rate window !logstats reports
+        self._log_stats_mark: Tuple[int, float] | None = None
+        # Cut and compress each match's logs into an archive directory
+        # (e.g. {'directory': 'archive', 'keep_matches': 100})
+        if self.log_monitor and archive_options is not None:
+            self.log_archive = LogArchive(**archive_options)
+        else:
+            self.log_archive = None
+        # results.json indexed into SQLite (e.g. {'db_path': 'results.db'})
+        self.results = ResultsStore(**(results_options or {}))
+        # The last result is read from the tail of results.json itself
+        self.results_file = ResultsFile(self.results.results_path)
+        # Every file and database access from a handler runs here, off the Discord loop
+        self.io_executor = ThreadPoolExecutor(max_workers=4 + len(workers or ()), thread_name_prefix='sc2-io')
+        # Isolated local-bootstrap directories playing side by side (default: just this one,
+        # writing the main results.json). {project} in compose_command is each worker's name.
+        # match_executor 'warm' keeps environments started ahead (e.g. {'command': ..., 'size': 2});
+        # 'docker' runs the containers over the Docker Engine API (e.g. {'services': 'services.json'})
+        self.workers = make_workers(workers, compose_command, self.results.results_path, self.io_executor,
+                                    match_executor, executor_options)
+        for worker in self.workers:
+            # The docker executor ships container output straight to the log monitor
+            worker.match_executor.log_monitor = self.log_monitor
+        # 0 leaves every match to the farm
+        self.concurrency = min(len(self.workers) if concurrency is None else concurrency, len(self.workers))
+        # Worker results go into the main results.json in match-id order
+        self.merger = ResultsMerger()
+        # Appends happen one at a time, on whichever pool thread, in the order released
+        self._merge_lock = asyncio.Lock()
+        self._last_match_id = 0
+        # Ids are assigned on whichever pool thread
+        self._match_id_lock = threading.Lock()
+        self.match_tasks: Set[asyncio.Task[None]] = set()
+        # Agents on other machines take matches when no local worker is free
+        # (e.g. {'host': '0.0.0.0', 'port': 8765}); started in setup_hook
+        self.farm = FarmCoordinator(**farm_options) if farm_options is not None else None
+        if self.farm:
+            self.farm.on_free = self.queue_changed.set
+        if self.log_monitor:
+            # A match is over when its result or game-result log line appears, not when compose exits
+            self.log_monitor.on_game_result = self._on_game_result
+        # The queue survives restarts; None keeps it in memory only
+        self.journal = QueueJournal(queue_journal) if queue_journal else None
+        self._journal_flushing = False
+        if self.journal:
+            self._restore_queue()
+
+    def _restore_queue(self) -> None:
+        """Queue again what the journal says was queued or in flight, under the same tickets."""
+        records = self.journal.replay()
+        for ticket, fields, match_id in records:
+            self.match_queue.push(SC2Match(*fields), ticket)
+            if match_id is not None:
+                self.logger.info(f"Match #{ticket} was in flight as match {match_id}; queued again")
+        self.match_queue.next_ticket = max(self.match_queue.next_ticket, self.journal.next_ticket)
+        if records:
+            self.logger.info(f"Restored {len(records)} queued matches from {self.journal.path}")
+
+    def _journal(self, op: str, ticket: int | None, **fields) -> None:
+        """Note a queue change; the I/O pool writes it out, batched with any others."""
+        if self.journal is None or ticket is None:
+            return
+        self.journal.record(op, ticket, **fields)
+        if not self._journal_flushing:
+            self._journal_flushing = True
+            self.io_executor.submit(self._flush_journal)
+
+    def _flush_journal(self) -> None:
+        # Cleared first: anything recorded from here on is either in this flush or schedules the next
+        self._journal_flushing = False
+        self.journal.flush()
+
+    async def _io(self, func, *args):
+        """Run blocking ``func(*args)`` on the I/O pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, partial(func, *args))
 
     def _get_next_match_id(self) -> int:
         """Get the next match ID by incrementing the last match's 'match' field from results.json."""
-        try:
-            with open('results.json', 'r') as f:
-                results = json.load(f)
-                last_match = results['results'][-1]
-                return last_match.get('match', 0) + 1
-        except (FileNotFoundError, json.JSONDecodeError, IndexError, KeyError):
-            return 1
+        return self.results_file.next_match_id()
+
+    def _assign_match_id(self, worker: Worker | None = None) -> int:
+        """The next match id, past results.json and every match already handed out (None: the farm).
+
+        Every path reserves its id here, the shared worker's included, so a farm
+        job started while the shared worker plays cannot get the same one.
+        """
+        with self._match_id_lock:
+            self._last_match_id = max(self._get_next_match_id(), self._last_match_id + 1)
+            return self._last_match_id
+
+    def _record_result(self, match_id: int, match: SC2Match) -> None:
+        """Ingest new results, note who played where and add the result to the leaderboard."""
+        self.results.refresh()
+        self.results.annotate(match_id, match.bot1, match.bot2, match.map,
+                              self._get_bot_info(match.bot2).get('Race'))
+        self.results.leaderboard.record(match_id)
+
+    def _prepare_stats(self) -> None:
+        """Build the leaderboard from results.json if this database has none yet."""
+        self.results.refresh()
+        if self.results.leaderboard.is_empty():
+            self.results.leaderboard.rebuild()
+
+    async def last_result(self) -> dict | None:
+        """The last entry of results.json."""
+        return await self._io(self.results_file.last)
+
+    def queue_match(self, opponent: str, map_name: str, priority: int = DEFAULT_PRIORITY,
+                    requester: str | None = None) -> int:
+        """Queue a match against the specified opponent on the specified map; returns its ticket."""
+        match = SC2Match(map_name, self.bot_name, opponent, priority, requester)
+        ticket = self.match_queue.push(match)
+        self._journal(QUEUE, ticket, match=list(match))
+        self.queue_changed.set()
+        return ticket
+
+    def bump_match(self, ticket: int, priority: int | None = None) -> str:
+        """Move a queued match to ``priority`` (default: one level up) and say where it now stands."""
+        match = self.match_queue.get(ticket)
+        if match is None:
+            return f"No match #{ticket} in the queue."
+        priority = max(match.priority - 1, MIN_PRIORITY) if priority is None else priority
+        self.match_queue.bump(ticket, priority)
+        self._journal(BUMP, ticket, match=list(self.match_queue.get(ticket)))
+        position = next(n for n, (queued, _) in enumerate(self.match_queue.queued(), 1) if queued == ticket)
+        return f"Match #{ticket} against {match.bot2} is now priority {priority}, {position} of {len(self.match_queue)} in the queue."
+
+    def cancel_match(self, ticket: int) -> str:
+        """Take a match out of the queue."""
+        match = self.match_queue.remove(ticket)
+        if match is None:
+            return f"No match #{ticket} in the queue."
+        self._journal(CANCEL, ticket)
+        return f"Match #{ticket} against {match.bot2} on {match.map} cancelled."
 
-    def queue_match(self, opponent: str, map_name: str) -> None:
-        """Queue a match against the specified opponent on the specified map."""
-        self.match_queue.append(SC2Match(map_name, self.bot_name, opponent, 3))
+    def queue_status(self, limit: int = 20) -> str:
+        """Format the queued matches in the order they will be played."""
+        queued = self.match_queue.queued()
+        if not queued:
+            return "The queue is empty." + (" Paused." if self.paused else '')
+        lines = [f"**Queue:** {len(queued)} matches" + (" (paused)" if self.paused else '')]
+        for ticket, match in queued[:limit]:
+            by = f" for {match.requester}" if match.requester else ''
+            lines.append(f"#{ticket} {match.bot2} on {match.map} (priority {match.priority}{by})")
+        if len(queued) > limit:
+            lines.append(f"... and {len(queued) - limit} more")
+        return '\n'.join(lines)[:DISCORD_MESSAGE_LIMIT]
+
+    @property
+    def running(self) -> List[Worker]:
+        """Workers with a match in progress."""
+        return [worker for worker in self.workers if worker.busy]
+
+    def _free_worker(self) -> Worker | None:
+        if len(self.running) >= self.concurrency:
+            return None
+        return next((worker for worker in self.workers if not worker.busy), None)
 
     async def process_queue(self) -> None:
-        """Process the match queue."""
+        """Hand queued matches to free workers, up to ``concurrency`` at once, then to the farm."""
         while True:
-            if self.match_queue:
-                match = self.match_queue.pop(0)
-                self.current_match = match
-                await self.do_match(match)
-                print(f'Match ended: {match}')
-                await self.report_result(match)
-                self.current_match = None                
-                
-            await asyncio.sleep(3)  # Sleep to prevent tight loop
-
-    async def report_result(self, match: SC2Match) -> None:
+            # Cleared first, so a change made while dispatching is not missed
+            self.queue_changed.clear()
+            if await self._dispatch():
+                continue
+            await self.queue_changed.wait()
+
+    async def _dispatch(self) -> bool:
+        """Start the next queued match if a local worker or a farm agent is free."""
+        if self.paused or not self.match_queue:
+            return False
+        worker = self._free_worker()
+        if worker is not None:
+            ticket, match = self.match_queue.popitem()
+            await self.start_match(worker, match, ticket)
+            return True
+        if self.farm is not None and self.farm.free_capacity() > 0:
+            ticket, match = self.match_queue.popitem()
+            await self.start_remote(match, ticket)
+            return True
+        return False
+
+    def _track(self, coro) -> asyncio.Task[None]:
+        task = asyncio.create_task(coro)
+        self.match_tasks.add(task)
+        task.add_done_callback(self._match_done)
+        return task
+
+    def _match_done(self, task: asyncio.Task[None]) -> None:
+        self.match_tasks.discard(task)
+        # Its worker is free
+        self.queue_changed.set()
+
+    def pause(self) -> None:
+        """Stop starting queued matches; running ones carry on."""
+        self.paused = True
+
+    def resume(self) -> None:
+        """Start queued matches again."""
+        self.paused = False
+        self.queue_changed.set()
+
+    async def drain(self) -> None:
+        """Pause, then wait until every running match has reported and its containers are gone."""
+        self.pause()
+        while self.match_tasks:
+            await asyncio.wait(set(self.match_tasks))
+        for worker in self.workers:
+            await worker.wait_teardown()
+
+    async def start_match(self, worker: Worker, match: SC2Match, ticket: int | None = None) -> asyncio.Task[None]:
+        """Give ``match`` the next match id and play it on ``worker`` in the background."""
+        match_id = await self._io(self._assign_match_id, worker)
+        worker.match, worker.match_id = match, match_id
+        if not worker.shared:
+            # The shared worker writes the main results.json itself, past the merger
+            self.merger.expect(match_id)
+        self._journal(START, ticket, match_id=match_id)
+        return self._track(self._play(worker, match, match_id, ticket))
+
+    async def start_remote(self, match: SC2Match, ticket: int | None = None) -> asyncio.Task[None]:
+        """Give ``match`` the next match id and play it on a farm agent in the background."""
+        # Taken before the first await so _dispatch cannot hand the farm more than it can run
+        self.farm.reserve()
+        try:
+            match_id = await self._io(self._assign_match_id, None)
+        except BaseException:
+            self.farm.release()
+            raise
+        self.merger.expect(match_id)
+        self._journal(START, ticket, match_id=match_id)
+        return self._track(self._play_remote(match, match_id, ticket))
+
+    async def _play(self, worker: Worker, match: SC2Match, match_id: int, ticket: int | None = None) -> None:
+        try:
+            await self.do_match(match, worker, match_id)
+            print(f'Match ended: {match}')
+            await self.report_result(match, worker)
+        except Exception as e:
+            self.logger.warning(f'Match {match_id} on {worker.name} failed: {e!r}')
+            if not worker.shared:
+                # Don't hold back the results of later matches
+                await self._merge(worker, match_id, None, match)
+        finally:
+            worker.match = None
+        # Not reached when cancelled at shutdown, so the match is queued again on restart
+        self._journal(FINISH, ticket)
+
+    async def _play_remote(self, match: SC2Match, match_id: int, ticket: int | None = None) -> None:
+        try:
+            # Takes over the slot start_remote reserved
+            result = self.farm.submit(match_id, match, reserved=True)
+            if self.channel_id:
+                channel = self.get_channel(self.channel_id)
+                await channel.send(f"Match {match_id} sent to the farm: {match.bot1} vs {match.bot2} on map {match.map}")
+            reply = await result
+            entry = reply.get('entry')
+            if reply.get('error'):
+                self.logger.warning(f"Match {match_id} failed on {reply['agent']}: {reply['error']}")
+            if entry is not None:
+                entry['match'] = match_id
+                entry['worker'] = f"{reply['agent']}/{reply.get('worker')}"
+            await self._merge(None, match_id, entry, match)
+            await self._post_result(match, match_id, entry, reply.get('summary'))
+        except Exception as e:
+            self.logger.warning(f'Match {match_id} on the farm failed: {e!r}')
+            await self._merge(None, match_id, None, match)
+        self._journal(FINISH, ticket)
+
+    async def _merge(self, worker: Worker | None, match_id: int, entry: dict | None, match: SC2Match) -> None:
+        """Record a result (worker None: from the farm); the main results.json and the leaderboard take them in match order."""
+        if worker is not None and worker.shared:
+            # Already in the main results.json
+            if entry is not None and 'match' in entry:
+                await self._io(self._record_result, entry['match'], match)
+            return
+        async with self._merge_lock:
+            ready = self.merger.add(match_id, dict(entry) if entry is not None else None, match)
+            if ready:
+                await self._io(self._merge_results, ready)
+
+    def _merge_results(self, ready: list) -> None:
+        append_results(self.results.results_path, [entry for entry, _ in ready])
+        for entry, match in ready:
+            self._record_result(entry['match'], match)
+
+    async def report_result(self, match: SC2Match, worker: Worker | None = None) -> None:
         """Report match results to Discord."""
-        match_results = self._get_results_json()[-1]
+        worker = worker or self.workers[0]
+        if worker.process is not None:
+            # Posted as soon as the entry is written, while the containers stop
+            match_results = await worker.completion.result(worker.process)
+        else:
+            match_results = await self.last_result()
+        if match_results is not None and not worker.shared:
+            # The worker's own numbering gives way to the global match id
+            match_results['match'] = worker.match_id
+            match_results['worker'] = worker.name
+        await self._merge(worker, worker.match_id, match_results, match)
+        await self._post_result(match, worker.match_id, match_results)
+
+    async def _post_result(self, match: SC2Match, match_id: int, match_results: dict | None,
+                           summary: dict | None = None) -> None:
+        if match_results is None:
+            return
         match_results['opponent'] = match.bot2
         match_results['map'] = match.map
+        if summary is None and self.log_monitor:
+            # Step-time percentiles and peak supply from the parsed bot log
+            summary = self.log_monitor.match_summary(match_id, match.bot1)
+        if summary:
+            match_results['bot_stats'] = summary
         formatted_results = f"**Match Results:**\n```json\n{json.dumps(match_results, indent=4)}\n```"        
         if self.channel_id:
             channel = self.get_channel(self.channel_id)
             await channel.send(formatted_results)
 
-    async def do_match(self, match: SC2Match) -> None:
-        """Execute a match."""
-        # Retrieve the current match ID from results.json
-        current_match_id = self._get_next_match_id()
+    async def do_match(self, match: SC2Match, worker: Worker | None = None,
+                       match_id: int | None = None) -> None:
+        """Execute a match; returns once it is over, leaving teardown to run in the background."""
+        worker = worker or self.workers[0]
+        if match_id is None:
+            match_id = await self._io(self._assign_match_id, worker)
+        bot_type = await self._io(self._get_bot_exe_type, match.bot2)
+        line = match_string(match, bot_type)
+        await self._io(worker.write_matches_file, line)
+        # The match is ready; the worker's last containers may still be stopping
+        await worker.wait_teardown()
+        worker.match, worker.match_id = match, match_id
         if self.log_monitor:
-            self.log_monitor.current_match_id = current_match_id
+            await self.log_monitor.set_match(match_id, worker.log_directory)
         # Send a status update to Discord
         if self.channel_id:
             channel = self.get_channel(self.channel_id)
-            await channel.send(f"Match {current_match_id} started: {match.bot1} vs {match.bot2} on map {match.map}")
-        
-        matchString = f"1,{match.bot1},T,python,2,{match.bot2},T,{self._get_bot_exe_type(match.bot2)},{match.map}"
-        with open("matches", "w") as f:
-            f.write(f"{matchString}")
-        command = f'docker-compose -f docker-compose-host-network.yml up'
-        process = await asyncio.create_subprocess_shell(command, shell=True, executable='/bin/bash')
-        await process.communicate()
-
-    def _get_results_json(self) -> list:
-        """Get results from results.json file."""
-        with open('results.json', 'r') as results_file:
-            return json.load(results_file)['results']
-        
+            where = '' if worker.shared else f' ({worker.name})'
+            await channel.send(f"Match {match_id} started{where}: {match.bot1} vs {match.bot2} on map {match.map}")
+
+        process = await worker.launch(line)
+        finished_by = await worker.completion.wait(process)
+        self.logger.info(f'Match {match_id} finished on {worker.name} ({finished_by})')
+        worker.teardown_task = asyncio.create_task(self._teardown(worker, process, match_id))
+
+    async def _teardown(self, worker: Worker, process, match_id: int) -> None:
+        """Wait for the executor to stop a finished match's containers, then archive its logs."""
+        await worker.teardown(process)
+        if self.log_archive:
+            # Compression runs on the archive's thread while the next match starts
+            self.log_archive.submit(match_id, await self.log_monitor.cut_logs(worker.log_directory))
+
+    def _on_game_result(self, match_id: int | None, player_id: int, player: str, result: str) -> None:
+        """Pass a game-result log line to the worker playing that match."""
+        for worker in self.running:
+            if worker.match_id == match_id:
+                worker.completion.log_result(player_id, player, result)
+
+    def _on_slow_step(self, alert: SlowStepAlert) -> None:
+        """Post a slow-step alert; called from the log monitor's task."""
+        if not self.channel_id:
+            return
+        self.loop.create_task(self._send_slow_step_alert(alert))
+
+    async def _send_slow_step_alert(self, alert: SlowStepAlert) -> None:
+        """Send a slow-step alert to the match channel."""
+        bot = alert.bot_name or self.bot_name
+        message = (f":warning: **Slow steps** in match {alert.match_id} ({bot}): "
+                   f"p{alert.percentile} step time {alert.step_time_ms}ms over the last "
+                   f"{alert.window_steps} steps (threshold {alert.threshold_ms}ms)\n"
+                   f"Game time {alert.game_time} (step {alert.game_step}), "
+                   f"supply {alert.supply_used}/{alert.supply_capacity}, "
+                   f"last log `{alert.source_file}:{alert.line_number}`")
+        channel = self.get_channel(self.channel_id)
+        if channel:
+            await channel.send(message)
+
+    async def log_excerpt(self, match_id: int, game_time: str, lines: int = 20) -> str:
+        """Format the bot's log lines around ``game_time`` (mm:ss) in a match."""
+        if not self.log_monitor:
+            return "Log monitoring is not enabled."
+        game_seconds = parse_game_time(game_time)
+        # Index and mmap reads stay off the Discord loop
+        found = await self._io(self.log_monitor.log_excerpt, match_id, game_seconds,
+                               lines, self.bot_name, BOT_CONTROLLER)
+        if not found and self.log_archive:
+            found = await self._io(self.log_archive.log_excerpt, match_id, game_seconds,
+                                   lines, self.bot_name, BOT_CONTROLLER)
+        if not found:
+            return f"No indexed log for match {match_id}."
+        path, excerpt = found
+        header = f"`{path}` at {game_time} (match {match_id}):\n"
+        body = '\n'.join(excerpt)
+        # Stay inside Discord's 2000 character limit
+        body = body[:DISCORD_MESSAGE_LIMIT - len(header) - 8]
+        return f"{header}```\n{body}\n```"
+
+    def farm_status(self) -> str:
+        """Format the local workers and the farm's agents with what they are playing."""
+        lines = [f"**Local:** {len(self.running)}/{self.concurrency} running"
+                 + ''.join(f", {w.name}: {w.match_id}" for w in self.running)]
+        lines += [f"- {w.name}: {w.match_executor.status()}" for w in self.workers if w.match_executor.status()]
+        if self.farm is None:
+            return '\n'.join(lines)
+        agents = self.farm.status()
+        lines.append(f"**Farm** (port {self.farm.port}): {len(agents)} agents, "
+                     f"{len(self.farm.pending)} waiting, {self.farm.requeued} requeued")
+        for agent in agents:
+            lines.append(f"- {agent['name']}: {len(agent['running'])}/{agent['capacity']} running "
+                         f"{agent['running']}, {agent['completed']} done")
+        return '\n'.join(lines)[:DISCORD_MESSAGE_LIMIT]
+
+    def log_stats(self) -> str:
+        """Format the log pipeline's throughput and stage timings."""
+        stats = self.log_monitor.pipeline_stats(since=self._log_stats_mark) if self.log_monitor else None
+        if not stats:
+            return "Log monitoring is not enabled."
+        # "now" is the rate since the previous !logstats; the periodic summary keeps its own window
+        self._log_stats_mark = self.log_monitor.stats.mark()
+        lines = [
+            f"**Log pipeline:** {stats['lines']} lines, {stats['lines_per_sec']} lines/s now, "
+            f"{stats['lines_per_sec_avg']} avg",
+            f"Parse hit/miss: {stats['parse_hit_ratio']:.1%} / {stats['parse_miss_ratio']:.1%}",
+            f"Queue: {stats['queued']} now, {stats['max_queue_depth']} max; "
+            f"dropped {stats['dropped']}, failed {stats['failed']}, send errors {stats['send_errors']}",
+            "```",
+            f"{'stage':<6} {'count':>9} {'mean':>9} {'p50':>8} {'p99':>8} {'max':>9}",
+        ]
+        for stage in ('read', 'parse', 'build', 'send'):
+            h = stats[stage]
+            lines.append(f"{stage:<6} {h['count']:>9} {h['mean_us']:>7}us {h['p50_us']:>6.0f}us "
+                         f"{h['p99_us']:>6.0f}us {h['max_us']:>7}us")
+        lines.append("```")
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _standings_table(title: str, rows: list, key: str, limit: int = 15) -> list:
+        lines = [f"{title:<24} {'games':>5} {'W':>4} {'L':>4} {'T':>3} {'win%':>6}"]
+        for row in rows[:limit]:
+            lines.append(f"{str(row[key])[:24]:<24} {row['games']:>5} {row['wins']:>4} {row['losses']:>4} "
+                         f"{row['ties']:>3} {row['win_rate']:>6.1%}")
+        if len(rows) > limit:
+            lines.append(f"... {len(rows) - limit} more")
+        return lines
+
+    def _format_stats(self, opponent: str | None = None) -> str:
+        board = self.results.leaderboard
+        bot = self.bot_name
+        totals = board.totals(bot, opponent)
+        if not totals['games']:
+            return f"No recorded results for {bot}{f' against {opponent}' if opponent else ''}."
+
+        def rated(name):
+            rating = board.rating(name)
+            return f"Elo {rating['rating']}" if rating else "unrated"
+
+        record = f"{totals['wins']}-{totals['losses']}-{totals['ties']}"
+        if opponent:
+            lines = [f"**{bot} vs {opponent}**: {totals['games']} games, {totals['win_rate']:.1%} ({record}); "
+                     f"{bot} {rated(bot)}, {opponent} {rated(opponent)}", "```"]
+            lines += self._standings_table('map', board.by_map(bot, opponent), 'map')
+        else:
+            lines = [f"**{bot}**: {totals['games']} games, {totals['win_rate']:.1%} ({record}), {rated(bot)}",
+                     "```"]
+            lines += self._standings_table('opponent', board.by_opponent(bot), 'opponent')
+            lines.append('')
+            lines += self._standings_table('opponent race', board.by_race(bot), 'race')
+        lines.append("```")
+        return '\n'.join(lines)[:DISCORD_MESSAGE_LIMIT]
+
+    def _format_map_stats(self) -> str:
+        rows = self.results.leaderboard.by_map(self.bot_name)
+        if not rows:
+            return f"No recorded results for {self.bot_name}."
+        lines = [f"**{self.bot_name} by map:**", "```"] + self._standings_table('map', rows, 'map', 25) + ["```"]
+        return '\n'.join(lines)[:DISCORD_MESSAGE_LIMIT]
+
+    async def stats(self, opponent: str | None = None) -> str:
+        """Format win rates and Elo, overall (by opponent and race) or against one opponent (by map)."""
+        return await self._io(self._format_stats, opponent)
+
+    async def map_stats(self) -> str:
+        """Format win rates by map."""
+        return await self._io(self._format_map_stats)
+
+    async def history(self, opponent: str | None = None, map_name: str | None = None,
+                      limit: int = 10) -> str:
+        """Format the most recent results, optionally against one opponent and/or on one map."""
+        await self._io(self.results.refresh)
+        rows = await self._io(self.results.history, opponent, map_name, limit)
+        scope = ''.join(part for part in (f" vs {opponent}" if opponent else '',
+                                          f" on {map_name}" if map_name else ''))
+        if not rows:
+            return f"No results{scope}."
+        lines = [f"**History{scope}** (last {len(rows)}):", "```"]
+        for row in rows:
+            lines.append(f"#{row['match']:<5} {row.get('opponent') or '?':<20} {row.get('map') or '?':<24} "
+                         f"{row.get('result') or '?':<12} {row.get('game_time_formatted') or ''}")
+        lines.append("```")
+        return '\n'.join(lines)[:DISCORD_MESSAGE_LIMIT]
+
+    def _get_bot_info(self, bot_name: str) -> dict:
+        """The bot's entry in its ladderbots.json (Race, Type, ...), or {}."""
+        return bot_info(bot_name)
+
     def _get_bot_exe_type(self, bot_name: str) -> str:
         """Get the executable type for a bot."""
-        ladderbots_type = {"BinaryCpp": "cpplinux", "Python": "python", "DotNetCore": "dotnetcore"}
-        try:
-            with open(f'bots/{bot_name}/ladderbots.json', 'r') as results_file:
-                bot_info = json.load(results_file)
-                bot_type = bot_info['Bots'][bot_name]['Type']
-                return ladderbots_type[bot_type]
-        except FileNotFoundError:
-            return "python"
+        return bot_exe_type(bot_name)
 
     async def setup_hook(self) -> None:
         """Set up the Discord bot hook."""
+        if self.log_monitor:
+            # Tail logs on the client's own loop, alongside the match queue
+            await self.log_monitor.start()
+        if self.farm:
+            await self.farm.start()
+        for worker in self.workers:
+            # Warm pools start their environments now
+            await worker.match_executor.start()
+        # One streaming pass over existing results if the leaderboard is new
+        self.loop.create_task(self._io(self._prepare_stats))
         self.queue_task = self.loop.create_task(self.process_queue())  
 
     async def find_channel_id(self, channel_name: str) -> None:
@@ -115,5 +586,15 @@ class Sc2Runner(discord.Client):
     async def close(self) -> None:
         """Clean up resources when the client is closing."""
         if self.log_monitor:
-            self.log_monitor.stop_monitoring()
+            await self.log_monitor.aclose()
+        if self.log_archive:
+            await self._io(self.log_archive.close)
+        if self.farm:
+            await self.farm.close()
+        for worker in self.workers:
+            await worker.match_executor.close()
+        if self.journal:
+            await self._io(self.journal.close)
+        await self._io(self.results.close)
+        self.io_executor.shutdown(wait=False)
         await super().close() 
\ No newline at end of file
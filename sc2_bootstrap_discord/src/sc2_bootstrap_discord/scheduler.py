@@ -0,0 +1,186 @@
+"""
+The match queue: priorities, turns between requesters, and aging.
+
+Priorities run from 1 (most urgent) to 5; ``!match`` queues at 3. Time is
+counted in dispatches (``clock``). A match's key is
+
+    key = start + priority * aging
+
+where ``start`` is when the match was queued, or, if later, the dispatch after
+its requester's previous match. So a requester with a long backlog gets one
+turn for every match the others queued in the meantime. Their whole backlog
+behaves like a single match that is queued again each time one of them runs,
+and everyone else's matches keep their place. Each level of priority costs
+``aging`` dispatches. A less urgent match overtakes anything queued that many
+dispatches after it, so it is never starved.
+
+Each requester has a heap of their own matches. A second heap holds the next
+match of every requester. Queueing, dispatching, ``bump`` and ``remove`` each
+cost a few O(log n) heap operations. A bumped or removed match's old entry is
+left in place and marked dead. Dead entries are skipped at the top of a heap
+and dropped once they outnumber the live ones.
+"""
+
+import heapq
+from typing import Any, Dict, List, Tuple
+
+MIN_PRIORITY = 1
+MAX_PRIORITY = 5
+DEFAULT_PRIORITY = 3
+# Dispatches a match waits per level of priority
+DEFAULT_AGING = 10
+
+# A requester's match entry: [key, ticket, serial, queued_at, match]; match None when dead.
+# A head entry in the shared heap: [key, ticket, serial, requester].
+# serial keeps entries with the same key and ticket (before and after a bump) apart.
+_KEY, _TICKET, _SERIAL, _QUEUED_AT, _MATCH = range(5)
+_REQUESTER = 3
+
+
+class MatchScheduler:
+    """Queued matches by priority, taking turns between requesters, with aging."""
+
+    def __init__(self, aging: int = DEFAULT_AGING):
+        self.aging = aging
+        self.clock = 0
+        # requester -> heap of their match entries
+        self.queues: Dict[Any, List[list]] = {}
+        # The next match of each requester, and which of these entries is current
+        self.heap: List[list] = []
+        self.heads: Dict[Any, list] = {}
+        # requester -> the earliest start of their next match
+        self.turns: Dict[Any, int] = {}
+        # ticket -> live match entry
+        self.entries: Dict[int, list] = {}
+        self.dead = 0
+        self.next_ticket = 1
+        self.serial = 0
+
+    def push(self, match: Any, ticket: int | None = None) -> int:
+        """Queue ``match`` at its ``priority`` for its ``requester``; returns its ticket (or keeps ``ticket``)."""
+        check_priority(match.priority)
+        if ticket is None:
+            ticket = self.next_ticket
+        self.next_ticket = max(self.next_ticket, ticket + 1)
+        self._add(ticket, self.clock, match)
+        self._schedule(match.requester)
+        return ticket
+
+    def pop(self) -> Any:
+        """Take the next match off the queue; IndexError when it is empty."""
+        return self._pop()[1]
+
+    def popitem(self) -> Tuple[int, Any]:
+        """Take the next (ticket, match) off the queue; IndexError when it is empty."""
+        return self._pop()
+
+    def get(self, ticket: int) -> Any:
+        """The queued match with ``ticket``, or None."""
+        entry = self.entries.get(ticket)
+        return entry[_MATCH] if entry is not None else None
+
+    def bump(self, ticket: int, priority: int) -> bool:
+        """Move a queued match to ``priority``: ``aging`` dispatches earlier per level; False if not queued."""
+        entry = self.entries.get(ticket)
+        if entry is None:
+            return False
+        check_priority(priority)
+        match = entry[_MATCH]
+        if priority != match.priority:
+            entry[_MATCH] = None
+            self.dead += 1
+            self._add(ticket, entry[_QUEUED_AT], match._replace(priority=priority))
+            self._schedule(match.requester)
+            self._compact()
+        return True
+
+    def remove(self, ticket: int) -> Any:
+        """Take a queued match out of the queue; returns it, or None if it is not queued."""
+        entry = self.entries.pop(ticket, None)
+        if entry is None:
+            return None
+        match, entry[_MATCH] = entry[_MATCH], None
+        self.dead += 1
+        self._schedule(match.requester)
+        self._compact()
+        return match
+
+    def queued(self) -> List[Tuple[int, Any]]:
+        """(ticket, match) for every queued match, in dispatch order (replays dispatch on a copy)."""
+        replay = MatchScheduler(self.aging)
+        replay.clock = self.clock
+        replay.queues = {requester: list(queue) for requester, queue in self.queues.items()}
+        replay.heap = list(self.heap)
+        replay.heads = dict(self.heads)
+        replay.turns = dict(self.turns)
+        replay.entries = dict(self.entries)
+        return [replay._pop() for _ in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _add(self, ticket: int, queued_at: int, match: Any) -> None:
+        self.serial += 1
+        entry = [queued_at + match.priority * self.aging, ticket, self.serial, queued_at, match]
+        self.entries[ticket] = entry
+        heapq.heappush(self.queues.setdefault(match.requester, []), entry)
+
+    def _head(self, requester: Any) -> list | None:
+        """The requester's next live match entry, dropping dead ones off the top."""
+        queue = self.queues.get(requester)
+        while queue and queue[0][_MATCH] is None:
+            heapq.heappop(queue)
+            self.dead -= 1
+        if not queue:
+            self.queues.pop(requester, None)
+            return None
+        return queue[0]
+
+    def _schedule(self, requester: Any) -> None:
+        """Put the requester's next match in the shared heap, in place of their previous head."""
+        head = self._head(requester)
+        if head is None:
+            self.heads.pop(requester, None)
+            self.turns.pop(requester, None)
+            return
+        start = max(head[_QUEUED_AT], self.turns.get(requester, 0))
+        key = start + head[_MATCH].priority * self.aging
+        current = self.heads.get(requester)
+        if current is not None and current[_KEY] == key and current[_TICKET] == head[_TICKET]:
+            return
+        self.serial += 1
+        self.heads[requester] = entry = [key, head[_TICKET], self.serial, requester]
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > 2 * len(self.heads) + 16:
+            self.heap = list(self.heads.values())
+            heapq.heapify(self.heap)
+
+    def _pop(self) -> Tuple[int, Any]:
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            requester = entry[_REQUESTER]
+            if self.heads.get(requester) is not entry:
+                continue
+            del self.heads[requester]
+            match_entry = heapq.heappop(self.queues[requester])
+            del self.entries[match_entry[_TICKET]]
+            self.clock += 1
+            # Their next match waits for everything queued before now
+            self.turns[requester] = self.clock
+            self._schedule(requester)
+            return match_entry[_TICKET], match_entry[_MATCH]
+        raise IndexError('pop from an empty match queue')
+
+    def _compact(self) -> None:
+        """Drop dead match entries once they outnumber the live ones."""
+        if self.dead > len(self.entries) + 16:
+            for queue in self.queues.values():
+                queue[:] = [entry for entry in queue if entry[_MATCH] is not None]
+                heapq.heapify(queue)
+            self.dead = 0
+
+
+def check_priority(priority: int) -> int:
+    if not MIN_PRIORITY <= priority <= MAX_PRIORITY:
+        raise ValueError(f'Priority must be {MIN_PRIORITY} to {MAX_PRIORITY}, not {priority}')
+    return priority
@@ -0,0 +1,242 @@
+"""
+Non-blocking log shipping for LogMonitor.
+
+Records are handed to a bounded in-memory queue and a background sender thread
+batches them out to the stdout and GELF handlers, so a slow Graylog server or
+terminal never holds up the tail loop. Per-line payloads already encoded by
+``GelfEmitter`` share the queue as raw bytes and go to the GELF handlers as
+they are; other handlers only see them when ``echo`` is set.
+"""
+
+import logging
+import logging.handlers
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Sequence, Tuple, Union
+
+from .emitter import decode_record
+from .instrumentation import Histogram
+from .transports import GelfTransportHandler
+
+DROP_OLDEST = 'drop_oldest'
+DROP_DEBUG = 'drop_debug'
+# No blocking policy: submit runs on the Discord client's event loop
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_DEBUG)
+
+# Parsed bot log levels that count as debug output for the drop_debug policy
+DEBUG_LOG_LEVELS = frozenset({'DEBUG', 'Level 10'})
+
+# A LogRecord, or a GELF payload from GelfEmitter
+QueueItem = Union[logging.LogRecord, bytes]
+
+
+def is_debug_record(record: logging.LogRecord) -> bool:
+    """True for records the drop_debug policy may discard first."""
+    return record.levelno <= logging.DEBUG or getattr(record, 'log_level', None) in DEBUG_LOG_LEVELS
+
+
+class GelfShipper:
+    """Bounded queue plus a sender thread that ships records in batches."""
+
+    def __init__(self, handlers: Sequence[logging.Handler], maxsize: int = 10000,
+                 overflow: str = DROP_OLDEST, batch_size: int = 500,
+                 flush_interval: float = 0.2, echo: bool = True):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.handlers = list(handlers)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Decode raw payloads for the non-GELF handlers (e.g. stdout) as well
+        self.echo = echo
+        # Debug and other records are kept apart so drop_debug can find the
+        # oldest debug record in O(1); a sequence number restores the order.
+        self._debug: Deque[Tuple[int, QueueItem]] = deque()
+        self._other: Deque[Tuple[int, QueueItem]] = deque()
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self.submitted = 0
+        self.sent = 0
+        # Records in batches that no handler delivered
+        self.failed = 0
+        self.dropped = 0
+        self.send_errors = 0
+        self.batches = 0
+        # Time to ship one batch through every handler
+        self.send_time = Histogram()
+
+    @property
+    def queued(self) -> int:
+        return len(self._debug) + len(self._other)
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the shipping counters."""
+        return {
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'send_errors': self.send_errors,
+            'batches': self.batches,
+            'queued': self.queued,
+        }
+
+    def start(self) -> None:
+        """Start the sender thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='gelf-shipper', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush what is queued and stop the sender thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, record: logging.LogRecord) -> bool:
+        """Queue a record; returns False if a record was dropped to make room."""
+        return self._enqueue(record, is_debug_record(record))
+
+    def submit_raw(self, payload: bytes, debug: bool = False) -> bool:
+        """Queue an encoded GELF payload; ``debug`` marks it for the drop_debug policy."""
+        return self._enqueue(payload, debug)
+
+    def _enqueue(self, item: QueueItem, debug: bool) -> bool:
+        with self._cond:
+            self.submitted += 1
+            dropped = False
+            if self.queued >= self.maxsize:
+                if self.overflow == DROP_DEBUG and (self._debug or debug):
+                    if not self._debug:
+                        # Queue is full of non-debug records: drop the newcomer
+                        self.dropped += 1
+                        return False
+                    self._debug.popleft()
+                    self.dropped += 1
+                    dropped = True
+                if self.queued >= self.maxsize:
+                    self._drop_oldest()
+                    dropped = True
+            self._seq += 1
+            (self._debug if debug else self._other).append((self._seq, item))
+            self._cond.notify_all()
+        return not dropped
+
+    def _drop_oldest(self) -> None:
+        if self._debug and (not self._other or self._debug[0][0] < self._other[0][0]):
+            self._debug.popleft()
+        else:
+            self._other.popleft()
+        self.dropped += 1
+
+    def _take_batch(self) -> List[QueueItem]:
+        """Wait for records and pop up to batch_size of them in submission order."""
+        with self._cond:
+            if not self.queued and self._running:
+                self._cond.wait(self.flush_interval)
+            batch = []
+            debug, other = self._debug, self._other
+            while len(batch) < self.batch_size and (debug or other):
+                if debug and (not other or debug[0][0] < other[0][0]):
+                    batch.append(debug.popleft()[1])
+                else:
+                    batch.append(other.popleft()[1])
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._ship(batch)
+            elif not self._running:
+                return
+
+    def _ship(self, batch: List[QueueItem]) -> None:
+        """Send one batch through every handler; it counts as sent if any of them delivered it."""
+        started = time.perf_counter_ns()
+        records = None
+        delivered = False
+        for handler in self.handlers:
+            try:
+                if isinstance(handler, GelfTransportHandler):
+                    handler.ship_batch(batch)
+                    delivered = True
+                    continue
+                if records is None:
+                    records = self._records(batch)
+                if not records:
+                    # Raw payloads only, and no echo: nothing for this handler
+                    continue
+                if isinstance(handler, logging.handlers.SocketHandler):
+                    delivered |= self._ship_socket(handler, records)
+                    continue
+                if isinstance(handler, logging.StreamHandler):
+                    self._ship_stream(handler, records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+                delivered = True
+            except Exception:
+                self.send_errors += 1
+        if delivered:
+            self.sent += len(batch)
+        else:
+            self.failed += len(batch)
+        self.batches += 1
+        self.send_time.observe(time.perf_counter_ns() - started)
+
+    def _records(self, batch: List[QueueItem]) -> List[logging.LogRecord]:
+        """The batch as LogRecords: raw payloads are decoded if echoing, else left out."""
+        if not self.echo:
+            return [item for item in batch if not isinstance(item, bytes)]
+        return [decode_record(item) if isinstance(item, bytes) else item for item in batch]
+
+    def _ship_socket(self, handler: logging.handlers.SocketHandler,
+                     batch: List[logging.LogRecord]) -> bool:
+        # Serialise and send directly so failures are counted rather than
+        # printed by Handler.handleError for every record. True if none failed.
+        ok = True
+        for record in batch:
+            if record.levelno < handler.level:
+                continue
+            try:
+                handler.send(handler.makePickle(record))
+            except Exception:
+                self.send_errors += 1
+                ok = False
+                handler.close()
+        return ok
+
+    @staticmethod
+    def _ship_stream(handler: logging.StreamHandler, batch: List[logging.LogRecord]) -> None:
+        # One write and one flush per batch instead of per record
+        text = ''.join(handler.format(record) + handler.terminator
+                       for record in batch if record.levelno >= handler.level)
+        if text:
+            with handler.lock:
+                handler.stream.write(text)
+                handler.flush()
+
+
+class ShippingHandler(logging.Handler):
+    """Logging handler that hands records to a GelfShipper without blocking."""
+
+    def __init__(self, shipper: GelfShipper, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.shipper = shipper
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Records are formatted on the sender thread; resolve the message now
+        # so later mutation of args cannot change what is shipped.
+        record.msg = record.getMessage()
+        record.args = None
+        self.shipper.submit(record)
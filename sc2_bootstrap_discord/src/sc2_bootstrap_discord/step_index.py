@@ -0,0 +1,168 @@
+"""
+Sparse game-time index over bot logs, for jumping straight to a moment.
+
+While a log is tailed, ``StepIndex`` appends one fixed-size record per game
+second to a ``<log>.idx`` sidecar: match id, game step, game seconds and the
+byte offset of the first line at that time. ``StepIndex.lookup`` binary-searches
+the memory-mapped sidecar and ``read_excerpt`` memory-maps the log, so a lookup
+reads a few pages around the target whatever the size of the log.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .parser import DebugRecord, parse_debug_line
+
+# match id (0 = unknown), game step, game seconds, byte offset
+INDEX_RECORD = struct.Struct('<IIIQ')
+# Bytes scanned forward from an index entry to reach the exact second
+MAX_SCAN = 1024 * 1024
+
+
+def parse_game_time(text: str) -> int:
+    """'14:25' -> 865; raises ValueError for anything else."""
+    minutes, _, seconds = text.partition(':')
+    if not minutes.isdigit() or not seconds.isdigit() or len(seconds) != 2:
+        raise ValueError(f"Expected mm:ss, got {text!r}")
+    return int(minutes) * 60 + int(seconds)
+
+
+class StepIndex:
+    """Append-only sidecar index of a log file, one entry per game second.
+
+    ``runs`` maps each match id to the entry range of its latest run of
+    ascending times, so a lookup is a binary search within that range.
+    Entries are added on the event loop while ``lookup`` may run on a thread;
+    a lock keeps a lookup from mapping a sidecar being truncated or closed.
+    """
+
+    def __init__(self, log_path: str, index_path: str | None = None):
+        self.log_path = log_path
+        self.index_path = index_path or f'{log_path}.idx'
+        self.runs: Dict[int, Tuple[int, int]] = {}
+        self.entries = 0
+        self._last_seconds = -1
+        self._last_match = -1
+        self._last_offset = -1
+        self._lock = threading.Lock()
+        self._fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._load()
+
+    def _load(self) -> None:
+        """Rebuild the run table from an existing sidecar (once, at startup)."""
+        with open(self.index_path, 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        if usable != len(data):
+            # Torn final record from a crash mid-write
+            os.ftruncate(self._fd, usable)
+        for match, _, seconds, offset in INDEX_RECORD.iter_unpack(data[:usable]):
+            self._note(match, seconds, offset)
+
+    def _note(self, match: int, seconds: int, offset: int) -> None:
+        if match != self._last_match or seconds < self._last_seconds:
+            # A new match, or the same match restarted: a new run
+            self.runs[match] = (self.entries, self.entries + 1)
+        else:
+            self.runs[match] = (self.runs[match][0], self.entries + 1)
+        self.entries += 1
+        self._last_match = match
+        self._last_seconds = seconds
+        self._last_offset = offset
+
+    def add(self, record: DebugRecord, offset: int, match_id: int | None) -> None:
+        """Index ``record`` (which starts at ``offset``) if it opens a new game second."""
+        if offset < self._last_offset:
+            # The log was truncated or replaced; old entries point at nothing
+            self.reset()
+        match = match_id or 0
+        seconds = record.game_seconds
+        if seconds == self._last_seconds and match == self._last_match:
+            self._last_offset = offset
+            return
+        os.write(self._fd, INDEX_RECORD.pack(match, record.game_step, seconds, offset))
+        self._note(match, seconds, offset)
+
+    def lookup(self, match_id: int, game_seconds: int) -> Optional[int]:
+        """Offset of the last indexed second at or before ``game_seconds`` in a match."""
+        with self._lock:
+            run = self.runs.get(match_id)
+            if run is None or self._fd < 0:
+                return None
+            first, last = run
+            with mmap.mmap(self._fd, last * INDEX_RECORD.size, access=mmap.ACCESS_READ) as index:
+                lo, hi = first, last
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if INDEX_RECORD.unpack_from(index, mid * INDEX_RECORD.size)[2] <= game_seconds:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                return INDEX_RECORD.unpack_from(index, max(lo - 1, first) * INDEX_RECORD.size)[3]
+
+    def reset(self) -> None:
+        with self._lock:
+            os.ftruncate(self._fd, 0)
+            self.runs.clear()
+        self.entries = 0
+        self._last_seconds = -1
+        self._last_match = -1
+        self._last_offset = -1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+
+def excerpt_lines(buf, offset: int, game_seconds: int, lines: int = 20) -> List[str]:
+    """Lines around the first one at ``game_seconds``, scanning ``buf`` from ``offset``.
+
+    ``buf`` is anything with ``find``/``rfind`` and slicing (an mmap or bytes).
+    About a quarter of the lines come from before the target and the rest from
+    after it.
+    """
+    size = len(buf)
+    if size == 0 or offset >= size:
+        return []
+    pos = offset
+    # Scan forward from the indexed line to the first one at the target time
+    limit = min(size, offset + MAX_SCAN)
+    while pos < limit:
+        end = buf.find(b'\n', pos, limit)
+        if end < 0:
+            end = limit
+        record = parse_debug_line(buf[pos:end].decode('utf-8', errors='replace').strip())
+        if record is not None and record.game_seconds >= game_seconds:
+            break
+        pos = end + 1
+    if pos >= limit:
+        pos = offset
+    # Step back over the lines shown before the target
+    start = pos
+    for _ in range(lines // 4):
+        if start == 0:
+            break
+        start = buf.rfind(b'\n', 0, start - 1) + 1
+    excerpt = []
+    pos = start
+    while len(excerpt) < lines and pos < size:
+        end = buf.find(b'\n', pos)
+        if end < 0:
+            end = size
+        excerpt.append(buf[pos:end].decode('utf-8', errors='replace').rstrip())
+        pos = end + 1
+    return excerpt
+
+
+def read_excerpt(log_path: str, offset: int, game_seconds: int, lines: int = 20) -> List[str]:
+    """``excerpt_lines`` over a memory-mapped log: only pages near the offset are touched."""
+    with open(log_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as log:
+            return excerpt_lines(log, offset, game_seconds, lines)
@@ -0,0 +1,319 @@
+"""
+In-process asyncio tailer for bot log files.
+
+Replaces the ``tail -f`` child process used by LogMonitor. The tailer reads in
+large chunks, splits lines itself, follows truncation and rotation by inode and
+size, and persists its byte offset so a restart resumes where it stopped.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+              | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+
+class PollingWaker:
+    """Wakes the tailer on a fixed stat-polling interval."""
+
+    def __init__(self, poll_interval: float = 0.5):
+        self.poll_interval = poll_interval
+
+    def watch(self, directory: str) -> bool:
+        """Polling needs no registration; always succeeds."""
+        return True
+
+    async def wait(self, timeout: float | None = None) -> None:
+        """Sleep for one polling interval."""
+        await asyncio.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWaker:
+    """Wakes the tailer when inotify reports activity in a watched directory.
+
+    Directories are watched rather than files so creation and rotation of the
+    log are noticed as well as writes to it.
+    """
+
+    def __init__(self, libc: ctypes.CDLL, fallback_interval: float = 5.0):
+        self._libc = libc
+        self.fallback_interval = fallback_interval
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._watches: Dict[str, int] = {}
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def watch(self, directory: str) -> bool:
+        """Add a watch on ``directory``; returns False if it does not exist yet."""
+        directory = os.path.abspath(directory)
+        if directory in self._watches:
+            return True
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._watches[directory] = wd
+        return True
+
+    def _on_readable(self) -> None:
+        # Drain the event buffer; the individual events are not needed because
+        # the tailer re-stats its files on every wakeup.
+        try:
+            while os.read(self._fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        self._event.set()
+
+    async def wait(self, timeout: float | None = None) -> None:
+        """Wait for directory activity, or the fallback interval to expire."""
+        timeout = self.fallback_interval if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_waker(poll_interval: float = 0.5, use_inotify: bool = True):
+    """Return an inotify waker where supported, else a polling waker.
+
+    Must be called from a running event loop.
+    """
+    if use_inotify and hasattr(os, 'O_CLOEXEC'):
+        libc_name = ctypes.util.find_library('c')
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            if hasattr(libc, 'inotify_init1'):
+                return InotifyWaker(libc)
+        except OSError:
+            pass
+    return PollingWaker(poll_interval)
+
+
+class LogTailer:
+    """Follow a growing log file without a subprocess.
+
+    ``poll()`` returns the complete lines written since the last call and can
+    be driven by any scheduler, which then calls ``commit()`` once they are
+    handled; ``follow()`` wraps both in an async iterator of line batches.
+    """
+
+    def __init__(self, path: str, offset_path: str | None = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, from_end: bool = True,
+                 poll_interval: float = 0.5, save_interval: float = 2.0,
+                 max_read: int = 16 * DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.offset_path = offset_path
+        self.chunk_size = chunk_size
+        self.from_end = from_end
+        self.poll_interval = poll_interval
+        self.save_interval = save_interval
+        self.max_read = max_read
+        # Byte offset just past the last complete line handed out
+        self.offset = 0
+        # Where the last batch starts in the current file: lines[batch_first_line]
+        # begins at batch_offset (earlier lines came from a file rotated away)
+        self.batch_offset = 0
+        self.batch_first_line = 0
+        # The raw bytes of those lines, for line_offsets()
+        self._batch_raw = b''
+        self._file = None
+        self._inode: int | None = None
+        self._partial = b''
+        self._missing = False
+        self._at_eof = False
+        self._committed: Optional[tuple] = None
+        self._last_save = 0.0
+        self._saved: Optional[dict] = self._load_offset()
+
+    def _load_offset(self) -> Optional[dict]:
+        """Load the persisted offset, if any."""
+        if not self.offset_path:
+            return None
+        try:
+            with open(self.offset_path, 'r') as f:
+                state = json.load(f)
+            return {'inode': int(state['inode']), 'offset': int(state['offset'])}
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def at_eof(self) -> bool:
+        """False when the last poll stopped early with more data waiting."""
+        return self._at_eof
+
+    def commit(self) -> None:
+        """Mark every line returned so far as handled, persisting it when due."""
+        if self._inode is not None:
+            self._committed = (self._inode, self.offset)
+            if time.monotonic() - self._last_save >= self.save_interval:
+                self.save_offset()
+
+    def save_offset(self) -> None:
+        """Persist the committed offset atomically."""
+        if not self.offset_path or self._committed is None:
+            return
+        inode, offset = self._committed
+        tmp_path = f'{self.offset_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'inode': inode, 'offset': offset}, f)
+        os.replace(tmp_path, self.offset_path)
+        self._last_save = time.monotonic()
+
+    def _open(self) -> bool:
+        """Open the log file and pick the starting offset."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            self._missing = True
+            return False
+        st = os.fstat(f.fileno())
+        saved, self._saved = self._saved, None
+        if saved is not None and saved['inode'] == st.st_ino and saved['offset'] <= st.st_size:
+            # Same file as before the restart: resume after the last shipped line
+            start = saved['offset']
+        elif saved is not None or not self.from_end or self._missing or self._inode is not None:
+            # Rotated while we were down, created after we started, or rotated
+            # under us: read the new file from the start
+            start = 0
+        else:
+            start = st.st_size
+        f.seek(start)
+        self._file = f
+        self._inode = st.st_ino
+        self.offset = start
+        self._partial = b''
+        return True
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_available(self) -> List[str]:
+        """Read up to ``max_read`` bytes from the open file and split complete lines."""
+        chunks = [self._partial] if self._partial else []
+        self.batch_offset = self.offset
+        self._batch_raw = b''
+        remaining = self.max_read
+        self._at_eof = False
+        while remaining > 0:
+            data = self._file.read(min(self.chunk_size, remaining))
+            if not data:
+                self._at_eof = True
+                break
+            chunks.append(data)
+            remaining -= len(data)
+        if not chunks:
+            return []
+        buf = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        end = buf.rfind(b'\n')
+        if end < 0:
+            self._partial = buf
+            return []
+        self._partial = buf[end + 1:]
+        self.offset += end + 1
+        raw = self._batch_raw = buf[:end]
+        return raw.decode('utf-8', errors='replace').split('\n')
+
+    def line_offsets(self) -> List[int]:
+        """Byte offset of each line of the last batch from ``batch_first_line`` on.
+
+        Taken from the raw bytes, so lines with invalid UTF-8 (decoded with
+        replacement characters) keep their true positions.
+        """
+        raw, start = self._batch_raw, self.batch_offset
+        offsets = [start]
+        pos = raw.find(b'\n')
+        while pos >= 0:
+            offsets.append(start + pos + 1)
+            pos = raw.find(b'\n', pos + 1)
+        return offsets
+
+    def poll(self) -> List[str]:
+        """Return the complete lines appended since the last poll."""
+        if self._file is None and not self._open():
+            self._at_eof = True
+            return []
+        st = os.fstat(self._file.fileno())
+        if st.st_size < self.offset + len(self._partial):
+            # Truncated in place (e.g. `> stderr.log` between matches)
+            self._file.seek(0)
+            self.offset = 0
+            self._partial = b''
+        self.batch_first_line = 0
+        lines = self._read_available()
+        if not self._at_eof:
+            # Large backlog; hand this batch out before reading further
+            return lines
+        try:
+            rotated = os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            rotated = False
+        if rotated:
+            # The old file has been drained above; a trailing partial line is
+            # final once the writer has moved on.
+            if self._partial:
+                lines.append(self._partial.decode('utf-8', errors='replace'))
+                self.offset += len(self._partial)
+                self._partial = b''
+            self._close_file()
+            if self._open():
+                self.batch_first_line = len(lines)
+                lines.extend(self._read_available())
+        return lines
+
+    async def follow(self, waker=None) -> AsyncIterator[List[str]]:
+        """Yield batches of new lines forever."""
+        own_waker = waker is None
+        if own_waker:
+            waker = make_waker(self.poll_interval)
+        watched = False
+        try:
+            while True:
+                if not watched:
+                    watched = waker.watch(os.path.dirname(os.path.abspath(self.path)))
+                lines = self.poll()
+                if lines:
+                    yield lines
+                    # The consumer has handled the batch; it is safe to persist
+                    self.commit()
+                    continue
+                if not self._at_eof:
+                    continue
+                await waker.wait(None if watched else self.poll_interval)
+        finally:
+            if own_waker:
+                waker.close()
+
+    def close(self) -> None:
+        """Persist the offset and release the file handle."""
+        self.save_offset()
+        self._close_file()
@@ -0,0 +1,263 @@
+"""
+GELF transports for LogMonitor.
+
+Each transport takes batches of uncompressed GELF JSON messages and owns its
+framing, compression and connection handling:
+
+- ``udp``: one datagram per message, zlib-compressed, chunked above ``chunk_size``
+- ``tcp``: a persistent connection with null-byte framing and automatic reconnect
+- ``http``: a keep-alive connection posting gzip-compressed, newline-delimited
+  batches (Graylog's GELF HTTP input with bulk receiving enabled)
+"""
+
+import gzip
+import http.client
+import logging
+import os
+import socket
+import struct
+import zlib
+from typing import Dict, List, Mapping, Optional, Union
+
+from graypy.handler import BaseGELFHandler
+
+# Chunk sizes from the GELF spec / graypy: WAN-safe and LAN (jumbo-free) sizes
+WAN_CHUNK = 1420
+LAN_CHUNK = 8154
+GELF_MAX_CHUNKS = 128
+CHUNK_HEADER_SIZE = 12
+
+UDP = 'udp'
+TCP = 'tcp'
+HTTP = 'http'
+TRANSPORTS = (UDP, TCP, HTTP)
+
+
+class GelfTransport:
+    """Base class for GELF transports."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.messages_dropped = 0
+
+    def send_batch(self, messages: List[bytes]) -> None:
+        """Send a batch of uncompressed GELF JSON messages."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class UdpTransport(GelfTransport):
+    """GELF over UDP with zlib compression and chunking."""
+
+    def __init__(self, host: str, port: int, chunk_size: int = WAN_CHUNK, compress_level: int = 6):
+        super().__init__(host, port)
+        if chunk_size <= CHUNK_HEADER_SIZE:
+            raise ValueError(f"chunk_size must be larger than {CHUNK_HEADER_SIZE}")
+        self.chunk_size = chunk_size
+        self.compress_level = compress_level
+        self._sock: socket.socket | None = None
+        self._address: tuple | None = None
+
+    def _socket(self) -> socket.socket:
+        if self._sock is None:
+            # Resolve once; sendto with a hostname would resolve on every call
+            family, _, _, _, address = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_DGRAM)[0]
+            self._sock = socket.socket(family, socket.SOCK_DGRAM)
+            self._address = address
+        return self._sock
+
+    def _chunks(self, payload: bytes) -> List[bytes]:
+        """Split a payload into GELF chunks; empty if it needs too many."""
+        size = self.chunk_size - CHUNK_HEADER_SIZE
+        total = -(-len(payload) // size)
+        if total > GELF_MAX_CHUNKS:
+            return []
+        message_id = os.urandom(8)
+        return [b''.join((b'\x1e\x0f', message_id, struct.pack('BB', seq, total),
+                          payload[offset:offset + size]))
+                for seq, offset in enumerate(range(0, len(payload), size))]
+
+    def send_batch(self, messages: List[bytes]) -> None:
+        sock = self._socket()
+        address = self._address
+        level = self.compress_level
+        for message in messages:
+            payload = zlib.compress(message, level) if level else message
+            if len(payload) <= self.chunk_size:
+                sock.sendto(payload, address)
+                self.bytes_sent += len(payload)
+            else:
+                chunks = self._chunks(payload)
+                if not chunks:
+                    self.messages_dropped += 1
+                    continue
+                for chunk in chunks:
+                    sock.sendto(chunk, address)
+                    self.bytes_sent += len(chunk)
+            self.messages_sent += 1
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class TcpTransport(GelfTransport):
+    """GELF over a persistent TCP connection, null-byte framed.
+
+    GELF TCP inputs cannot decompress null-delimited frames, so messages are
+    sent uncompressed; the whole batch goes out in a single ``sendall``.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0, retries: int = 1):
+        super().__init__(host, port)
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnects = 0
+        self._sock: socket.socket | None = None
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self._sock
+
+    def send_batch(self, messages: List[bytes]) -> None:
+        if not messages:
+            return
+        frame = b'\x00'.join(messages) + b'\x00'
+        for attempt in range(self.retries + 1):
+            try:
+                self._connect().sendall(frame)
+                break
+            except OSError:
+                self.close()
+                if attempt == self.retries:
+                    raise
+                self.reconnects += 1
+        self.messages_sent += len(messages)
+        self.bytes_sent += len(frame)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class HttpTransport(GelfTransport):
+    """GELF over HTTP with keep-alive and gzip-compressed batched POSTs."""
+
+    def __init__(self, host: str, port: int, path: str = '/gelf', compress_level: int = 6,
+                 timeout: float = 5.0, retries: int = 1):
+        super().__init__(host, port)
+        self.path = path
+        self.compress_level = compress_level
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnects = 0
+        self._conn: http.client.HTTPConnection | None = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def send_batch(self, messages: List[bytes]) -> None:
+        if not messages:
+            return
+        body = b'\n'.join(messages)
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if self.compress_level:
+            body = gzip.compress(body, self.compress_level)
+            headers['Content-Encoding'] = 'gzip'
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self._connection()
+                conn.request('POST', self.path, body=body, headers=headers)
+                response = conn.getresponse()
+                # Drain the body so the connection can be reused
+                response.read()
+                if response.status >= 300:
+                    raise http.client.HTTPException(f"GELF HTTP input returned {response.status}")
+                break
+            except (OSError, http.client.HTTPException):
+                self.close()
+                if attempt == self.retries:
+                    raise
+                self.reconnects += 1
+        self.messages_sent += len(messages)
+        self.bytes_sent += len(body)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def make_transport(kind: str, host: str, port: int, **options) -> GelfTransport:
+    """Build a transport by name ('udp', 'tcp' or 'http')."""
+    kind = kind.lower()
+    if kind == UDP:
+        return UdpTransport(host, port, **options)
+    if kind == TCP:
+        return TcpTransport(host, port, **options)
+    if kind == HTTP:
+        return HttpTransport(host, port, **options)
+    raise ValueError(f"Unknown GELF transport {kind!r}, expected one of {TRANSPORTS}")
+
+
+def transport_options_from_env(kind: str, environ: Optional[Mapping[str, str]] = None) -> Dict[str, object]:
+    """Read per-transport settings from GELF_* environment variables."""
+    environ = os.environ if environ is None else environ
+    kind = kind.lower()
+    options: Dict[str, object] = {}
+    if kind == UDP:
+        if environ.get('GELF_UDP_CHUNK_SIZE'):
+            options['chunk_size'] = int(environ['GELF_UDP_CHUNK_SIZE'])
+        if environ.get('GELF_UDP_COMPRESS_LEVEL'):
+            options['compress_level'] = int(environ['GELF_UDP_COMPRESS_LEVEL'])
+    elif kind == TCP:
+        if environ.get('GELF_TCP_TIMEOUT'):
+            options['timeout'] = float(environ['GELF_TCP_TIMEOUT'])
+    elif kind == HTTP:
+        if environ.get('GELF_HTTP_PATH'):
+            options['path'] = environ['GELF_HTTP_PATH']
+        if environ.get('GELF_HTTP_COMPRESS_LEVEL'):
+            options['compress_level'] = int(environ['GELF_HTTP_COMPRESS_LEVEL'])
+    return options
+
+
+class GelfTransportHandler(BaseGELFHandler):
+    """graypy GELF formatting in front of a pluggable transport.
+
+    GelfShipper calls ``ship_batch`` with whole batches; ``emit`` exists so the
+    handler also works when attached to a logger directly. Batches may mix
+    records with payloads already encoded by ``GelfEmitter``.
+    """
+
+    def __init__(self, transport: GelfTransport, **kwargs):
+        kwargs.setdefault('debugging_fields', False)
+        # The transport decides on compression
+        super().__init__(compress=False, **kwargs)
+        self.transport = transport
+
+    def ship_batch(self, records: List[Union[logging.LogRecord, bytes]]) -> None:
+        level = self.level
+        self.transport.send_batch([record if isinstance(record, bytes) else self.makePickle(record)
+                                   for record in records
+                                   if isinstance(record, bytes) or record.levelno >= level])
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.ship_batch([record])
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        self.transport.close()
+        super().close()
@@ -0,0 +1,164 @@
+"""
+Isolated local-bootstrap workers, so several matches can play at once.
+
+A ``Worker`` is a local-bootstrap directory with its own ``matches`` file,
+``logs/`` and ``results.json``, whose containers run under their own compose
+project (``{project}`` in the compose command). ``Sc2Runner`` keeps one match
+per free worker running and gives each match a global id up front. Workers
+finish in any order, so ``ResultsMerger`` holds their results back until every
+earlier match has reported, then they are appended to the main
+``results.json`` in match-id order (Elo ratings depend on it).
+
+How a worker plays a match is up to its ``match_executor`` (see
+executors.py): docker-compose from scratch by default, or a pool of
+environments started ahead of time.
+
+The single default worker is the current directory with the plain compose
+command. It is ``shared``: its results.json is the main one, so nothing is
+merged, and its logs follow ``LogMonitor``'s global match id.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .completion import CompletionWatcher
+from .executors import ComposeExecutor, MatchExecutor, make_executor
+from .results import ResultsFile
+
+# requester: who queued it, for fair scheduling (see scheduler.py)
+SC2Match = namedtuple('SC2Match', ['map', 'bot1', 'bot2', 'priority', 'requester'], defaults=(None,))
+
+COMPOSE_COMMAND = 'docker-compose -f docker-compose-host-network.yml up'
+# Each worker's containers under their own project name
+WORKER_COMPOSE_COMMAND = 'docker-compose -p {project} -f docker-compose-host-network.yml up'
+LADDERBOTS_TYPE = {"BinaryCpp": "cpplinux", "Python": "python", "DotNetCore": "dotnetcore"}
+
+
+def bot_info(bot_name: str, bots_dir: str = 'bots') -> dict:
+    """The bot's entry in its ladderbots.json (Race, Type, ...), or {}."""
+    try:
+        with open(os.path.join(bots_dir, bot_name, 'ladderbots.json'), 'r') as f:
+            return json.load(f)['Bots'][bot_name]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return {}
+
+
+def bot_exe_type(bot_name: str, bots_dir: str = 'bots') -> str:
+    """local-bootstrap's executable type for a bot (python if unknown)."""
+    return LADDERBOTS_TYPE.get(bot_info(bot_name, bots_dir).get('Type'), "python")
+
+
+def match_string(match, bot_type: str) -> str:
+    """The ``matches`` line for an ``SC2Match`` whose opponent runs as ``bot_type``."""
+    return f"1,{match.bot1},T,python,2,{match.bot2},T,{bot_type},{match.map}"
+
+
+def project_name(directory: str) -> str:
+    """Compose project name for a worker directory: lower-case letters, digits, - and _."""
+    name = os.path.basename(os.path.abspath(directory)).lower()
+    return 'sc2_' + ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+
+
+class Worker:
+    """One local-bootstrap directory playing one match at a time."""
+
+    def __init__(self, directory: str = '.', compose_command: str = COMPOSE_COMMAND,
+                 name: str | None = None, executor: Executor | None = None,
+                 results_path: str | None = None, shared: bool = False):
+        self.directory = directory
+        self.name = name or project_name(directory)
+        self.compose_command = compose_command.format(project=self.name)
+        self.results_file = ResultsFile(results_path or os.path.join(directory, 'results.json'))
+        self.shared = shared
+        self.completion = CompletionWatcher(self.results_file, executor=executor)
+        self.match_executor: MatchExecutor = ComposeExecutor(self)
+        self.match: Any = None
+        self.match_id: int | None = None
+        # The executor's handle on the current match, and of the last one while it tears down
+        self.process: Any = None
+        self.teardown_task: asyncio.Task[None] | None = None
+
+    @property
+    def busy(self) -> bool:
+        return self.match is not None
+
+    @property
+    def log_directory(self) -> str | None:
+        """Where this worker's logs live, for ``LogMonitor.set_match``; None when shared."""
+        return None if self.shared else self.directory
+
+    def write_matches_file(self, match_string: str) -> None:
+        """Write the match definition local-bootstrap reads (blocking)."""
+        with open(os.path.join(self.directory, 'matches'), 'w') as f:
+            f.write(match_string)
+
+    async def wait_teardown(self) -> None:
+        """Wait until the last match's containers are gone."""
+        if self.teardown_task is not None:
+            await self.teardown_task
+            self.teardown_task = None
+
+    async def launch(self, match_string: str = '') -> Any:
+        """Start the match in the ``matches`` file (``match_string``) on the match executor."""
+        await asyncio.get_running_loop().run_in_executor(self.completion.executor, self.completion.arm)
+        self.process = await self.match_executor.launch(match_string)
+        return self.process
+
+    async def teardown(self, process: Any) -> None:
+        """Wait until a finished match's containers are gone."""
+        await self.match_executor.teardown(process)
+
+    def __repr__(self) -> str:
+        return f'Worker({self.name!r}, match={self.match_id})'
+
+
+def make_workers(directories: List[str] | None, compose_command: str | None = None,
+                 results_path: str = 'results.json', executor: Executor | None = None,
+                 match_executor: str = 'compose', executor_options: dict | None = None) -> List[Worker]:
+    """Workers for ``directories``, or the one shared worker writing ``results_path``.
+
+    Each gets its own ``match_executor`` (compose or warm, see executors.py) built with ``executor_options``.
+    """
+    if not directories:
+        workers = [Worker('.', compose_command or COMPOSE_COMMAND, name='local', executor=executor,
+                          results_path=results_path, shared=True)]
+    else:
+        workers = [Worker(directory, compose_command or WORKER_COMPOSE_COMMAND, executor=executor)
+                   for directory in directories]
+    names = [worker.name for worker in workers]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Worker directories need distinct names: {names}')
+    for worker in workers:
+        worker.match_executor = make_executor(match_executor, worker, **(executor_options or {}))
+    return workers
+
+
+class ResultsMerger:
+    """Releases results in match-id order, however the workers finish."""
+
+    def __init__(self):
+        # Ids handed out and not yet released, smallest first
+        self.expected: List[int] = []
+        self.pending: Dict[int, Tuple[Optional[dict], Any]] = {}
+
+    def expect(self, match_id: int) -> None:
+        """Note a dispatched match id whose result will come through ``add``."""
+        heapq.heappush(self.expected, match_id)
+
+    def add(self, match_id: int, entry: Optional[dict], match: Any = None) -> List[Tuple[dict, Any]]:
+        """Record a match's result (None if it had none); return (entry, match) pairs now in order."""
+        self.pending[match_id] = (entry, match)
+        ready = []
+        while self.expected and self.expected[0] in self.pending:
+            entry, match = self.pending.pop(heapq.heappop(self.expected))
+            if entry is not None:
+                ready.append((entry, match))
+        return ready
+
+    def __len__(self) -> int:
+        return len(self.pending)
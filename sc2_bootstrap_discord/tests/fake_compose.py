@@ -0,0 +1,86 @@
+"""
+Local stand-in for ``docker-compose up`` on a local-bootstrap directory, used by the tests.
+
+Run in a worker directory, it takes ``--startup`` seconds to "create its
+containers and start SC2", reads the ``matches`` file, "plays" for
+``--game`` seconds, appends a result to that directory's results.json the way
+local-bootstrap does, then takes ``--teardown`` seconds to exit. A match on
+map ``crash`` exits without a result. With ``--events`` it appends
+``start``/``end`` lines (name, time) to a shared file so tests can see which
+matches overlapped.
+
+With ``--warm`` it stands in for a ``WarmPoolExecutor`` environment instead:
+it starts up, prints ``ready``, then reads the match line from stdin (end of
+input: exit without playing).
+"""
+
+import argparse
+import json
+import os
+import shlex
+import sys
+import time
+
+SCRIPT = os.path.abspath(__file__)
+
+
+def command(game: float = 0.1, teardown: float = 0.0, events: str | None = None,
+            startup: float = 0.0, warm: bool = False) -> str:
+    """The shell command for ``Sc2Runner(compose_command=...)``; {project} is the worker's name.
+
+    ``warm``: the command for ``WarmPoolExecutor``, {project} the environment's name.
+    """
+    parts = [sys.executable, SCRIPT, '--game', str(game), '--teardown', str(teardown), '--name', '{project}',
+             '--startup', str(startup)]
+    if events:
+        parts += ['--events', events]
+    if warm:
+        parts.append('--warm')
+    return ' '.join(shlex.quote(part) for part in parts)
+
+
+def event(path: str | None, name: str, kind: str, detail: str = '') -> None:
+    if path:
+        with open(path, 'a') as f:
+            f.write(f'{kind} {name} {time.time()} {detail}\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--game', type=float, default=0.1)
+    parser.add_argument('--teardown', type=float, default=0.0)
+    parser.add_argument('--name', default='local')
+    parser.add_argument('--events')
+    parser.add_argument('--startup', type=float, default=0.0)
+    parser.add_argument('--warm', action='store_true')
+    args = parser.parse_args()
+
+    time.sleep(args.startup)
+    if args.warm:
+        print('ready', flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            return
+    else:
+        with open('matches') as f:
+            line = f.read()
+    _, bot1, _, _, _, bot2, _, _, map_name = line.strip().split(',')
+    event(args.events, args.name, 'start', bot2)
+    time.sleep(args.game)
+    if map_name == 'crash':
+        event(args.events, args.name, 'end', bot2)
+        sys.exit(1)
+    results = {'results': []}
+    if os.path.exists('results.json'):
+        with open('results.json') as f:
+            results = json.load(f)
+    results['results'].append({'match': len(results['results']) + 1, 'bot1': bot1, 'bot2': bot2,
+                               'result': 'Player1Win', 'ended': time.time()})
+    with open('results.json', 'w') as f:
+        json.dump(results, f, indent=4)
+    event(args.events, args.name, 'end', bot2)
+    time.sleep(args.teardown)
+
+
+if __name__ == '__main__':
+    main()
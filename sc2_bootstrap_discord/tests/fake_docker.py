@@ -0,0 +1,151 @@
+"""
+Local stand-in for the Docker Engine API on a unix socket, used by the tests.
+
+A container's ``Cmd`` runs as a local process. Its working directory is the
+host side of the bind mount that holds ``WorkingDir``, and its ``Env`` is added
+to ours. Output is kept and served multiplexed, as Docker does without a TTY,
+from the start and then as it comes. Only the calls ``DockerClient`` makes are
+served.
+"""
+
+import asyncio
+import os
+import struct
+import uuid
+
+from aiohttp import web
+
+
+class FakeContainer:
+    def __init__(self, name: str, config: dict):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.config = config
+        self.process: asyncio.subprocess.Process | None = None
+        # (stream, bytes) frames so far
+        self.output = []
+        self.changed = asyncio.Event()
+        self.exit_code: int | None = None
+        self.exited = asyncio.Event()
+
+    def cwd(self) -> str | None:
+        working_dir = self.config.get('WorkingDir')
+        for bind in self.config.get('HostConfig', {}).get('Binds', []):
+            source, target = bind.split(':')[:2]
+            if working_dir and (working_dir == target or working_dir.startswith(target + '/')):
+                return os.path.join(source, os.path.relpath(working_dir, target))
+        return None
+
+    async def run(self) -> None:
+        env = dict(os.environ)
+        env.update(item.split('=', 1) for item in self.config.get('Env', []))
+        self.process = await asyncio.create_subprocess_exec(
+            *self.config['Cmd'], cwd=self.cwd(), env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        await asyncio.gather(self._read(1, self.process.stdout), self._read(2, self.process.stderr))
+        self.exit_code = await self.process.wait()
+        self.exited.set()
+        self.changed.set()
+
+    async def _read(self, stream: int, reader: asyncio.StreamReader) -> None:
+        while data := await reader.read(4096):
+            self.output.append((stream, data))
+            self.changed.set()
+
+
+class FakeDocker:
+    """``await start()`` serves on ``socket_path``; ``containers`` by id, ``calls`` in order."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.containers = {}
+        self.calls = []
+        self.tasks = set()
+        app = web.Application()
+        app.router.add_post('/{version}/containers/create', self.create)
+        app.router.add_post('/{version}/containers/{id}/start', self.start_container)
+        app.router.add_post('/{version}/containers/{id}/wait', self.wait)
+        app.router.add_post('/{version}/containers/{id}/kill', self.kill)
+        app.router.add_get('/{version}/containers/{id}/json', self.inspect)
+        app.router.add_get('/{version}/containers/{id}/logs', self.logs)
+        app.router.add_delete('/{version}/containers/{id}', self.remove)
+        self.runner = web.AppRunner(app)
+
+    async def start(self) -> None:
+        await self.runner.setup()
+        await web.UnixSite(self.runner, self.socket_path).start()
+
+    async def close(self) -> None:
+        for container in self.containers.values():
+            if container.process is not None and container.exit_code is None:
+                container.process.kill()
+        await self.runner.cleanup()
+
+    def find(self, request: web.Request) -> FakeContainer:
+        key = request.match_info['id']
+        self.calls.append((request.method, request.path.split('/', 2)[2].replace(key, '{id}'), key))
+        for container in self.containers.values():
+            if key in (container.id, container.name):
+                return container
+        raise web.HTTPNotFound(text='{"message": "No such container"}', content_type='application/json')
+
+    async def create(self, request: web.Request) -> web.Response:
+        name = request.query['name']
+        self.calls.append(('POST', 'containers/create', name))
+        if any(container.name == name for container in self.containers.values()):
+            return web.json_response({'message': f'Conflict. The container name "/{name}" is already in use'},
+                                     status=409)
+        container = FakeContainer(name, await request.json())
+        self.containers[container.id] = container
+        return web.json_response({'Id': container.id, 'Warnings': []}, status=201)
+
+    async def start_container(self, request: web.Request) -> web.Response:
+        container = self.find(request)
+        task = asyncio.create_task(container.run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.Response(status=204)
+
+    async def wait(self, request: web.Request) -> web.Response:
+        container = self.find(request)
+        await container.exited.wait()
+        return web.json_response({'StatusCode': container.exit_code, 'Error': None})
+
+    async def kill(self, request: web.Request) -> web.Response:
+        container = self.find(request)
+        if container.exit_code is not None or container.process is None:
+            return web.json_response({'message': 'is not running'}, status=409)
+        container.process.terminate()
+        return web.Response(status=204)
+
+    async def inspect(self, request: web.Request) -> web.Response:
+        container = self.find(request)
+        running = container.process is not None and container.exit_code is None
+        return web.json_response({'Id': container.id, 'Name': '/' + container.name,
+                                  'State': {'Running': running, 'ExitCode': container.exit_code or 0}})
+
+    async def logs(self, request: web.Request) -> web.StreamResponse:
+        container = self.find(request)
+        response = web.StreamResponse()
+        response.content_type = 'application/vnd.docker.multiplexed-stream'
+        await response.prepare(request)
+        sent = 0
+        while True:
+            container.changed.clear()
+            while sent < len(container.output):
+                stream, data = container.output[sent]
+                sent += 1
+                await response.write(struct.pack('>BxxxL', stream, len(data)) + data)
+            if container.exited.is_set():
+                break
+            await container.changed.wait()
+        await response.write_eof()
+        return response
+
+    async def remove(self, request: web.Request) -> web.Response:
+        container = self.find(request)
+        if container.process is not None and container.exit_code is None:
+            container.process.kill()
+            await container.exited.wait()
+        del self.containers[container.id]
+        return web.Response(status=204)
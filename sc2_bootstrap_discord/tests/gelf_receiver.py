@@ -0,0 +1,130 @@
+"""
+Local stand-in for a Graylog GELF input (UDP, TCP or HTTP) used by the tests.
+
+It decodes what the transports send (chunking, zlib/gzip, null-byte framing,
+newline-delimited bulk bodies) and counts the messages it receives.
+"""
+
+import gzip
+import http.server
+import json
+import socket
+import socketserver
+import threading
+import time
+import zlib
+
+
+def decode_payload(payload):
+    """Decompress a GELF payload if needed and return its messages."""
+    if payload[:2] == b'\x1f\x8b':
+        payload = gzip.decompress(payload)
+    elif payload[:1] == b'\x78':
+        payload = zlib.decompress(payload)
+    return [json.loads(part) for part in payload.split(b'\n') if part.strip()]
+
+
+class GelfReceiver:
+    def __init__(self, kind, keep_messages=False):
+        self.kind = kind
+        self.keep_messages = keep_messages
+        self.messages = []
+        self.received = 0
+        self.port = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._sock = None
+        self._thread = None
+        self._chunks = {}
+
+    def _record(self, messages):
+        with self._lock:
+            self.received += len(messages)
+            if self.keep_messages:
+                self.messages.extend(messages)
+
+    def start(self, port=0):
+        receiver = self
+        if self.kind == 'udp':
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+            self._sock.bind(('127.0.0.1', port))
+            self._sock.settimeout(0.2)
+            self.port = self._sock.getsockname()[1]
+            self._running = True
+            self._thread = threading.Thread(target=self._udp_loop, daemon=True)
+        elif self.kind == 'tcp':
+            class Handler(socketserver.BaseRequestHandler):
+                def handle(self):
+                    buf = b''
+                    while True:
+                        data = self.request.recv(256 * 1024)
+                        if not data:
+                            return
+                        buf += data
+                        *frames, buf = buf.split(b'\x00')
+                        receiver._record([json.loads(f) for f in frames if f])
+
+            socketserver.ThreadingTCPServer.allow_reuse_address = True
+            self._server = socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler)
+            self._server.daemon_threads = True
+        elif self.kind == 'http':
+            class Handler(http.server.BaseHTTPRequestHandler):
+                protocol_version = 'HTTP/1.1'
+
+                def do_POST(self):
+                    body = self.rfile.read(int(self.headers['Content-Length']))
+                    if self.headers.get('Content-Encoding') == 'gzip':
+                        body = gzip.decompress(body)
+                    receiver._record(decode_payload(body))
+                    self.send_response(202)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = http.server.ThreadingHTTPServer(('127.0.0.1', port), Handler)
+            self._server.daemon_threads = True
+        else:
+            raise ValueError(self.kind)
+        if self._server is not None:
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def _udp_loop(self):
+        while self._running:
+            try:
+                datagram = self._sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if datagram[:2] == b'\x1e\x0f':
+                message_id, seq, total = datagram[2:10], datagram[10], datagram[11]
+                parts = self._chunks.setdefault(message_id, {})
+                parts[seq] = datagram[12:]
+                if len(parts) < total:
+                    continue
+                del self._chunks[message_id]
+                datagram = b''.join(parts[i] for i in range(total))
+            self._record(decode_payload(datagram))
+
+    def wait_for(self, count, timeout=10.0):
+        """Wait until ``count`` messages arrived or the timeout expires."""
+        deadline = time.monotonic() + timeout
+        while self.received < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.received
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._sock is not None:
+            self._running = False
+            self._sock.close()
+        if self._thread is not None:
+            self._thread.join(2)
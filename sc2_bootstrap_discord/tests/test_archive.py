@@ -0,0 +1,124 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.archive import LogArchive, MatchLog, compress_log, read_range, zstandard
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.parser import parse_debug_line
+from sc2_bootstrap_discord.step_index import StepIndex, parse_game_time
+
+LINE = "{time} {step}  52ms   195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 step {step} line {n}\n"
+
+
+def game_lines(steps, lines_per_step=4):
+    for step in range(steps):
+        seconds = int(step / 22.4)
+        for n in range(lines_per_step):
+            yield LINE.format(time=f'{seconds // 60:02d}:{seconds % 60:02d}', step=step, n=n)
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'stderr.log')
+        self.archive_dir = os.path.join(self.tmpdir.name, 'archive')
+
+    def write_log(self, path, steps=2000):
+        with open(path, 'w') as f:
+            f.writelines(game_lines(steps))
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_blocks_can_be_read_individually(self):
+        for fmt in ('gz', 'zst') if zstandard else ('gz',):
+            with self.subTest(fmt=fmt):
+                data = self.write_log(self.path)
+                dest = os.path.join(self.tmpdir.name, f'1.log.{fmt}')
+                compress_log(self.path, dest, fmt, block_size=16 * 1024)
+                self.assertLess(os.path.getsize(dest), len(data) / 5)
+                self.assertEqual(os.path.getsize(f'{dest}.seek') // 16 - 1, len(data) // (16 * 1024) + 1)
+                self.assertEqual(read_range(dest, 0, len(data)), data)
+                self.assertEqual(read_range(dest, 100_000, 500), data[100_000:100_500])
+
+    def test_cut_archive_and_search(self):
+        monitor = LogMonitor(self.path, 'dummy_host', 12201, rollup_window=0)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        archive = LogArchive(self.archive_dir)
+
+        async def run():
+            open(self.path, 'w').close()
+            await monitor.set_match(7)
+            monitor._source(self.path)
+            monitor._poll_sources()
+            with open(self.path, 'a') as f:
+                f.writelines(game_lines(3000))
+            while monitor._poll_sources():
+                pass
+            live = monitor.log_excerpt(7, parse_game_time('01:10'), lines=8)
+            logs = await monitor.cut_logs()
+            self.assertEqual([(log.path, log.index_path) for log in logs],
+                             [(f'{self.path}.7', f'{self.path}.7.idx')])
+            written = archive.submit(7, logs).result()
+            # The next match writes a fresh log, which is tailed and indexed from its start
+            await monitor.set_match(8)
+            with open(self.path, 'w') as f:
+                f.writelines(game_lines(100))
+            monitor._poll_sources()
+            await monitor.aclose()
+            return live, written
+
+        live, written = asyncio.run(run())
+        self.assertEqual(written, [os.path.join(self.archive_dir, '7.log.gz')])
+        self.assertFalse(os.path.exists(f'{self.path}.7'))
+        self.assertEqual(archive.log_excerpt(7, parse_game_time('01:10'), lines=8),
+                         (written[0], live[1]))
+        self.assertIsNone(archive.log_excerpt(8, 10))
+        self.assertIn(8, monitor.sources[self.path].index.runs)
+        self.assertNotIn(7, monitor.sources[self.path].index.runs)
+        monitor.sources[self.path].close()
+        archive.close()
+
+    def test_retention_by_count_and_size(self):
+        archive = LogArchive(self.archive_dir, keep_matches=3)
+        for match_id in range(1, 6):
+            path = f'{self.path}.{match_id}'
+            self.write_log(path, steps=500)
+            archive.submit(match_id, [MatchLog(path, None, {'bot_name': 'TBone'})]).result()
+        self.assertEqual(sorted(archive.matches()), [3, 4, 5])
+        per_match = os.path.getsize(archive.archive_path(5, {'bot_name': 'TBone'})) + 16 * 2
+        archive.keep_matches = None
+        archive.max_bytes = per_match * 2
+        self.assertEqual(archive.sweep(), [3])
+        self.assertEqual(sorted(os.listdir(self.archive_dir)),
+                         ['4.TBone.log.gz', '4.TBone.log.gz.seek', '5.TBone.log.gz', '5.TBone.log.gz.seek'])
+        archive.close()
+
+    def test_mirror_match_keeps_both_logs(self):
+        archive = LogArchive(self.archive_dir)
+        logs = []
+        for controller in ('bot_controller1', 'bot_controller2'):
+            path = f'{self.path}.{controller}'
+            index = StepIndex(path)
+            offset = 0
+            for line in game_lines(500):
+                line = line.replace('line', controller)
+                index.add(parse_debug_line(line.strip()), offset, 3)
+                offset += len(line)
+                with open(path, 'a') as f:
+                    f.write(line)
+            index.close()
+            logs.append(MatchLog(path, index.index_path, {'controller': controller, 'bot_name': 'TBone'}))
+        written = archive.submit(3, logs).result()
+        self.assertEqual([os.path.basename(path) for path in written],
+                         ['3.bot_controller1.TBone.log.gz', '3.bot_controller2.TBone.log.gz'])
+        self.assertEqual(len(archive.matches()[3]), 2)
+        for controller, path in zip(('bot_controller1', 'bot_controller2'), written):
+            found, lines = archive.log_excerpt(3, 10, lines=4, bot_name='TBone', controller=controller)
+            self.assertEqual(found, path)
+            self.assertIn(controller, lines[1])
+        archive.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from sc2_bootstrap_discord.completion import EXIT, LOG, RESULTS, CompletionWatcher
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.parser import parse_game_result
+from sc2_bootstrap_discord.results import ResultsFile
+from . import fake_compose
+
+class TestGameResultLine(unittest.TestCase):
+    def test_parse_game_result(self):
+        line = ("2024-05-01 12:00:00.000 | INFO     | sc2.main:_play_game:228 - "
+                "Result for player 1 - Bot TerranBot(Terran): Victory")
+        self.assertEqual(parse_game_result(line), (1, 'Bot TerranBot(Terran)', 'Victory'))
+        self.assertIsNone(parse_game_result("00:10  240   43ms     0M    0G  13/ 15U INFO a:1 Result"))
+
+    def test_log_monitor_passes_it_on(self):
+        monitor = LogMonitor('dummy_path', 'dummy_host', 12201)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        results = []
+        monitor.on_game_result = lambda *game_result: results.append(game_result)
+        monitor.current_match_id = 3
+        monitor._handle_line("14:25 19376  152ms   195M 3650G 173/200U INFO a.b:1 Result for player 2 - x: Defeat")
+        monitor._handle_line("Result for player 2 - Bot ZergBot(Zerg): Defeat\n")
+        self.assertEqual(results, [(3, 2, 'Bot ZergBot(Zerg)', 'Defeat')])
+
+
+class TestCompletionWatcher(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.results_path = os.path.join(self.dir, 'results.json')
+        self.write([{'match': 1, 'result': 'Player2Win'}])
+        self.watcher = CompletionWatcher(ResultsFile(self.results_path), poll_interval=0.02)
+        self.watcher.arm()
+
+    def write(self, entries):
+        with open(self.results_path, 'w') as f:
+            json.dump({'results': entries}, f, indent=4)
+
+    async def start(self, seconds=5.0):
+        return await asyncio.create_subprocess_exec(sys.executable, '-c', f'import time; time.sleep({seconds})')
+
+    def test_new_result_ends_the_wait_before_exit(self):
+        async def run():
+            process = await self.start()
+            asyncio.get_running_loop().call_later(
+                0.1, self.write, [{'match': 1, 'result': 'Player2Win'}, {'match': 2, 'result': 'Tie'}])
+            started = time.monotonic()
+            self.assertEqual(await self.watcher.wait(process), RESULTS)
+            self.assertEqual((await self.watcher.result(process))['match'], 2)
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertIsNone(process.returncode)
+            process.kill()
+            await process.wait()
+        asyncio.run(run())
+
+    def test_log_line_ends_the_wait_and_result_follows(self):
+        async def run():
+            process = await self.start()
+            self.watcher.log_result(1, 'Bot TerranBot(Terran)', 'Victory')
+            self.assertEqual(await self.watcher.wait(process), LOG)
+            asyncio.get_running_loop().call_later(
+                0.1, self.write, [{'match': 1, 'result': 'Player2Win'}, {'match': 2, 'result': 'Tie'}])
+            self.assertEqual((await self.watcher.result(process))['match'], 2)
+            process.kill()
+            await process.wait()
+        asyncio.run(run())
+
+    def test_exit_without_a_result(self):
+        async def run():
+            process = await self.start(0.05)
+            # Same history written again: not a new result
+            self.write([{'match': 1, 'result': 'Player2Win'}])
+            self.assertEqual(await self.watcher.wait(process), EXIT)
+            self.assertIsNone(await self.watcher.result(process))
+        asyncio.run(run())
+
+
+class TestRunnerCompletion(unittest.TestCase):
+    def test_report_does_not_wait_for_teardown(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import SC2Match, Sc2Runner
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+        runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           compose_command=fake_compose.command(teardown=1.5))
+        worker = runner.workers[0]
+        worker.completion.poll_interval = 0.02
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+        match = SC2Match('GresvanAIE', 'terranbot', 'zergbot', 3)
+
+        async def run():
+            started = time.monotonic()
+            await runner.do_match(match)
+            self.assertEqual((await worker.completion.result(worker.process))['match'], 1)
+            self.assertLess(time.monotonic() - started, 1.4)
+            self.assertFalse(worker.teardown_task.done())
+            # The next match waits for the last one's containers
+            await runner.do_match(match)
+            self.assertEqual(worker.match_id, 2)
+            self.assertGreater(time.monotonic() - started, 1.5)
+            await worker.teardown_task
+            with open('matches') as f:
+                self.assertEqual(f.read(), '1,terranbot,T,python,2,zergbot,T,python,GresvanAIE')
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from sc2_bootstrap_discord.detector import SlowStepDetector, StepTimeWindow
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.parser import parse_debug_line
+
+TEMPLATE = "14:25 {step} {ms}ms 195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 attacking"
+
+
+def record(step, ms):
+    return parse_debug_line(TEMPLATE.format(step=step, ms=ms))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStepTimeWindow(unittest.TestCase):
+    def test_percentile_over_rolling_window(self):
+        window = StepTimeWindow(size=100, bucket_ms=1)
+        for ms in range(1, 101):
+            window.add(ms)
+        self.assertEqual((window.percentile(50), window.percentile(95)), (50, 95))
+        # Old samples fall out of the window
+        for _ in range(100):
+            window.add(10)
+        self.assertEqual(window.percentile(95), 10)
+        self.assertEqual(sum(window.counts), 100)
+
+    def test_values_above_range_land_in_last_bucket(self):
+        window = StepTimeWindow(size=4, bucket_ms=5, max_ms=100)
+        window.add(60000)
+        self.assertEqual(window.percentile(100), 100)
+
+
+class TestSlowStepDetector(unittest.TestCase):
+    def feed(self, detector, steps, ms):
+        alerts = []
+        for step in steps:
+            # Several lines per step: only the first counts
+            for _ in range(3):
+                alert = detector.add(record(step, ms), match_id=7, bot_name='TBone')
+                if alert:
+                    alerts.append(alert)
+        return alerts
+
+    def test_one_alert_per_incident(self):
+        clock = FakeClock()
+        received = []
+        detector = SlowStepDetector(100, window_steps=20, cooldown=0, on_alert=received.append, clock=clock)
+        self.assertEqual(self.feed(detector, range(0, 40), 40), [])
+        # A single slow step does not move p95
+        self.assertEqual(self.feed(detector, [40], 500), [])
+        alerts = self.feed(detector, range(41, 80), 500)
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(received, alerts)
+        alert = alerts[0]
+        self.assertEqual((alert.match_id, alert.bot_name, alert.game_time, alert.supply_used),
+                         (7, 'TBone', '14:25', 173))
+        self.assertEqual(alert.source_file, 'terranbot.builds.plans.acts.tbone_attack')
+        # Recovery closes the incident; the next spike is a new one
+        self.feed(detector, range(80, 120), 40)
+        self.assertEqual(len(self.feed(detector, range(120, 160), 500)), 1)
+        self.assertEqual(detector.incidents, 2)
+
+    def test_cooldown_limits_alerts_across_incidents(self):
+        clock = FakeClock()
+        detector = SlowStepDetector(100, window_steps=20, cooldown=60, clock=clock)
+        self.assertEqual(len(self.feed(detector, range(0, 40), 500)), 1)
+        self.feed(detector, range(40, 80), 40)
+        clock.now = 30
+        self.assertEqual(self.feed(detector, range(80, 120), 500), [])
+        self.feed(detector, range(120, 160), 40)
+        clock.now = 90
+        self.assertEqual(len(self.feed(detector, range(160, 200), 500)), 1)
+        self.assertEqual((detector.incidents, detector.alerts), (3, 2))
+
+    def test_monitor_forwards_alerts(self):
+        monitor = LogMonitor('stderr.log', 'dummy_host', 12201, rollup_window=0,
+                             slow_step_ms=100, slow_step_window=10)
+        self.addCleanup(monitor.shipper.stop)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        alerts = []
+        monitor.on_slow_step = alerts.append
+        monitor.current_match_id = 4
+        for step in range(30):
+            monitor._handle_line(TEMPLATE.format(step=step, ms=300))
+        self.assertEqual([alert.match_id for alert in alerts], [4])
+        self.assertEqual(monitor.shipping_stats()['slow_step_alerts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from sc2_bootstrap_discord.farm import FarmAgent
+from sc2_bootstrap_discord.workers import make_workers
+from . import fake_compose
+
+
+class Channel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message):
+        self.messages.append((time.monotonic(), message))
+
+    def started(self):
+        return [at for at, message in self.messages if ' started' in message or 'sent to the farm' in message]
+
+
+class TestEventDrivenDispatch(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+
+    def runner(self, workers=None, concurrency=None, farm_options=None):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        for directory in workers or ():
+            os.makedirs(directory)
+        runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           compose_command=fake_compose.command(game=0.3), workers=workers,
+                           concurrency=concurrency, farm_options=farm_options)
+        for worker in runner.workers:
+            worker.completion.poll_interval = 0.02
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+        self.channel = Channel()
+        runner.channel_id = 1
+        runner.get_channel = lambda channel_id: self.channel
+        return runner
+
+    async def until(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            await asyncio.sleep(0.01)
+
+    def test_queued_match_starts_at_once(self):
+        runner = self.runner()
+
+        async def run():
+            task = asyncio.create_task(runner.process_queue())
+            await asyncio.sleep(0.2)
+            queued = time.monotonic()
+            runner.queue_match('zergbot', 'GresvanAIE')
+            await self.until(lambda: self.channel.started())
+            self.assertLess(self.channel.started()[0] - queued, 0.5)
+            await runner.drain()
+            task.cancel()
+        asyncio.run(run())
+
+    def test_pause_resume_and_drain(self):
+        runner = self.runner(workers=['w/a', 'w/b'])
+
+        async def run():
+            task = asyncio.create_task(runner.process_queue())
+            runner.pause()
+            for n in range(3):
+                runner.queue_match(f'bot{n}', 'GresvanAIE')
+            await asyncio.sleep(0.2)
+            self.assertEqual(self.channel.started(), [])
+            self.assertIn('(paused)', runner.queue_status())
+            runner.resume()
+            await self.until(lambda: len(self.channel.started()) == 2)
+            await runner.drain()
+            # The two running matches finished; the third waits for a resume
+            self.assertEqual(len(runner.match_tasks), 0)
+            self.assertEqual(len(runner.match_queue), 1)
+            self.assertTrue(all(worker.teardown_task is None for worker in runner.workers))
+            runner.resume()
+            await self.until(lambda: len(self.channel.started()) == 3)
+            await runner.drain()
+            task.cancel()
+        asyncio.run(run())
+
+    def test_farm_agent_joining_wakes_the_queue(self):
+        runner = self.runner(concurrency=0, farm_options={'host': '127.0.0.1', 'port': 0})
+
+        async def run():
+            await runner.farm.start()
+            task = asyncio.create_task(runner.process_queue())
+            runner.queue_match('zergbot', 'GresvanAIE')
+            await asyncio.sleep(0.2)
+            self.assertEqual(len(runner.match_queue), 1)
+            os.makedirs('remote')
+            workers = make_workers(['remote'], fake_compose.command(game=0.1), executor=runner.io_executor)
+            workers[0].completion.poll_interval = 0.02
+            serving = asyncio.create_task(FarmAgent('127.0.0.1', runner.farm.port, workers, name='r').serve())
+            await self.until(lambda: self.channel.started())
+            await runner.drain()
+            self.assertEqual(len(runner.match_queue), 0)
+            serving.cancel()
+            task.cancel()
+            await runner.farm.close()
+            await asyncio.gather(serving, *(w.teardown_task for w in workers if w.teardown_task),
+                                 return_exceptions=True)
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from sc2_bootstrap_discord.docker_api import DockerClient, DockerError
+from sc2_bootstrap_discord.executors import DockerExecutor
+from . import fake_compose
+from .fake_docker import FakeDocker
+
+BOT_SCRIPT = """
+import sys, time
+for step in range(5):
+    print(f"00:{step:02d}  {step * 22:>3}   43ms    50M    0G  13/ 15U INFO bot.main:12 Step {step}",
+          file=sys.stderr, flush=True)
+    time.sleep(0.02)
+print("Result for player 1 - Bot terranbot(Terran): Victory", file=sys.stderr, flush=True)
+print("controller done", end='')
+"""
+
+
+def services(game=0.3):
+    return [
+        {'name': 'bot', 'tags': {'controller': 'bot_controller1', 'bot_name': '{bot1}'},
+         'config': {'Image': 'local-bootstrap-bot', 'Cmd': [sys.executable, '-c', BOT_SCRIPT]}},
+        {'name': 'match',
+         'config': {'Image': 'local-bootstrap', 'WorkingDir': '/root/local-bootstrap',
+                    'Cmd': [sys.executable, fake_compose.SCRIPT, '--game', str(game), '--name', '{project}'],
+                    'HostConfig': {'Binds': ['{directory}:/root/local-bootstrap']}}},
+    ]
+
+
+class Channel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message):
+        self.messages.append(message)
+
+
+class TestDockerExecutor(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs(os.path.join('workers', 'a'))
+        self.socket_path = os.path.join(tmpdir.name, 'docker.sock')
+
+    def runner(self, **options):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        runner = Sc2Runner('terranbot', graylog_host='dummy_host', log_file_path='dummy_path',
+                           log_options={'rollup_window': 0}, intents=discord.Intents.none(),
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           workers=[os.path.join('workers', 'a')], match_executor='docker',
+                           executor_options=dict({'services': services(), 'socket_path': self.socket_path},
+                                                 **options))
+        runner.workers[0].completion.poll_interval = 0.02
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+        runner.channel_id = 1
+        runner.get_channel = lambda channel_id: Channel()
+        self.emitted = []
+        runner.log_monitor._emit = lambda message, fields, match_id=None, source=None: self.emitted.append(
+            (message, fields.get('game_step'), match_id if match_id is not None else runner.log_monitor._match_id(source),
+             dict(source.tags)))
+        return runner
+
+    async def play(self, runner, fake, *maps):
+        for map_name in maps:
+            runner.queue_match('zergbot', map_name)
+        try:
+            while runner.match_queue or runner.match_tasks:
+                if not await runner._dispatch():
+                    await asyncio.sleep(0.02)
+            await runner.workers[0].wait_teardown()
+        finally:
+            await runner.workers[0].match_executor.close()
+            await runner.log_monitor.aclose()
+            await fake.close()
+
+    def test_match_output_goes_straight_to_the_log_pipeline(self):
+        runner = self.runner()
+        fake = FakeDocker(self.socket_path)
+        executor = runner.workers[0].match_executor
+
+        async def run():
+            await fake.start()
+            await self.play(runner, fake, 'GresvanAIE')
+        asyncio.run(run())
+
+        with open('results.json') as f:
+            entry, = json.load(f)['results']
+        self.assertEqual((entry['match'], entry['worker'], entry['bot2']), (1, 'sc2_a', 'zergbot'))
+        steps = [(step, match_id, tags) for _, step, match_id, tags in self.emitted if step is not None]
+        self.assertEqual([step for step, _, _ in steps], [0, 22, 44, 66, 88])
+        self.assertTrue(all(match_id == 1 for _, match_id, _ in steps))
+        self.assertEqual(steps[0][2], {'controller': 'bot_controller1', 'bot_name': 'terranbot'})
+        messages = [message for message, *_ in self.emitted]
+        self.assertIn('Result for player 1 - Bot terranbot(Terran): Victory', messages)
+        # The last line had no newline
+        self.assertIn('controller done', messages)
+
+        timings = executor.current.timings()
+        self.assertEqual([timings['bot']['exit_code'], timings['match']['exit_code']], [0, 0])
+        self.assertEqual(timings['bot']['lines'], 7)
+        self.assertGreaterEqual(timings['match']['run_s'], 0.3)
+        self.assertEqual(executor.current.returncode, 0)
+        self.assertIn('match exited 0', executor.status())
+        # Removed once the match was over
+        self.assertEqual(fake.containers, {})
+        self.assertEqual([call[:2] for call in fake.calls if call[1] == 'containers/create'],
+                         [('POST', 'containers/create')] * 2)
+        self.assertEqual(runner.log_monitor.streams, {})
+
+    def test_a_leftover_container_is_replaced_and_a_failure_reported(self):
+        runner = self.runner()
+        fake = FakeDocker(self.socket_path)
+        executor = runner.workers[0].match_executor
+
+        async def run():
+            await fake.start()
+            client = DockerClient(self.socket_path)
+            # From a crashed run
+            await client.create('sc2_a-match', {'Cmd': ['true']})
+            with self.assertRaises(DockerError) as raised:
+                await client.create('sc2_a-match', {'Cmd': ['true']})
+            self.assertEqual(raised.exception.status, 409)
+            await client.close()
+            await self.play(runner, fake, 'crash')
+        asyncio.run(run())
+
+        self.assertEqual(executor.current.returncode, 1)
+        self.assertEqual(executor.current.timings()['match']['exit_code'], 1)
+        self.assertEqual(fake.containers, {})
+        self.assertIn(('DELETE', 'containers/{id}', 'sc2_a-match'), fake.calls)
+        self.assertFalse(os.path.exists('results.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import logging
+import unittest
+from sc2_bootstrap_discord.emitter import GelfEmitter, decode_record
+from sc2_bootstrap_discord.log_monitor import LogMonitor, record_fields
+from sc2_bootstrap_discord.parser import parse_debug_line
+from sc2_bootstrap_discord.shipping import GelfShipper
+from sc2_bootstrap_discord.transports import GelfTransport, GelfTransportHandler
+
+LINE = ("14:29 19476  170ms   380M 3702G 173/200U Level 20 sharpy.managers.core.log_manager:71 "
+        "[EnemyArmyPredicter] Predicting \"negative\" free minerals: -1135 – ok")
+TAGS = {'controller': 'bot_controller1', 'bot_name': 'terranbot'}
+
+
+class RecordingTransport(GelfTransport):
+    def __init__(self):
+        super().__init__('localhost', 0)
+        self.messages = []
+
+    def send_batch(self, messages):
+        self.messages.extend(messages)
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestGelfEmitter(unittest.TestCase):
+    def test_payload_matches_graypy_fields(self):
+        record = parse_debug_line(LINE)
+        fields = record_fields(record)
+        emitter = GelfEmitter(host='node1')
+        emitted = json.loads(emitter.encode(emitter.prefix(7, TAGS, 'a'), record.message, fields))
+
+        # The same message through logging and graypy
+        handler = GelfTransportHandler(RecordingTransport())
+        log_record = logging.makeLogRecord({
+            'name': 'starcraft_bot_controller', 'msg': record.message, 'levelno': logging.INFO,
+            'levelname': 'INFO', 'match': 7, 'source': 'sc2_test_runner', 'host': 'node1',
+            **TAGS, **fields
+        })
+        handler.ship_batch([log_record])
+        expected = json.loads(handler.transport.messages[0])
+
+        for key in ('short_message', 'level', 'facility'):
+            self.assertEqual(emitted[key], expected[key])
+        custom = {key: value for key, value in expected.items()
+                  if key.startswith('_') and value is not None and key != '_taskName'}
+        self.assertEqual({key: emitted[key] for key in custom}, custom)
+        self.assertEqual(emitted['host'], 'node1')
+        self.assertIsInstance(emitted['timestamp'], float)
+
+    def test_prefix_is_cached_per_match_and_file(self):
+        emitter = GelfEmitter(host='node1')
+        first = emitter.prefix(1, TAGS, 'a')
+        self.assertIs(emitter.prefix(1, TAGS, 'a'), first)
+        self.assertIsNot(emitter.prefix(2, TAGS, 'a'), first)
+        self.assertEqual(json.loads(emitter.encode(emitter.prefix(None), 'x', {}))['_match'], None)
+
+    def test_decode_record_round_trip(self):
+        emitter = GelfEmitter(host='node1')
+        payload = emitter.encode(emitter.prefix(3, TAGS, 'a'), 'hello', {'game_step': 5}, timestamp=12.5)
+        record = decode_record(payload)
+        self.assertEqual((record.getMessage(), record.match, record.game_step, record.created),
+                         ('hello', 3, 5, 12.5))
+
+
+class TestRawShipping(unittest.TestCase):
+    def ship(self, echo):
+        transport = RecordingTransport()
+        stdout = CollectingHandler()
+        shipper = GelfShipper([stdout, GelfTransportHandler(transport)], echo=echo)
+        emitter = GelfEmitter(host='node1')
+        shipper.submit(logging.makeLogRecord({'msg': 'status', 'levelno': logging.INFO}))
+        shipper.submit_raw(emitter.encode(emitter.prefix(1), 'line', {}))
+        shipper.start()
+        shipper.stop()
+        return [json.loads(m)['short_message'] for m in transport.messages], stdout.messages
+
+    def test_raw_payloads_skip_other_handlers_without_echo(self):
+        self.assertEqual(self.ship(echo=False), (['status', 'line'], ['status']))
+
+    def test_echo_decodes_raw_payloads(self):
+        self.assertEqual(self.ship(echo=True), (['status', 'line'], ['status', 'line']))
+
+    def test_monitor_lines_bypass_logging(self):
+        monitor = LogMonitor('dummy_path', 'localhost', 12201, rollup_window=0, offset_path='')
+        self.addCleanup(monitor.shipper.stop)
+        transport = RecordingTransport()
+        monitor.shipper.stop()
+        monitor.shipper.handlers = [GelfTransportHandler(transport)]
+        monitor.current_match_id = 4
+        monitor._handle_line(LINE)
+        monitor.shipper.start()
+        monitor.shipper.stop()
+        lines = [json.loads(m) for m in transport.messages if json.loads(m).get('_game_step')]
+        self.assertEqual([(m['_match'], m['_game_step'], m['_minerals']) for m in lines], [(4, 19476, 380)])
+
+
+if __name__ == '__main__':
+    unittest.main()
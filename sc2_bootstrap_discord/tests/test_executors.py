@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from sc2_bootstrap_discord.executors import ComposeExecutor, WarmPoolExecutor, make_executor
+from sc2_bootstrap_discord.workers import Worker, make_workers
+from . import fake_compose
+
+STARTUP = 0.3
+GAME = 0.6
+
+
+class Channel:
+    def __init__(self):
+        self.started = []
+
+    async def send(self, message):
+        if ' started' in message:
+            self.started.append(time.time())
+
+
+class TestMatchExecutors(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+        self.events = os.path.join(tmpdir.name, 'events')
+
+    def runner(self, match_executor, **options):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        warm = match_executor == 'warm'
+        command = fake_compose.command(game=GAME, startup=STARTUP, events=self.events, warm=warm)
+        runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           compose_command=command, match_executor=match_executor,
+                           executor_options=dict(options, command=command) if warm else None)
+        runner.workers[0].completion.poll_interval = 0.02
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+        runner.channel = Channel()
+        runner.channel_id = 1
+        runner.get_channel = lambda channel_id: runner.channel
+        return runner
+
+    async def play(self, runner, matches):
+        """Play ``matches`` one after another; the seconds from each "started" message to the game starting."""
+        worker = runner.workers[0]
+        await worker.match_executor.start()
+        # Ready before the first request, as with a bot that has been up a while
+        while isinstance(worker.match_executor, WarmPoolExecutor) and not worker.match_executor.ready:
+            await asyncio.sleep(0.02)
+        for n in range(matches):
+            runner.queue_match(f'bot{n}', 'GresvanAIE')
+        while runner.match_queue or runner.match_tasks:
+            if not await runner._dispatch():
+                await asyncio.sleep(0.02)
+        await worker.wait_teardown()
+        await worker.match_executor.close()
+        with open(self.events) as f:
+            playing = [float(at) for kind, _, at, *_ in (line.split() for line in f) if kind == 'start']
+        return [start - message for message, start in zip(runner.channel.started, playing)]
+
+    def test_warm_pool_skips_the_startup(self):
+        cold = asyncio.run(self.play(self.runner('compose'), 3))
+        os.remove(self.events)
+        runner = self.runner('warm', size=1)
+        warm = asyncio.run(self.play(runner, 3))
+        self.assertEqual(len(cold), 3)
+        self.assertEqual(len(warm), 3)
+        self.assertGreaterEqual(min(cold), STARTUP)
+        # Each replacement warmed up while the match before it played
+        self.assertLess(max(warm), STARTUP / 2)
+        pool = runner.workers[0].match_executor
+        self.assertEqual((pool.warm_starts, pool.cold_starts, pool.failures), (3, 0, 0))
+        with open('results.json') as f:
+            self.assertEqual([entry['bot2'] for entry in json.load(f)['results']][-3:], ['bot0', 'bot1', 'bot2'])
+        self.assertFalse(pool.pool)
+
+    def test_command_braces_are_left_to_the_shell(self):
+        worker, = make_workers(None)
+        command = 'echo "${HOME:+set} {project} {\\"a\\": 1}" > env.txt; echo ready; read match'
+        worker.match_executor = pool = WarmPoolExecutor(worker, command)
+
+        async def launch():
+            process = await pool.launch('1,terranbot,T,python,2,bot0,T,python,GresvanAIE')
+            await pool.teardown(process)
+            await pool.close()
+        asyncio.run(launch())
+        with open('env.txt') as f:
+            self.assertRegex(f.read(), r'^set local_\d+ \{"a": 1\}\n$')
+
+    def test_a_failed_environment_is_replaced(self):
+        worker, = make_workers(None)
+        worker.match_executor = pool = WarmPoolExecutor(worker, 'exit 3', size=2)
+
+        async def launch():
+            with self.assertRaises(RuntimeError):
+                await pool.launch('1,terranbot,T,python,2,bot0,T,python,GresvanAIE')
+            await pool.close()
+        asyncio.run(launch())
+        self.assertEqual(pool.failures, 3)
+
+    def test_make_executor(self):
+        worker = Worker('.', 'true')
+        self.assertIsInstance(worker.match_executor, ComposeExecutor)
+        self.assertIsInstance(make_executor('warm', worker, command='true', size=2), WarmPoolExecutor)
+        with self.assertRaises(ValueError):
+            make_executor('kubernetes', worker)
+        with self.assertRaises(ValueError):
+            make_executor('warm', worker, command='true', size=0)
+        # No default environment command to fall back on
+        with self.assertRaisesRegex(ValueError, 'WARM_COMMAND'):
+            make_executor('warm', worker)
+
+
+if __name__ == '__main__':
+    unittest.main()
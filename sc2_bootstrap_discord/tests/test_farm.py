@@ -0,0 +1,264 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import sc2_bootstrap_discord
+from sc2_bootstrap_discord.farm import FarmAgent, FarmCoordinator, encode
+from sc2_bootstrap_discord.workers import SC2Match, make_workers
+from . import fake_compose
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(sc2_bootstrap_discord.__file__)))
+
+
+class FarmTestCase(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.agents = []
+
+    def start_agent(self, name, port, game=0.5, workers=1):
+        """A farm agent in its own process with ``workers`` worker directories."""
+        home = os.path.join(self.dir, name)
+        directories = [os.path.join(home, f'w{n}') for n in range(workers)]
+        for directory in directories:
+            os.makedirs(directory)
+        env = dict(os.environ, PYTHONPATH=SRC)
+        env.pop('GRAYLOG_HOST', None)
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'sc2_bootstrap_discord.cli', 'farm-agent', '--coordinator', f'127.0.0.1:{port}',
+             '--name', name, '--compose-command', fake_compose.command(game=game), '--workers', *directories],
+            cwd=home, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.agents.append(process)
+        self.addCleanup(lambda: process.poll() is None and (process.kill(), process.wait()))
+        return process
+
+    async def registered(self, coordinator, count, timeout=20):
+        deadline = time.monotonic() + timeout
+        while len(coordinator.agents) < count:
+            self.assertLess(time.monotonic(), deadline, 'agents did not register')
+            await asyncio.sleep(0.05)
+
+    def matches(self, count):
+        return [SC2Match('GresvanAIE', 'terranbot', f'bot{n}', 3) for n in range(count)]
+
+
+class TestFarm(FarmTestCase):
+    def test_throughput_scales_with_agents(self):
+        async def play(agents):
+            coordinator = FarmCoordinator('127.0.0.1', 0)
+            await coordinator.start()
+            for n in range(agents):
+                self.start_agent(f'scale{agents}_{n}', coordinator.port)
+            await self.registered(coordinator, agents)
+            started = time.monotonic()
+            replies = await asyncio.gather(*(coordinator.run(i, match) for i, match in enumerate(self.matches(4), 1)))
+            elapsed = time.monotonic() - started
+            await coordinator.close()
+            self.assertEqual([reply['entry']['bot2'] for reply in replies], [f'bot{n}' for n in range(4)])
+            self.assertEqual(len({reply['agent'] for reply in replies}), agents)
+            return elapsed
+
+        one = asyncio.run(play(1))
+        two = asyncio.run(play(2))
+        self.assertLess(two, one * 0.75)
+
+    def test_jobs_of_a_dead_agent_are_requeued(self):
+        async def run():
+            coordinator = FarmCoordinator('127.0.0.1', 0)
+            await coordinator.start()
+            doomed = self.start_agent('doomed', coordinator.port, game=30)
+            await self.registered(coordinator, 1)
+            self.start_agent('survivor', coordinator.port, game=0.3)
+            await self.registered(coordinator, 2)
+            runs = [asyncio.ensure_future(coordinator.run(i, match)) for i, match in enumerate(self.matches(3), 1)]
+            while not coordinator.agents['doomed'].jobs:
+                await asyncio.sleep(0.05)
+            doomed.send_signal(signal.SIGKILL)
+            replies = await asyncio.wait_for(asyncio.gather(*runs), 20)
+            self.assertEqual({reply['agent'] for reply in replies}, {'survivor'})
+            self.assertEqual(sorted(reply['match_id'] for reply in replies), [1, 2, 3])
+            self.assertGreaterEqual(coordinator.requeued, 1)
+            self.assertNotIn('doomed', coordinator.agents)
+            await coordinator.close()
+        asyncio.run(run())
+
+    def test_silent_agent_times_out(self):
+        async def run():
+            coordinator = FarmCoordinator('127.0.0.1', 0, heartbeat_interval=0.05, heartbeat_timeout=0.3)
+            await coordinator.start()
+            # Registers, then never says another word
+            reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+            writer.write(encode({'type': 'register', 'name': 'hung', 'capacity': 1}))
+            await self.registered(coordinator, 1)
+            job = asyncio.ensure_future(coordinator.run(1, self.matches(1)[0]))
+            job_line = json.loads(await reader.readline())
+            self.assertEqual(json.loads(await reader.readline())['match_id'], 1)
+            self.assertEqual(job_line['type'], 'welcome')
+
+            directory = os.path.join(self.dir, 'good')
+            os.makedirs(directory)
+            executor = ThreadPoolExecutor(2)
+            workers = make_workers([directory], fake_compose.command(game=0.1), executor=executor)
+            workers[0].completion.poll_interval = 0.02
+            agent = FarmAgent('127.0.0.1', coordinator.port, workers, name='good')
+            serving = asyncio.ensure_future(agent.serve())
+            reply = await asyncio.wait_for(job, 10)
+            self.assertEqual((reply['agent'], reply['entry']['bot2']), ('good', 'bot0'))
+            self.assertEqual(coordinator.requeued, 1)
+            serving.cancel()
+            writer.close()
+            await coordinator.close()
+            await asyncio.gather(serving, *(w.teardown_task for w in workers if w.teardown_task),
+                                 return_exceptions=True)
+            executor.shutdown()
+        asyncio.run(run())
+
+    def test_agents_need_the_token(self):
+        async def run():
+            coordinator = FarmCoordinator(port=0, token='s3cret')
+            await coordinator.start()
+            self.assertEqual(coordinator.host, '127.0.0.1')
+            for token in (None, 'guess'):
+                reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+                writer.write(encode({'type': 'register', 'name': 'intruder', 'capacity': 1, 'token': token}))
+                self.assertEqual(await reader.readline(), b'')
+                writer.close()
+            reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+            writer.write(encode({'type': 'register', 'name': 'rig1', 'capacity': 1, 'token': 's3cret'}))
+            self.assertEqual(json.loads(await reader.readline())['type'], 'welcome')
+            self.assertEqual(list(coordinator.agents), ['rig1'])
+            writer.close()
+            await coordinator.close()
+        asyncio.run(run())
+
+    def test_coordinator_skips_messages_that_are_not_objects(self):
+        async def run():
+            coordinator = FarmCoordinator(port=0)
+            await coordinator.start()
+            reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+            writer.write(encode({'type': 'register', 'name': 'rig1', 'capacity': 1}))
+            await reader.readline()
+            job = asyncio.ensure_future(coordinator.run(1, self.matches(1)[0]))
+            self.assertEqual(json.loads(await reader.readline())['type'], 'job')
+            with self.assertLogs('sc2_bootstrap_discord.farm', 'WARNING') as logs:
+                for line in (b'[]\n', b'1\n', b'"x"\n'):
+                    writer.write(line)
+                writer.write(encode({'type': 'result', 'match_id': 1, 'entry': None}))
+                reply = await asyncio.wait_for(job, 5)
+            self.assertEqual(len(logs.records), 3)
+            self.assertEqual(reply['agent'], 'rig1')
+            self.assertIn('rig1', coordinator.agents)
+            writer.close()
+            await coordinator.close()
+        asyncio.run(run())
+
+    def test_agent_skips_malformed_messages(self):
+        async def run():
+            heartbeats = asyncio.get_running_loop().create_future()
+
+            async def coordinator(reader, writer):
+                self.assertEqual(json.loads(await reader.readline())['token'], 's3cret')
+                writer.write(b'not json\n')
+                writer.write(encode({'type': 'job', 'match_id': 1}))
+                writer.write(encode({'type': 'welcome', 'heartbeat_interval': 0.05}))
+                heartbeats.set_result(json.loads(await reader.readline()))
+                writer.close()
+
+            server = await asyncio.start_server(coordinator, '127.0.0.1', 0)
+            agent = FarmAgent('127.0.0.1', server.sockets[0].getsockname()[1], [], name='rig1', token='s3cret')
+            serving = asyncio.ensure_future(agent.serve())
+            with self.assertLogs('sc2_bootstrap_discord.farm', 'WARNING') as logs:
+                self.assertEqual((await asyncio.wait_for(heartbeats, 5))['type'], 'heartbeat')
+            self.assertEqual(len(logs.records), 2)
+            await asyncio.wait_for(serving, 5)
+            server.close()
+            await server.wait_closed()
+        asyncio.run(run())
+
+
+class TestRunnerFarm(FarmTestCase):
+    def test_runner_hands_matches_to_the_farm(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           concurrency=0, farm_options={'host': '127.0.0.1', 'port': 0})
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+
+        async def run():
+            await runner.farm.start()
+            self.start_agent('remote', runner.farm.port, game=0.2, workers=2)
+            await self.registered(runner.farm, 1)
+            for n in range(3):
+                runner.queue_match(f'bot{n}', 'GresvanAIE')
+            while runner.match_queue or runner.match_tasks:
+                if not await runner._dispatch():
+                    await asyncio.sleep(0.02)
+            self.assertIn('remote: 0/2 running', runner.farm_status())
+            await runner.farm.close()
+
+        asyncio.run(run())
+        with open('results.json') as f:
+            results = json.load(f)['results']
+        self.assertEqual([entry['match'] for entry in results], [1, 2, 3])
+        self.assertTrue(all(entry['worker'].startswith('remote/sc2_w') for entry in results))
+        self.assertEqual(runner.results.leaderboard.totals('terranbot')['games'], 3)
+
+    def test_matches_beyond_the_farm_capacity_stay_queued(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        runner = Sc2Runner('terranbot', intents=discord.Intents.none(), queue_journal=None,
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           concurrency=0, farm_options={'host': '127.0.0.1', 'port': 0})
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+
+        class SlowChannel:
+            async def send(self, message):
+                await asyncio.sleep(0.05)
+
+        runner.channel_id = 1
+        runner.get_channel = lambda channel_id: SlowChannel()
+
+        async def run():
+            await runner.farm.start()
+            # Takes two jobs and never finishes them
+            reader, writer = await asyncio.open_connection('127.0.0.1', runner.farm.port)
+            writer.write(encode({'type': 'register', 'name': 'rig1', 'capacity': 2}))
+            await self.registered(runner.farm, 1)
+            for n in range(5):
+                runner.queue_match(f'bot{n}', 'GresvanAIE')
+            for _ in range(3):
+                while await runner._dispatch():
+                    pass
+                await asyncio.sleep(0.1)
+            self.assertEqual(len(runner.match_queue), 3)
+            self.assertEqual(sorted(runner.farm.agents['rig1'].jobs), [1, 2])
+            self.assertEqual((len(runner.farm.pending), runner.farm.reserved), (0, 0))
+            for task in list(runner.match_tasks):
+                task.cancel()
+            writer.close()
+            await runner.farm.close()
+            await asyncio.gather(*runner.match_tasks, return_exceptions=True)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
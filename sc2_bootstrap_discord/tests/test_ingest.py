@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from sc2_bootstrap_discord.ingest import (
+    ingest_to_gelf, ingest_to_npz, line_ranges, parse_matches, parse_range, send_range
+)
+from .gelf_receiver import GelfReceiver
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LINE = "14:25 {step} {ms}ms 195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 attacking {n}\n"
+
+
+def write_log(path, matches=((0, 300),), lines_per_step=3):
+    """Write one run of steps per match; steps restart at the start of each match."""
+    n = 0
+    with open(path, 'w') as f:
+        for first, last in matches:
+            for step in range(first, last):
+                for _ in range(lines_per_step):
+                    f.write(LINE.format(step=step, ms=step % 90, n=n))
+                    n += 1
+            f.write("Result: Victory\n")
+    return n
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'logs', 'bot_controller1', 'TBone', 'stderr.log')
+        os.makedirs(os.path.dirname(self.path))
+
+    def test_ranges_split_on_line_boundaries(self):
+        lines = write_log(self.path)
+        ranges = line_ranges(self.path, range_size=1000)
+        self.assertGreater(len(ranges), 10)
+        self.assertEqual(ranges[0][1], 0)
+        self.assertEqual(ranges[-1][2], os.path.getsize(self.path))
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for (_, start, end), (_, next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b'\n')
+        self.assertEqual(sum(len(b) for r in ranges for b in parse_range(*r)), lines)
+
+    def test_matches_are_stitched_across_ranges_and_workers(self):
+        write_log(self.path, matches=((0, 300), (0, 200)))
+        single = parse_matches(self.path)
+        self.assertEqual([len(m) for m in single], [900, 600])
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = parse_matches(self.path, executor, range_size=4096)
+        self.assertEqual([len(m) for m in parallel], [900, 600])
+        self.assertEqual(parallel[1].text['message'][-1], 'attacking 1499')
+        self.assertEqual(list(parallel[0].columns['game_step']), list(single[0].columns['game_step']))
+        self.assertEqual(parallel[0].columns['step_length_ms'][89], 29)
+
+    def test_send_range_to_graylog(self):
+        lines = write_log(self.path, matches=((0, 20),))
+        receiver = GelfReceiver('tcp', keep_messages=True)
+        self.addCleanup(receiver.stop)
+        port = receiver.start()
+        sent = ingest_to_gelf([self.path], '127.0.0.1', port, transport='tcp', match_id=9, range_size=512)
+        # The trailing "Result" line is shipped raw, like the live monitor does
+        self.assertEqual(sent, lines + 1)
+        self.assertEqual(receiver.wait_for(sent), sent)
+        message = receiver.messages[0]
+        self.assertEqual((message['_match'], message['_bot_name'], message['_minerals']), (9, 'TBone', 195))
+
+    def test_send_rate_is_capped(self):
+        lines = write_log(self.path, matches=((0, 20),))
+        receiver = GelfReceiver('udp')
+        self.addCleanup(receiver.stop)
+        port = receiver.start()
+        start = time.perf_counter()
+        send_range(self.path, 0, os.path.getsize(self.path), '127.0.0.1', port, rate=150)
+        # 61 records at 150/s, sent in a single batch and then paced
+        self.assertGreater(time.perf_counter() - start, (lines + 1) / 150 * 0.9)
+
+    @unittest.skipUnless(numpy, 'numpy not installed')
+    def test_npz_per_match(self):
+        write_log(self.path, matches=((0, 30), (0, 20)))
+        out_dir = os.path.join(self.tmpdir.name, 'out')
+        written = ingest_to_npz([self.path], out_dir, workers=2, range_size=1024)
+        self.assertEqual([os.path.basename(p) for p in written],
+                         ['bot_controller1_TBone_match001.npz', 'bot_controller1_TBone_match002.npz'])
+        with numpy.load(written[1]) as data:
+            self.assertEqual(len(data['game_step']), 60)
+            self.assertEqual(str(data['source_file'][0]), 'terranbot.builds.plans.acts.tbone_attack')
+
+
+if __name__ == '__main__':
+    unittest.main()
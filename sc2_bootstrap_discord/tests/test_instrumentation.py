@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.instrumentation import HISTOGRAM_BUCKETS, Histogram, PipelineStats
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+
+LINE = "06:07 8232   86ms    61M  212G  84/110U DEBUG terranbot.builds.plans.acts.zone_defense:{n} Number enemies: 2\n"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHistogram(unittest.TestCase):
+    def test_power_of_two_buckets(self):
+        histogram = Histogram()
+        for us in (0, 1, 3, 100, 100, 100, 10**9):
+            histogram.observe(us * 1000)
+        self.assertEqual(histogram.count, 7)
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[2], 1)
+        # 100us lands in [64, 128)
+        self.assertEqual(histogram.counts[7], 3)
+        self.assertEqual(histogram.counts[HISTOGRAM_BUCKETS - 1], 1)
+        self.assertEqual(histogram.percentile(50), 128)
+        self.assertEqual(histogram.summary()['max_us'], 10**9)
+
+    def test_sampling_and_rates(self):
+        clock = FakeClock()
+        stats = PipelineStats(sample_every=4, clock=clock)
+        self.assertEqual([stats.sample() for _ in range(8)], [False, False, False, True] * 2)
+        stats.lines = 500
+        clock.now = 2.0
+        mark = stats.mark()
+        self.assertEqual(stats.lines_per_second(), 250)
+        stats.lines = 600
+        clock.now = 3.0
+        self.assertEqual(stats.lines_per_second(mark), 100)
+        # Asking does not move anyone's window
+        self.assertEqual(stats.lines_per_second(), 200)
+        self.assertEqual(stats.lines_per_second(mark), 100)
+
+
+class TestMonitorInstrumentation(unittest.TestCase):
+    def test_pipeline_stats(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'stderr.log')
+            open(path, 'w').close()
+            monitor = LogMonitor(path, 'dummy_host', 12201, rollup_window=0, step_index=False)
+            self.addCleanup(monitor.shipper.stop)
+            monitor.shipper.handlers = []
+            monitor.stats = PipelineStats(sample_every=10)
+            monitor._source(path)
+            monitor._poll_sources()
+            with open(path, 'a') as f:
+                for n in range(300):
+                    f.write(LINE.format(n=n))
+                f.write("Traceback (most recent call last):\n" * 100)
+            monitor._poll_sources()
+            stats = monitor.pipeline_stats()
+            self.assertEqual(stats['lines'], 400)
+            self.assertEqual(stats['parse_hit_ratio'], 0.75)
+            self.assertEqual(stats['bytes_read'], os.path.getsize(path))
+            self.assertEqual((stats['parse']['count'], stats['build']['count']), (40, 40))
+            self.assertEqual(stats['read']['count'], 2)
+            for source in monitor.sources.values():
+                source.close()
+
+    def test_can_be_disabled(self):
+        monitor = LogMonitor('stderr.log', 'dummy_host', 12201, instrument=False)
+        self.addCleanup(monitor.shipper.stop)
+        self.assertIsNone(monitor.pipeline_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.journal import BUMP, CANCEL, FINISH, QUEUE, START, QueueJournal
+from . import fake_compose
+
+
+class TestQueueJournal(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'queue.journal')
+
+    def match(self, bot2, priority=3):
+        return ['GresvanAIE', 'terranbot', bot2, priority, 'alice']
+
+    def test_replay(self):
+        journal = QueueJournal(self.path)
+        self.assertEqual(journal.replay(), [])
+        for ticket in (1, 2, 3, 4):
+            journal.record(QUEUE, ticket, match=self.match(f'bot{ticket}'))
+        journal.record(START, 1, match_id=7)
+        journal.record(FINISH, 1)
+        journal.record(START, 2, match_id=8)
+        journal.record(BUMP, 3, match=self.match('bot3', 1))
+        journal.record(CANCEL, 4)
+        journal.close()
+
+        again = QueueJournal(self.path)
+        records = again.replay()
+        self.assertEqual([(r.ticket, r.match[2], r.match[3], r.match_id) for r in records],
+                         [(2, 'bot2', 3, 8), (3, 'bot3', 1, None)])
+        self.assertEqual(again.next_ticket, 5)
+        # Match 8 was in flight and is queued again
+        self.assertEqual(again.live[2][1], None)
+
+    def test_torn_last_line_is_cut_off(self):
+        journal = QueueJournal(self.path)
+        journal.record(QUEUE, 1, match=self.match('bot1'))
+        journal.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'{"op":"queue","ticket":2,"ma')
+        again = QueueJournal(self.path)
+        self.assertEqual([r.ticket for r in again.replay()], [1])
+        again.record(QUEUE, 3, match=self.match('bot3'))
+        again.close()
+        self.assertEqual([r.ticket for r in QueueJournal(self.path).replay()], [1, 3])
+
+    def test_compaction(self):
+        journal = QueueJournal(self.path, compact_min=100)
+        journal.replay()
+        for ticket in range(1, 501):
+            journal.record(QUEUE, ticket, match=self.match(f'bot{ticket}'))
+            if ticket % 10:
+                journal.record(START, ticket, match_id=ticket)
+                journal.record(FINISH, ticket)
+            journal.flush()
+        journal.record(START, 500, match_id=1000)
+        journal.close()
+        self.assertGreater(journal.compactions, 0)
+        with open(self.path, 'rb') as f:
+            lines = f.read().count(b'\n')
+        # 1,401 events written, 50 matches left
+        self.assertEqual(lines, journal.lines)
+        self.assertLessEqual(lines, 4 * 50 + 3)
+        again = QueueJournal(self.path)
+        records = again.replay()
+        self.assertEqual([r.ticket for r in records], list(range(10, 501, 10)))
+        self.assertEqual(records[-1].match_id, 1000)
+        self.assertEqual(again.next_ticket, 501)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+
+class TestRunnerRestart(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def runner(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                           results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                           compose_command=fake_compose.command(game=30))
+        self.addCleanup(runner.io_executor.shutdown)
+        self.addCleanup(runner.results.close)
+        return runner
+
+    def test_queue_survives_a_crash(self):
+        runner = self.runner()
+        tickets = [runner.queue_match(f'bot{n}', 'GresvanAIE', requester='alice') for n in range(4)]
+        runner.bump_match(tickets[3], 1)
+        runner.cancel_match(tickets[2])
+
+        async def start_one():
+            self.assertTrue(await runner._dispatch())
+            self.assertEqual(runner.workers[0].match.bot2, 'bot3')
+        asyncio.run(start_one())
+        # The process dies here: no close(), only what the pool already wrote
+        runner.io_executor.submit(runner.journal.flush).result()
+        process = runner.workers[0].process
+        if process is not None and process.returncode is None:
+            process.kill()
+
+        restarted = self.runner()
+        queued = restarted.match_queue.queued()
+        # bot3, bumped, was in flight and is queued again; bot2 stays cancelled
+        self.assertEqual([(ticket, match.bot2, match.priority) for ticket, match in queued],
+                         [(tickets[3], 'bot3', 1), (tickets[0], 'bot0', 3), (tickets[1], 'bot1', 3)])
+        self.assertEqual(restarted.queue_match('bot9', 'GresvanAIE'), tickets[-1] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.leaderboard import INITIAL_RATING, elo, score
+from sc2_bootstrap_discord.results import ResultsStore
+
+OPPONENTS = {'zergbot': 'Zerg', 'protossbot': 'Protoss'}
+
+
+def results(count):
+    """Alternating opponents and maps; terranbot wins two in three."""
+    entries = []
+    for match in range(1, count + 1):
+        opponent = 'zergbot' if match % 2 else 'protossbot'
+        result = 'Player2Win' if match % 3 == 0 else 'Player1Win'
+        entries.append({'match': match, 'bot1': 'terranbot', 'bot2': opponent, 'result': result,
+                        'map': 'AcropolisAIE' if match % 4 else 'GresvanAIE'})
+    return entries
+
+
+class TestElo(unittest.TestCase):
+    def test_even_match(self):
+        self.assertEqual(elo(1500, 1500, 1.0, k=32), (1516, 1484))
+        self.assertEqual(elo(1500, 1500, 0.5, k=32), (1500, 1500))
+
+    def test_upset_moves_more(self):
+        favourite, underdog = elo(1700, 1500, 0.0)
+        self.assertGreater(1700 - favourite, 16)
+        self.assertAlmostEqual(favourite + underdog, 3200)
+
+    def test_score(self):
+        self.assertEqual([score(r) for r in ('Player1Win', 'Player2Crash', 'Player2Win', 'Tie', 'Error', None)],
+                         [1.0, 1.0, 0.0, 0.5, None, None])
+
+
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.results_path = os.path.join(tmpdir.name, 'results.json')
+        self.store = ResultsStore(self.results_path, os.path.join(tmpdir.name, 'results.db'))
+        self.addCleanup(self.store.close)
+        self.board = self.store.leaderboard
+
+    def write(self, entries):
+        with open(self.results_path, 'w') as f:
+            json.dump({'results': entries}, f)
+
+    def record_all(self, entries):
+        """Report each result as Sc2Runner does: ingest, annotate, record."""
+        for i, entry in enumerate(entries):
+            self.write(entries[:i + 1])
+            self.store.refresh()
+            self.store.annotate(entry['match'], race=OPPONENTS[entry['bot2']])
+            self.assertTrue(self.board.record(entry['match']))
+
+    def test_record_counts_once(self):
+        self.record_all(results(6))
+        self.assertFalse(self.board.record(6))
+        self.assertEqual(self.board.totals('terranbot'),
+                         {'total': 'all', 'games': 6, 'wins': 4, 'losses': 2, 'ties': 0, 'win_rate': 0.667})
+        self.assertEqual(self.board.rating('terranbot')['games'], 6)
+        self.assertGreater(self.board.rating('TerranBot')['rating'], INITIAL_RATING)
+
+    def test_views(self):
+        self.record_all(results(12))
+        by_opponent = {row['opponent']: (row['wins'], row['losses']) for row in self.board.by_opponent('terranbot')}
+        self.assertEqual(by_opponent, {'zergbot': (4, 2), 'protossbot': (4, 2)})
+        by_race = {row['race']: row['games'] for row in self.board.by_race('terranbot')}
+        self.assertEqual(by_race, {'Zerg': 6, 'Protoss': 6})
+        by_map = {row['map']: row['games'] for row in self.board.by_map('terranbot', 'protossbot')}
+        self.assertEqual(by_map, {'AcropolisAIE': 3, 'GresvanAIE': 3})
+        self.assertEqual(self.board.totals('terranbot', 'nobody')['games'], 0)
+
+    def test_undecided_results_are_not_counted(self):
+        self.write([{'match': 1, 'bot1': 'terranbot', 'bot2': 'zergbot', 'result': 'Error'}])
+        self.store.refresh()
+        self.assertFalse(self.board.record(1))
+        self.assertTrue(self.board.is_empty())
+
+    def test_rebuild_matches_incremental(self):
+        entries = results(30)
+        self.record_all(entries)
+        incremental = (self.board.by_opponent('terranbot'), self.board.by_map('terranbot'), self.board.ratings())
+        self.assertEqual(self.board.rebuild(), 30)
+        rebuilt = (self.board.by_opponent('terranbot'), self.board.by_map('terranbot'), self.board.ratings())
+        self.assertEqual(rebuilt, incremental)
+        # Everything was counted by the rebuild, so recording again changes nothing
+        self.assertFalse(self.board.record(30))
+
+    def test_rebuild_stats_from_results_file(self):
+        self.write(results(9))
+        self.assertEqual(self.store.rebuild_stats(), 9)
+        self.assertEqual(self.board.totals('terranbot')['wins'], 6)
+        self.assertEqual({row['race'] for row in self.board.by_race('terranbot')}, {'?'})
+
+
+if __name__ == '__main__':
+    unittest.main()
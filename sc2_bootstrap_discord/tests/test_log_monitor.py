@@ -1,5 +1,6 @@
 import unittest
 from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.parser import DebugRecord, parse_debug_line
 
 class TestLogMonitor(unittest.TestCase):
     def setUp(self):
@@ -140,5 +141,23 @@ class TestLogMonitor(unittest.TestCase):
                 result = self.monitor._parse_debug_line(line)
                 self.assertIsNone(result, f"Should not parse invalid line: {line}")
 
+    def test_parse_debug_line_returns_record(self):
+        line = "09:21 12572 116ms 164M 993G 81/158U WARNING terranbot.builds.plans.acts.tbone_attack:747 No ground units for main_army, using center of group"
+        record = parse_debug_line(line)
+        self.assertIsInstance(record, DebugRecord)
+        self.assertEqual(record.game_step, 12572)
+        self.assertEqual(record.source_file, 'terranbot.builds.plans.acts.tbone_attack')
+        self.assertEqual(record._asdict(), self.monitor._parse_debug_line(line))
+
+    def test_prefix_check_rejects_before_regex(self):
+        for line in [
+            "",
+            "Traceback (most recent call last):",
+            "  File \"/root/bot/run.py\", line 12, in <module> raise SystemExit(1)",
+            "2024-01-01 12:00:00 INFO some.module:12 a long line from another logger",
+        ]:
+            with self.subTest(line=line):
+                self.assertIsNone(parse_debug_line(line))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
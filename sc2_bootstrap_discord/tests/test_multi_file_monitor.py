@@ -0,0 +1,128 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.log_monitor import LogMonitor, source_tags
+
+LINE = "06:07 8232   86ms    61M  212G  84/110U DEBUG terranbot.builds.plans.acts.zone_defense:{n} Number enemies: 2\n"
+
+
+class TestSourceTags(unittest.TestCase):
+    def test_controller_and_bot_from_path(self):
+        self.assertEqual(source_tags('logs/bot_controller2/TBoneMicro/stderr.log'),
+                         {'controller': 'bot_controller2', 'bot_name': 'TBoneMicro'})
+        self.assertEqual(source_tags('/srv/logs/bot_controller1/stderr.log'), {'controller': 'bot_controller1'})
+        self.assertEqual(source_tags('stderr.log'), {})
+
+
+class TestMultiFileMonitor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.logs = os.path.join(self.tmpdir.name, 'logs')
+
+    def log_path(self, controller, bot):
+        path = os.path.join(self.logs, controller, bot, 'stderr.log')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def test_glob_picks_up_new_files_and_tags_records(self):
+        first = self.log_path('bot_controller1', 'TBone')
+        open(first, 'w').close()
+        monitor = LogMonitor(os.path.join(self.logs, 'bot_controller*', '**', 'stderr.log'),
+                             'dummy_host', 12201, rollup_window=0, discover_interval=0.05)
+        monitor.current_match_id = 3
+        emitted = []
+        monitor._emit = lambda message, fields, match_id=None, source=None: emitted.append(
+            (fields['line_number'], source.tags))
+
+        async def run():
+            task = asyncio.ensure_future(monitor._monitor_log_file())
+            await asyncio.sleep(0.1)
+            with open(first, 'a') as f:
+                f.write(LINE.format(n=1))
+            # A second controller's log appears mid-session and is read from its start
+            second = self.log_path('bot_controller2', 'Opponent')
+            with open(second, 'a') as f:
+                f.write(LINE.format(n=2))
+            for _ in range(100):
+                if len(emitted) >= 2:
+                    break
+                await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertEqual(sorted(emitted, key=lambda e: e[0]), [
+            (1, {'controller': 'bot_controller1', 'bot_name': 'TBone'}),
+            (2, {'controller': 'bot_controller2', 'bot_name': 'Opponent'}),
+        ])
+        self.assertEqual(len(monitor.sources), 2)
+        self.assertTrue(os.path.exists(first + '.offset'))
+
+    def test_worker_directories_keep_their_own_match(self):
+        workers = [os.path.join(self.tmpdir.name, 'workers', name) for name in ('a', 'b')]
+        paths = []
+        for worker in workers:
+            path = os.path.join(worker, 'logs', 'bot_controller1', 'TBone', 'stderr.log')
+            os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+            paths.append(path)
+        monitor = LogMonitor(os.path.join(self.tmpdir.name, 'workers', '*', 'logs', '**', 'stderr.log'),
+                             'dummy_host', 12201, rollup_window=0)
+        emitted = []
+        monitor._emit = lambda message, fields, match_id=None, source=None: emitted.append(
+            (fields['line_number'], match_id))
+
+        async def run():
+            monitor._discover(first=True)
+            monitor._poll_sources()
+            await monitor.set_match(11, workers[0])
+            await monitor.set_match(12, workers[1])
+            for n, path in enumerate(paths):
+                with open(path, 'a') as f:
+                    f.write(LINE.format(n=n))
+            while monitor._poll_sources():
+                pass
+            logs = await monitor.cut_logs(workers[1])
+            self.assertEqual([log.path for log in logs], [f'{paths[1]}.12'])
+            self.assertTrue(os.path.exists(paths[0]))
+
+        asyncio.run(run())
+        self.assertEqual(sorted(emitted), [(0, 11), (1, 12)])
+
+
+class TestAsyncLifecycle(unittest.TestCase):
+    def test_start_set_match_and_aclose_on_one_loop(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'stderr.log')
+            open(path, 'w').close()
+            monitor = LogMonitor(path, 'dummy_host', 12201, rollup_window=0)
+            emitted = []
+            monitor._emit = lambda message, fields, match_id=None, source=None: emitted.append(
+                (fields['line_number'], monitor.current_match_id if match_id is None else match_id))
+
+            async def run():
+                await monitor.set_match(1)
+                await monitor.start()
+                await asyncio.sleep(0.1)
+                with open(path, 'a') as f:
+                    f.write(LINE.format(n=1))
+                # Written before the switch, so it still belongs to match 1
+                await monitor.set_match(2)
+                with open(path, 'a') as f:
+                    f.write(LINE.format(n=2))
+                for _ in range(100):
+                    if len(emitted) >= 2:
+                        break
+                    await asyncio.sleep(0.05)
+                await monitor.aclose()
+
+            asyncio.run(run())
+            self.assertEqual(emitted, [(1, 1), (2, 2)])
+            self.assertIsNone(monitor.monitor_task)
+            self.assertIsNone(monitor.shipper._thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.results import ResultsFile, ResultsStore, append_results, last_entry
+
+
+def entry(match, opponent='zergbot', result='Player1Win', map_name=None):
+    result_entry = {'match': match, 'bot1': 'terranbot', 'bot2': opponent, 'result': result,
+                    'game_time_formatted': '10:00'}
+    if map_name:
+        result_entry['map'] = map_name
+    return result_entry
+
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.results_path = os.path.join(tmpdir.name, 'results.json')
+        self.db_path = os.path.join(tmpdir.name, 'results.db')
+        self.store = ResultsStore(self.results_path, self.db_path)
+        self.addCleanup(lambda: self.store.close())
+
+    def write(self, entries):
+        # local-bootstrap rewrites the whole file after every match
+        with open(self.results_path, 'w') as f:
+            json.dump({'results': entries}, f, indent=4)
+
+    def test_missing_file(self):
+        self.assertEqual(self.store.refresh(), 0)
+        self.assertIsNone(self.store.latest())
+        self.assertEqual(self.store.next_match_id(), 1)
+
+    def test_only_new_entries_are_ingested(self):
+        entries = [entry(i) for i in range(1, 6)]
+        self.write(entries)
+        self.assertEqual(self.store.refresh(), 5)
+        self.assertEqual(self.store.refresh(), 0)
+        entries.append(entry(6, 'protossbot'))
+        self.write(entries)
+        self.assertEqual(self.store.refresh(), 1)
+        self.assertEqual(self.store.latest()['bot2'], 'protossbot')
+        self.assertEqual(self.store.next_match_id(), 7)
+
+    def test_state_survives_a_restart(self):
+        self.write([entry(1), entry(2)])
+        self.store.refresh()
+        self.store.close()
+        self.store = ResultsStore(self.results_path, self.db_path)
+        self.write([entry(1), entry(2), entry(3)])
+        self.assertEqual(self.store.refresh(), 1)
+
+    def test_rewritten_history_is_ingested_again(self):
+        self.write([entry(1), entry(2), entry(3)])
+        self.store.refresh()
+        self.write([entry(1, result='Player2Win'), entry(2)])
+        self.assertEqual(self.store.refresh(), 2)
+        self.assertEqual(self.store.get(1)['result'], 'Player2Win')
+        self.assertEqual(self.store.latest()['match'], 2)
+
+    def test_truncated_entry_waits_for_the_rest(self):
+        self.write([entry(1), entry(2)])
+        with open(self.results_path) as f:
+            text = f.read()
+        cut = text.rindex('"result"')
+        with open(self.results_path, 'w') as f:
+            f.write(text[:cut])
+        self.assertEqual(self.store.refresh(), 1)
+        with open(self.results_path, 'w') as f:
+            f.write(text)
+        self.assertEqual(self.store.refresh(), 1)
+        self.assertEqual(self.store.next_match_id(), 3)
+
+    def test_history_filters_and_annotations(self):
+        self.write([entry(1, 'zergbot'), entry(2, 'protossbot'), entry(3, 'zergbot'),
+                    entry(4, 'ZergBot', map_name='GresvanAIE')])
+        self.store.refresh()
+        self.store.annotate(1, map_name='AcropolisAIE')
+        self.store.annotate(3, map_name='GresvanAIE')
+        self.assertEqual([r['match'] for r in self.store.history(limit=2)], [4, 3])
+        self.assertEqual([r['match'] for r in self.store.history('zergbot')], [4, 3, 1])
+        self.assertEqual([r['match'] for r in self.store.history('zergbot', 'Gresvan')], [4, 3])
+        self.assertEqual(self.store.history(map_name='Acro')[0]['map'], 'AcropolisAIE')
+        # Re-ingesting the same entry keeps what was annotated
+        self.write([entry(1, 'zergbot', result='Tie')])
+        self.store.refresh()
+        self.assertEqual((self.store.get(1)['result'], self.store.get(1)['map']), ('Tie', 'AcropolisAIE'))
+
+    def test_appended_entries_are_read_incrementally(self):
+        append_results(self.results_path, [entry(1)])
+        self.assertEqual(self.store.refresh(), 1)
+        append_results(self.results_path, [entry(2, 'protossbot'), entry(3)])
+        self.assertEqual(self.store.refresh(), 2)
+        with open(self.results_path) as f:
+            self.assertEqual([e['match'] for e in json.load(f)['results']], [1, 2, 3])
+        self.write([])
+        append_results(self.results_path, [entry(4)])
+        self.assertEqual(ResultsFile(self.results_path).last()['match'], 4)
+
+    def test_entries_without_match_ids_use_their_position(self):
+        self.write([{'result': 'Player1Win'}, {'result': 'Player2Win'}])
+        self.store.refresh()
+        self.assertEqual(self.store.next_match_id(), 3)
+
+
+class TestResultsFile(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'results.json')
+        self.results = ResultsFile(self.path, block_size=256)
+
+    def write(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def test_last_entry_ignores_nested_objects(self):
+        nested = {'match': 2, 'bot1_tags': [{'tag': 'a'}], 'stats': {'apm': 100}}
+        text = json.dumps({'results': [entry(1), nested]}, indent=4)
+        self.assertEqual(last_entry(text), nested)
+        self.assertEqual(last_entry(text[-40:]), None)
+
+    def test_last_reads_only_the_tail(self):
+        self.write(json.dumps({'results': [entry(i) for i in range(1, 1001)]}, indent=4))
+        self.assertEqual(self.results.last()['match'], 1000)
+        self.assertEqual(self.results.next_match_id(), 1001)
+        self.assertEqual((self.results.tail_reads, self.results.full_reads), (2, 0))
+
+    def test_large_entry_grows_the_read(self):
+        big = dict(entry(2), notes='x' * 5000)
+        self.write(json.dumps({'results': [entry(1), big]}))
+        self.assertEqual(self.results.last(), big)
+        self.assertEqual(self.results.full_reads, 0)
+
+    def test_falls_back_to_cached_full_parse(self):
+        # Not the usual layout: the tail never ends in ]}
+        self.write(json.dumps({'results': [entry(1), entry(2)], 'version': 1}))
+        self.assertEqual(self.results.last()['match'], 2)
+        self.results.last()['opponent'] = 'changed'
+        self.assertNotIn('opponent', self.results.last())
+        self.assertEqual(self.results.full_reads, 1)
+        self.write(json.dumps({'results': [entry(1), entry(2), entry(3)], 'version': 1}))
+        self.assertEqual(self.results.last()['match'], 3)
+        self.assertEqual(self.results.full_reads, 2)
+
+    def test_missing_or_empty(self):
+        self.assertIsNone(self.results.last())
+        self.assertEqual(self.results.next_match_id(), 1)
+        self.write(json.dumps({'results': []}))
+        self.assertIsNone(self.results.last())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.parser import parse_debug_line
+from sc2_bootstrap_discord.rollup import LogRollup, SourceRateLimiter, TokenBucket
+
+PREDICTER = "{step} 170ms   380M 3702G 173/200U Level 20 sharpy.managers.core.log_manager:71 [EnemyArmyPredicter] Predicting negative free minerals"
+ATTACK = "{step} 152ms   195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 attacking"
+
+
+def line(template, step):
+    return template.format(step=f"14:25 {step}")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLogRollup(unittest.TestCase):
+    def test_identical_records_are_grouped_within_window(self):
+        rollup = LogRollup(window_steps=10)
+        closed, shipped = [], []
+        for step in range(0, 30, 2):
+            entries, first = rollup.add(parse_debug_line(line(PREDICTER, step)))
+            closed += entries
+            if first:
+                shipped.append(step)
+        # Groups opened at steps 0, 10 and 20 (the first two have closed)
+        self.assertEqual(shipped, [0, 10, 20])
+        self.assertEqual([(e.first_game_step, e.last_game_step, e.repeat_count) for e in closed],
+                         [(0, 8, 4), (10, 18, 4)])
+        closed = rollup.flush()
+        self.assertEqual([(e.first_game_step, e.last_game_step, e.repeat_count) for e in closed],
+                         [(20, 28, 4)])
+        self.assertEqual(closed[0].record.game_step, 28)
+
+    def test_different_messages_are_kept_apart(self):
+        rollup = LogRollup(window_steps=100)
+        self.assertEqual(rollup.add(parse_debug_line(line(PREDICTER, 1))), ([], True))
+        self.assertEqual(rollup.add(parse_debug_line(line(ATTACK, 1))), ([], True))
+        self.assertEqual(rollup.add(parse_debug_line(line(PREDICTER, 2))), ([], False))
+        rollup.add(parse_debug_line(line(ATTACK, 3)))
+        entries = rollup.flush()
+        self.assertEqual([e.repeat_count for e in entries], [1, 1])
+        self.assertEqual(entries[1].record.source_file, 'terranbot.builds.plans.acts.tbone_attack')
+
+    def test_step_reset_flushes_previous_match(self):
+        rollup = LogRollup(window_steps=100)
+        rollup.add(parse_debug_line(line(PREDICTER, 5000)))
+        rollup.add(parse_debug_line(line(PREDICTER, 5001)))
+        closed, first = rollup.add(parse_debug_line(line(PREDICTER, 10)))
+        self.assertEqual([e.first_game_step for e in closed], [5000])
+        self.assertTrue(first)
+
+    def test_a_line_without_repeats_closes_silently(self):
+        rollup = LogRollup(window_steps=10)
+        rollup.add(parse_debug_line(line(PREDICTER, 1)))
+        self.assertEqual(rollup.add(parse_debug_line(line(ATTACK, 20))), ([], True))
+        self.assertEqual(rollup.flush(), [])
+        self.assertEqual((rollup.records_in, rollup.records_out), (2, 2))
+
+    def test_expire_closes_old_groups(self):
+        clock = FakeClock()
+        rollup = LogRollup(window_steps=1000, max_age=5.0, clock=clock)
+        rollup.add(parse_debug_line(line(PREDICTER, 1)))
+        rollup.add(parse_debug_line(line(PREDICTER, 2)))
+        clock.now = 3.0
+        rollup.add(parse_debug_line(line(ATTACK, 2)))
+        clock.now = 6.0
+        self.assertEqual([e.first_game_step for e in rollup.expire()], [1])
+        self.assertEqual(rollup.pending, 1)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket_refills(self):
+        bucket = TokenBucket(rate=2.0, burst=2.0, now=0.0)
+        self.assertEqual([bucket.allow(0.0) for _ in range(3)], [True, True, False])
+        self.assertTrue(bucket.allow(0.5))
+        self.assertFalse(bucket.allow(0.5))
+
+    def test_limits_are_per_source(self):
+        clock = FakeClock()
+        limiter = SourceRateLimiter(rate=1.0, burst=1.0, clock=clock)
+        self.assertTrue(limiter.allow('a'))
+        self.assertFalse(limiter.allow('a'))
+        self.assertTrue(limiter.allow('b'))
+        self.assertEqual(limiter.dropped, {'a': 1})
+
+
+class TestLogMonitorRollup(unittest.TestCase):
+    def setUp(self):
+        self.monitor = LogMonitor("dummy_path", "dummy_host", 12201, rollup_window=10)
+        self.emitted = []
+        self.monitor._emit = lambda message, fields, match_id=None, source=None: self.emitted.append(
+            (message, fields, match_id))
+
+    def test_repeats_are_shipped_once_with_counts(self):
+        self.monitor.current_match_id = 7
+        for step in range(0, 12):
+            self.monitor._handle_line(line(PREDICTER, step))
+        # The first at step 0, its repeats when step 10 closes the window, then the first at 10
+        self.assertEqual(len(self.emitted), 3)
+        message, fields, match_id = self.emitted[0]
+        self.assertEqual(message, '[EnemyArmyPredicter] Predicting negative free minerals')
+        self.assertEqual((fields['game_step'], match_id), (0, 7))
+        self.assertNotIn('repeat_count', fields)
+        message, fields, match_id = self.emitted[1]
+        self.assertEqual(message, '[EnemyArmyPredicter] Predicting negative free minerals')
+        self.assertEqual((fields['repeat_count'], fields['first_game_step'], fields['last_game_step']),
+                         (9, 0, 9))
+        self.assertEqual(match_id, 7)
+        self.assertEqual(self.emitted[2][1]['game_step'], 10)
+
+    def test_match_change_flushes_under_old_match(self):
+        self.monitor.current_match_id = 1
+        self.monitor._handle_line(line(PREDICTER, 100))
+        self.monitor._handle_line(line(PREDICTER, 101))
+        self.monitor.current_match_id = 2
+        self.monitor._handle_line(line(PREDICTER, 1))
+        self.assertEqual([(m[1]['game_step'], m[1].get('repeat_count'), m[2]) for m in self.emitted],
+                         [(100, None, 1), (101, 1, 1), (1, None, 2)])
+
+    def test_unparsed_lines_pass_straight_through(self):
+        self.monitor._handle_line("Traceback (most recent call last):")
+        self.assertEqual(self.emitted, [("Traceback (most recent call last):", {}, None)])
+
+    def test_unparsed_lines_keep_their_place(self):
+        self.monitor._handle_line(line(ATTACK, 1))
+        self.monitor._handle_line("Traceback (most recent call last):")
+        self.monitor._handle_line(line(ATTACK, 2))
+        self.assertEqual([message for message, _, _ in self.emitted],
+                         ['attacking', 'Traceback (most recent call last):'])
+
+
+if __name__ == '__main__':
+    unittest.main()
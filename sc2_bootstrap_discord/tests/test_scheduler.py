@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.scheduler import MatchScheduler
+from sc2_bootstrap_discord.workers import SC2Match
+
+
+def match(bot2, priority=3, requester=None):
+    return SC2Match('GresvanAIE', 'terranbot', bot2, priority, requester)
+
+
+def drain(scheduler):
+    order = []
+    while scheduler:
+        order.append(scheduler.pop().bot2)
+    return order
+
+
+class TestMatchScheduler(unittest.TestCase):
+    def test_priority_then_arrival(self):
+        scheduler = MatchScheduler()
+        for name, priority in (('a', 3), ('b', 1), ('c', 3), ('d', 2)):
+            scheduler.push(match(name, priority))
+        self.assertEqual(drain(scheduler), ['b', 'd', 'a', 'c'])
+        with self.assertRaises(IndexError):
+            scheduler.pop()
+        with self.assertRaises(ValueError):
+            scheduler.push(match('e', 6))
+
+    def test_requesters_take_turns(self):
+        scheduler = MatchScheduler()
+        for n in range(6):
+            scheduler.push(match(f'alice{n}', requester='alice'))
+        self.assertEqual(scheduler.pop().bot2, 'alice0')
+        scheduler.push(match('bob0', requester='bob'))
+        scheduler.push(match('bob1', requester='bob'))
+        self.assertEqual(drain(scheduler), ['alice1', 'bob0', 'alice2', 'bob1', 'alice3', 'alice4', 'alice5'])
+
+    def test_aging_lets_low_priority_run(self):
+        scheduler = MatchScheduler(aging=5)
+        scheduler.push(match('late', priority=5, requester='carol'))
+        # Everyone else keeps the queue full of urgent matches
+        for n in range(3):
+            scheduler.push(match(f'u{n}', priority=1, requester=f'user{n}'))
+        played = []
+        for n in range(3, 100):
+            played.append(scheduler.pop().bot2)
+            if played[-1] == 'late':
+                break
+            scheduler.push(match(f'u{n}', priority=1, requester=f'user{n}'))
+        self.assertEqual(played[-1], 'late')
+        # Four levels at 5 dispatches each, plus the matches already queued
+        self.assertLessEqual(len(played), 4 * 5 + 4)
+
+    def test_bump(self):
+        # Each level is worth more than the whole queue here
+        scheduler = MatchScheduler(aging=100)
+        tickets = [scheduler.push(match(f'm{n}')) for n in range(40)]
+        self.assertTrue(scheduler.bump(tickets[30], 1))
+        self.assertEqual(scheduler.get(tickets[30]).priority, 1)
+        self.assertFalse(scheduler.bump(999, 1))
+        with self.assertRaises(ValueError):
+            scheduler.bump(tickets[0], 0)
+        # Dead entries are dropped rather than piling up
+        for _ in range(20):
+            scheduler.bump(tickets[5], 2)
+            scheduler.bump(tickets[5], 4)
+        self.assertLessEqual(len(scheduler.queues[None]), 2 * len(scheduler) + 17)
+        self.assertEqual([ticket for ticket, _ in scheduler.queued()][:2], [tickets[30], tickets[0]])
+        order = drain(scheduler)
+        self.assertEqual(order[0], 'm30')
+        self.assertEqual(len(order), 40)
+        self.assertEqual(order.index('m5'), 39)
+        self.assertIsNone(scheduler.get(tickets[30]))
+
+
+class TestRunnerQueue(unittest.TestCase):
+    def test_queue_and_bump(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                                   results_options={'results_path': 'results.json', 'db_path': 'results.db'})
+                first = runner.queue_match('zergbot', 'GresvanAIE', requester='alice')
+                second = runner.queue_match('protossbot', 'GresvanAIE', priority=4, requester='bob')
+                self.assertIn(f'#{first} zergbot on GresvanAIE (priority 3 for alice)', runner.queue_status())
+                self.assertEqual(runner.bump_match(second),
+                                 f'Match #{second} against protossbot is now priority 3, 2 of 2 in the queue.')
+                self.assertIn('1 of 2', runner.bump_match(second, 1))
+                self.assertEqual(runner.bump_match(99), 'No match #99 in the queue.')
+                self.assertEqual(runner.match_queue.pop().bot2, 'protossbot')
+                runner.results.close()
+                runner.io_executor.shutdown()
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()
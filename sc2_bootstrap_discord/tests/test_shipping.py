@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+import unittest
+from sc2_bootstrap_discord.shipping import DROP_DEBUG, DROP_OLDEST, GelfShipper
+
+
+def make_record(msg, log_level='INFO'):
+    record = logging.LogRecord('test', logging.INFO, __file__, 0, msg, None, None)
+    record.log_level = log_level
+    return record
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(record.getMessage())
+
+
+class TestGelfShipper(unittest.TestCase):
+    def test_drop_oldest_keeps_newest_records(self):
+        handler = CollectingHandler()
+        shipper = GelfShipper([handler], maxsize=3, overflow=DROP_OLDEST)
+        for i in range(5):
+            shipper.submit(make_record(str(i)))
+        self.assertEqual(shipper.dropped, 2)
+        shipper.start()
+        shipper.stop()
+        self.assertEqual(handler.messages, ['2', '3', '4'])
+        self.assertEqual(shipper.sent, 3)
+
+    def test_drop_debug_first(self):
+        handler = CollectingHandler()
+        shipper = GelfShipper([handler], maxsize=3, overflow=DROP_DEBUG)
+        shipper.submit(make_record('info-1'))
+        shipper.submit(make_record('debug-1', 'DEBUG'))
+        shipper.submit(make_record('info-2'))
+        shipper.submit(make_record('info-3'))
+        # Queue is now all non-debug: an incoming debug record is the one dropped
+        shipper.submit(make_record('debug-2', 'DEBUG'))
+        self.assertEqual(shipper.dropped, 2)
+        shipper.start()
+        shipper.stop()
+        self.assertEqual(handler.messages, ['info-1', 'info-2', 'info-3'])
+
+    def test_no_blocking_policy(self):
+        # submit runs on the event loop, so it must never wait for the sender
+        with self.assertRaises(ValueError):
+            GelfShipper([CollectingHandler()], overflow='block')
+
+    def test_slow_handler_does_not_block_submit(self):
+        handler = CollectingHandler(delay=0.05)
+        shipper = GelfShipper([handler], maxsize=100, overflow=DROP_OLDEST)
+        shipper.start()
+        start = time.perf_counter()
+        for i in range(10000):
+            shipper.submit(make_record(str(i)))
+        elapsed = time.perf_counter() - start
+        shipper.stop(timeout=0.1)
+        self.assertLess(elapsed, 2.0)
+        self.assertGreater(shipper.dropped, 0)
+        self.assertEqual(shipper.submitted, 10000)
+
+    def test_send_errors_are_counted(self):
+        class FailingHandler(logging.Handler):
+            def emit(self, record):
+                raise OSError("graylog unreachable")
+
+            def handle(self, record):
+                self.emit(record)
+
+        shipper = GelfShipper([FailingHandler()])
+        shipper.submit(make_record('x'))
+        shipper.start()
+        shipper.stop()
+        self.assertEqual(shipper.send_errors, 1)
+        self.assertEqual((shipper.sent, shipper.failed), (0, 1))
+
+        # Sent as long as one handler delivered it
+        handler = CollectingHandler()
+        shipper = GelfShipper([FailingHandler(), handler])
+        shipper.submit(make_record('y'))
+        shipper.start()
+        shipper.stop()
+        self.assertEqual(handler.messages, ['y'])
+        self.assertEqual((shipper.sent, shipper.failed, shipper.send_errors), (1, 0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import threading
+import tempfile
+import unittest
+from sc2_bootstrap_discord.log_monitor import LogMonitor
+from sc2_bootstrap_discord.parser import parse_debug_line
+from sc2_bootstrap_discord.step_index import StepIndex, parse_game_time, read_excerpt
+
+LINE = "{time} {step}  52ms   195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 step {step} line {n}\n"
+
+
+def game_lines(steps, lines_per_step=4):
+    for step in range(steps):
+        seconds = int(step / 22.4)
+        for n in range(lines_per_step):
+            yield LINE.format(time=f'{seconds // 60:02d}:{seconds % 60:02d}', step=step, n=n)
+
+
+class TestStepIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'stderr.log')
+        open(self.path, 'w').close()
+
+    def test_parse_game_time(self):
+        self.assertEqual(parse_game_time('14:25'), 865)
+        self.assertEqual(parse_game_time('75:00'), 4500)
+        for bad in ('14', '14:5', 'ab:cd', ''):
+            with self.assertRaises(ValueError):
+                parse_game_time(bad)
+
+    def test_monitor_indexes_while_tailing_and_serves_excerpts(self):
+        monitor = LogMonitor(self.path, 'dummy_host', 12201, rollup_window=0)
+        self.addCleanup(monitor.shipper.stop)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        monitor._source(self.path)
+        monitor._poll_sources()
+        monitor.current_match_id = 5
+        with open(self.path, 'a') as f:
+            f.writelines(game_lines(22 * 60 * 3))
+        while monitor._poll_sources():
+            pass
+        index = monitor.sources[self.path].index
+        # One entry per game second, not per line
+        self.assertEqual(index.entries, 177)
+        path, lines = monitor.log_excerpt(5, parse_game_time('01:30'), lines=8)
+        self.assertEqual(path, self.path)
+        self.assertEqual(len(lines), 8)
+        # A quarter of the lines lead up to the requested time
+        self.assertTrue(lines[1].startswith('01:29'))
+        self.assertTrue(lines[2].startswith('01:30'))
+        self.assertIsNone(monitor.log_excerpt(6, 90))
+        for source in monitor.sources.values():
+            source.close()
+
+    def test_index_survives_restart_and_resets_on_truncation(self):
+        index = StepIndex(self.path)
+        offset = 0
+        for line in game_lines(22 * 10):
+            index.add(parse_debug_line(line.strip()), offset, 1)
+            offset += len(line)
+        index.close()
+        index = StepIndex(self.path)
+        self.assertEqual(index.runs, {1: (0, 10)})
+        self.assertIsNotNone(index.lookup(1, 4))
+        index.add(parse_debug_line(next(game_lines(1)).strip()), 0, 2)
+        self.assertEqual(index.runs, {2: (0, 1)})
+        self.assertEqual(os.path.getsize(index.index_path), 20)
+        index.close()
+
+    def test_offsets_count_bytes_of_multibyte_lines(self):
+        monitor = LogMonitor(self.path, 'dummy_host', 12201, rollup_window=0)
+        self.addCleanup(monitor.shipper.stop)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        monitor._source(self.path)
+        monitor._poll_sources()
+        monitor.current_match_id = 5
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for line in game_lines(22 * 30, lines_per_step=2):
+                # Two to four bytes a character
+                f.write(line.replace('line', 'Überfall → 🚀 line'))
+                f.write("Traceback: «ошибка»\n")
+        while monitor._poll_sources():
+            pass
+        index = monitor.sources[self.path].index
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for seconds in range(30):
+            offset = index.lookup(5, seconds)
+            self.assertTrue(offset == 0 or data[offset - 1:offset] == b'\n')
+            self.assertTrue(data[offset:].startswith(f'00:{seconds:02d} '.encode()))
+        lines = read_excerpt(self.path, index.lookup(5, 20), 20, lines=4)
+        self.assertTrue(lines[1].startswith('00:20 448 '))
+        self.assertIn('🚀', lines[1])
+        for source in monitor.sources.values():
+            source.close()
+
+    def test_offsets_survive_invalid_utf8(self):
+        monitor = LogMonitor(self.path, 'dummy_host', 12201, rollup_window=0)
+        self.addCleanup(monitor.shipper.stop)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        monitor._source(self.path)
+        monitor._poll_sources()
+        monitor.current_match_id = 5
+        with open(self.path, 'ab') as f:
+            for line in game_lines(22 * 30, lines_per_step=2):
+                # Each stray byte decodes to a three-byte replacement character
+                f.write(line.replace('line', 'bad \xff\xfe\x80 line').encode('latin-1'))
+        while monitor._poll_sources():
+            pass
+        index = monitor.sources[self.path].index
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for seconds in range(30):
+            offset = index.lookup(5, seconds)
+            self.assertTrue(offset == 0 or data[offset - 1:offset] == b'\n')
+            self.assertTrue(data[offset:].startswith(f'00:{seconds:02d} '.encode()))
+        lines = read_excerpt(self.path, index.lookup(5, 20), 20, lines=4)
+        self.assertTrue(lines[1].startswith('00:20 448 '))
+        for source in monitor.sources.values():
+            source.close()
+
+    def test_excerpts_from_a_thread_while_logs_are_cut(self):
+        monitor = LogMonitor(self.path, 'dummy_host', 12201, rollup_window=0)
+        self.addCleanup(monitor.shipper.stop)
+        monitor._emit = lambda message, fields, match_id=None, source=None: None
+        monitor._source(self.path)
+        monitor._poll_sources()
+        monitor.current_match_id = 5
+        results, errors = [], []
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                try:
+                    results.append(monitor.log_excerpt(5, 60, lines=4))
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        async def run():
+            for _ in range(8):
+                with open(self.path, 'a') as f:
+                    f.writelines(game_lines(22 * 70))
+                while monitor._poll_sources():
+                    pass
+                await asyncio.sleep(0.005)
+                await monitor.cut_logs()
+                await asyncio.sleep(0.005)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            asyncio.run(run())
+        finally:
+            stop.set()
+            reader.join()
+        self.assertEqual(errors, [])
+        found = [lines for _, lines in filter(None, results)]
+        self.assertTrue(found)
+        self.assertTrue(all(lines[1].startswith('01:00 ') for lines in found))
+        # Closed by the cut: a lookup comes back empty rather than reading a dead descriptor
+        index = StepIndex(self.path)
+        index.add(parse_debug_line(next(game_lines(1)).strip()), 0, 5)
+        index.close()
+        self.assertIsNone(index.lookup(5, 0))
+        for source in monitor.sources.values():
+            source.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
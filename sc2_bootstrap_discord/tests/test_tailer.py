@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.tailer import LogTailer
+
+
+class TestLogTailer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmpdir.name, 'stderr.log')
+        self.offset_path = self.log_path + '.offset'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _append(self, text, path=None):
+        with open(path or self.log_path, 'a') as f:
+            f.write(text)
+
+    def test_starts_at_end_and_holds_partial_lines(self):
+        self._append("old line\n")
+        tailer = LogTailer(self.log_path)
+        self.assertEqual(tailer.poll(), [])
+        self._append("first\nsecond\nthi")
+        self.assertEqual(tailer.poll(), ['first', 'second'])
+        self._append("rd\n")
+        self.assertEqual(tailer.poll(), ['third'])
+        tailer.close()
+
+    def test_file_created_after_start_is_read_from_beginning(self):
+        tailer = LogTailer(self.log_path)
+        self.assertEqual(tailer.poll(), [])
+        self._append("a\nb\n")
+        self.assertEqual(tailer.poll(), ['a', 'b'])
+        tailer.close()
+
+    def test_truncation_restarts_from_zero(self):
+        self._append("")
+        tailer = LogTailer(self.log_path)
+        tailer.poll()
+        self._append("one\ntwo\n")
+        self.assertEqual(tailer.poll(), ['one', 'two'])
+        with open(self.log_path, 'w') as f:
+            f.write("new\n")
+        self.assertEqual(tailer.poll(), ['new'])
+        tailer.close()
+
+    def test_rotation_drains_old_file_then_follows_new(self):
+        self._append("")
+        tailer = LogTailer(self.log_path)
+        tailer.poll()
+        self._append("before\n")
+        self.assertEqual(tailer.poll(), ['before'])
+        self._append("last words")
+        os.rename(self.log_path, self.log_path + '.1')
+        self._append("fresh\n")
+        self.assertEqual(tailer.poll(), ['last words', 'fresh'])
+        tailer.close()
+
+    def test_resumes_from_saved_offset(self):
+        self._append("")
+        tailer = LogTailer(self.log_path, offset_path=self.offset_path)
+        tailer.poll()
+        self._append("a\nb\n")
+        self.assertEqual(tailer.poll(), ['a', 'b'])
+        tailer.commit()
+        tailer.close()
+        # Written while the monitor was down
+        self._append("c\nd\n")
+        tailer = LogTailer(self.log_path, offset_path=self.offset_path)
+        self.assertEqual(tailer.poll(), ['c', 'd'])
+        tailer.close()
+
+    def test_uncommitted_lines_are_replayed(self):
+        self._append("")
+        tailer = LogTailer(self.log_path, offset_path=self.offset_path)
+        tailer.poll()
+        self._append("a\n")
+        tailer.poll()
+        tailer.commit()
+        self._append("b\n")
+        self.assertEqual(tailer.poll(), ['b'])
+        tailer.close()
+        tailer = LogTailer(self.log_path, offset_path=self.offset_path)
+        self.assertEqual(tailer.poll(), ['b'])
+        tailer.close()
+
+    def test_follow_yields_new_batches(self):
+        self._append("")
+
+        async def run():
+            tailer = LogTailer(self.log_path, poll_interval=0.01)
+            received = []
+
+            async def consume():
+                async for lines in tailer.follow():
+                    received.extend(lines)
+                    if len(received) >= 3:
+                        return
+
+            task = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.05)
+            self._append("x\ny\n")
+            await asyncio.sleep(0.05)
+            self._append("z\n")
+            await asyncio.wait_for(task, 10)
+            tailer.close()
+            return received
+
+        self.assertEqual(asyncio.run(run()), ['x', 'y', 'z'])
+
+    def test_line_offsets_count_raw_bytes(self):
+        tailer = LogTailer(self.log_path, from_end=False)
+        with open(self.log_path, 'wb') as f:
+            f.write(b'ok\nbad \xff\nlast\npartial')
+        self.assertEqual(tailer.poll(), ['ok', 'bad \ufffd', 'last'])
+        self.assertEqual(tailer.line_offsets(), [0, 3, 9])
+        with open(self.log_path, 'ab') as f:
+            f.write(b' line\n')
+        self.assertEqual(tailer.poll(), ['partial line'])
+        self.assertEqual(tailer.line_offsets(), [14])
+
+
+if __name__ == '__main__':
+    unittest.main()
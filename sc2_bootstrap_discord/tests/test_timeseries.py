@@ -0,0 +1,60 @@
+import unittest
+from sc2_bootstrap_discord.parser import parse_debug_line
+from sc2_bootstrap_discord.timeseries import MatchSeries, SeriesStore
+
+TEMPLATE = "{time} {step} {ms}ms 195M 3650G {supply}/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 attacking"
+
+
+def record(step, ms=50, supply=100, time='14:25'):
+    return parse_debug_line(TEMPLATE.format(time=time, step=step, ms=ms, supply=supply))
+
+
+class TestNumericFields(unittest.TestCase):
+    def test_units_are_stripped(self):
+        r = parse_debug_line("14:25 19376  152ms   195M 3650G 173/200U INFO terranbot.builds.plans.acts.tbone_attack:1077 x")
+        self.assertEqual((r.step_length_ms, r.minerals_count, r.gas_count, r.game_seconds),
+                         (152, 195, 3650, 865))
+
+
+class TestMatchSeries(unittest.TestCase):
+    def test_one_sample_per_step(self):
+        series = MatchSeries(1)
+        self.assertTrue(series.append(record(10)))
+        self.assertFalse(series.append(record(10, ms=999)))
+        self.assertTrue(series.append(record(11)))
+        self.assertEqual(list(series.step_ms), [50, 50])
+
+    def test_percentiles_and_peak_supply(self):
+        series = MatchSeries(1)
+        for step in range(1, 101):
+            series.append(record(step, ms=step, supply=min(step, 200)))
+        self.assertEqual(series.step_time_percentiles(), {'p50': 50, 'p95': 95, 'p99': 99})
+        self.assertEqual(series.summary(), {
+            'steps': 100, 'step_time_ms': {'p50': 50, 'p95': 95, 'p99': 99},
+            'max_step_time_ms': 100, 'peak_supply': 100,
+        })
+
+    def test_thirty_minute_game_is_compact(self):
+        series = MatchSeries(1)
+        for step in range(int(22.4 * 60 * 30)):
+            series.append(record(step, ms=step % 300, supply=step % 200))
+        self.assertLess(series.nbytes, 500 * 1024)
+
+
+class TestSeriesStore(unittest.TestCase):
+    def test_lookup_and_eviction(self):
+        store = SeriesStore(keep_matches=2)
+        store.get_or_create(1, 'TBone').append(record(1))
+        store.get_or_create(2, 'TBone')
+        store.get_or_create(2, 'Opponent')
+        self.assertIsNotNone(store.get(1, 'TBone'))
+        # Unknown bot name falls back to the only series of the match
+        self.assertIs(store.get(1, 'Other'), store.get(1, 'TBone'))
+        self.assertIsNone(store.get(2))
+        store.get_or_create(3, 'TBone')
+        self.assertIsNone(store.get(1, 'TBone'))
+        self.assertIsNotNone(store.get(2, 'Opponent'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import logging
+import time
+import unittest
+from sc2_bootstrap_discord.transports import (
+    GelfTransportHandler, HttpTransport, TcpTransport, UdpTransport, make_transport,
+    transport_options_from_env
+)
+from .gelf_receiver import GelfReceiver
+
+
+def gelf_messages(count, padding=0):
+    return [json.dumps({'version': '1.1', 'host': 'test', 'short_message': f'msg {i}' + 'x' * padding,
+                        '_game_step': i}).encode() for i in range(count)]
+
+
+class TestTransports(unittest.TestCase):
+    def measure(self, kind, transport, count=2000, batch_size=100):
+        """Send ``count`` messages and return (messages/sec, loss rate)."""
+        messages = gelf_messages(count)
+        start = time.perf_counter()
+        for i in range(0, count, batch_size):
+            transport.send_batch(messages[i:i + batch_size])
+        received = self.receiver.wait_for(count, timeout=5 if kind != 'udp' else 1)
+        elapsed = time.perf_counter() - start
+        transport.close()
+        return received / elapsed, 1 - received / count
+
+    def start_receiver(self, kind, **kwargs):
+        self.receiver = GelfReceiver(kind, **kwargs)
+        self.addCleanup(self.receiver.stop)
+        return self.receiver.start()
+
+    def test_udp_delivery(self):
+        port = self.start_receiver('udp')
+        rate, loss = self.measure('udp', UdpTransport('127.0.0.1', port))
+        print(f"udp: {rate:,.0f} msg/s, loss {loss:.2%}")
+        self.assertLess(loss, 0.5)
+
+    def test_tcp_delivery_is_lossless(self):
+        port = self.start_receiver('tcp')
+        rate, loss = self.measure('tcp', TcpTransport('127.0.0.1', port))
+        print(f"tcp: {rate:,.0f} msg/s, loss {loss:.2%}")
+        self.assertEqual(loss, 0)
+
+    def test_http_delivery_is_lossless(self):
+        port = self.start_receiver('http')
+        rate, loss = self.measure('http', HttpTransport('127.0.0.1', port))
+        print(f"http: {rate:,.0f} msg/s, loss {loss:.2%}")
+        self.assertEqual(loss, 0)
+
+    def test_udp_chunks_large_messages(self):
+        port = self.start_receiver('udp', keep_messages=True)
+        transport = UdpTransport('127.0.0.1', port, chunk_size=200, compress_level=0)
+        transport.send_batch(gelf_messages(1, padding=1000))
+        self.assertEqual(self.receiver.wait_for(1), 1)
+        self.assertTrue(self.receiver.messages[0]['short_message'].startswith('msg 0'))
+        transport.close()
+
+    def test_udp_drops_messages_needing_too_many_chunks(self):
+        port = self.start_receiver('udp')
+        transport = UdpTransport('127.0.0.1', port, chunk_size=20, compress_level=0)
+        transport.send_batch(gelf_messages(1, padding=2000))
+        self.assertEqual(transport.messages_dropped, 1)
+        transport.close()
+
+    def test_tcp_reconnects_after_server_restart(self):
+        port = self.start_receiver('tcp')
+        transport = TcpTransport('127.0.0.1', port)
+        transport.send_batch(gelf_messages(10))
+        self.assertEqual(self.receiver.wait_for(10), 10)
+        self.receiver.stop()
+        # The old connection is dead; the next batch must reconnect to the new server
+        transport._sock.close()
+        self.receiver = GelfReceiver('tcp')
+        self.addCleanup(self.receiver.stop)
+        self.receiver.start(port)
+        transport.send_batch(gelf_messages(10))
+        self.assertEqual(self.receiver.wait_for(10), 10)
+        self.assertEqual(transport.reconnects, 1)
+        transport.close()
+
+    def test_handler_formats_records(self):
+        port = self.start_receiver('http', keep_messages=True)
+        handler = GelfTransportHandler(make_transport('http', '127.0.0.1', port))
+        record = logging.LogRecord('sc2', logging.INFO, __file__, 0, 'hello', None, None)
+        record.game_step = 42
+        handler.ship_batch([record])
+        self.assertEqual(self.receiver.wait_for(1), 1)
+        self.assertEqual(self.receiver.messages[0]['short_message'], 'hello')
+        self.assertEqual(self.receiver.messages[0]['_game_step'], 42)
+        handler.close()
+
+    def test_options_from_env(self):
+        env = {'GELF_UDP_CHUNK_SIZE': '8154', 'GELF_UDP_COMPRESS_LEVEL': '1',
+               'GELF_HTTP_COMPRESS_LEVEL': '9', 'GELF_HTTP_PATH': '/gelf/bulk'}
+        self.assertEqual(transport_options_from_env('udp', env), {'chunk_size': 8154, 'compress_level': 1})
+        self.assertEqual(transport_options_from_env('http', env), {'path': '/gelf/bulk', 'compress_level': 9})
+        self.assertEqual(transport_options_from_env('tcp', env), {})
+        with self.assertRaises(ValueError):
+            make_transport('amqp', 'localhost', 12201)
+
+
+if __name__ == '__main__':
+    unittest.main()
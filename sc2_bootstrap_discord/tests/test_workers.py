@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from sc2_bootstrap_discord.workers import ResultsMerger, Worker, make_workers, project_name
+from . import fake_compose
+
+
+class Channel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message):
+        self.messages.append(message)
+
+
+class TestResultsMerger(unittest.TestCase):
+    def test_releases_in_match_order(self):
+        merger = ResultsMerger()
+        for match_id in (5, 6, 7, 8):
+            merger.expect(match_id)
+        self.assertEqual(merger.add(6, {'match': 6}), [])
+        self.assertEqual(merger.add(8, {'match': 8}), [])
+        self.assertEqual([entry['match'] for entry, _ in merger.add(5, {'match': 5})], [5, 6])
+        # A match without a result just lets the next one through
+        self.assertEqual([entry['match'] for entry, _ in merger.add(7, None)], [8])
+        self.assertEqual(len(merger), 0)
+
+    def test_ids_it_never_sees_do_not_hold_it_back(self):
+        merger = ResultsMerger()
+        # 6 went to the shared worker, which writes results.json itself
+        merger.expect(5)
+        merger.expect(7)
+        self.assertEqual(merger.add(7, {'match': 7}), [])
+        self.assertEqual([entry['match'] for entry, _ in merger.add(5, {'match': 5})], [5, 7])
+
+
+class TestWorkers(unittest.TestCase):
+    def test_make_workers(self):
+        local, = make_workers(None, results_path='main.json')
+        self.assertTrue(local.shared)
+        self.assertIsNone(local.log_directory)
+        self.assertEqual(local.results_file.path, 'main.json')
+        self.assertNotIn('{project}', local.compose_command)
+        a, b = make_workers(['pool/A', 'pool/b 2'])
+        self.assertEqual((a.name, b.name), ('sc2_a', 'sc2_b_2'))
+        self.assertIn('-p sc2_a ', a.compose_command)
+        self.assertEqual(a.results_file.path, os.path.join('pool/A', 'results.json'))
+        with self.assertRaises(ValueError):
+            make_workers(['x/a', 'y/a'])
+        self.assertEqual(project_name('.'), project_name(os.getcwd()))
+
+    def test_shared_and_farm_ids_do_not_collide(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                runner = Sc2Runner('terranbot', intents=discord.Intents.none(), queue_journal=None)
+                shared = runner._assign_match_id(runner.workers[0])
+                # A farm job while the shared match is still playing
+                self.assertEqual(runner._assign_match_id(None), shared + 1)
+                self.assertEqual(runner._assign_match_id(runner.workers[0]), shared + 2)
+                runner.io_executor.shutdown()
+                runner.results.close()
+            finally:
+                os.chdir(cwd)
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        import discord
+        from sc2_bootstrap_discord.sc2_runner import Sc2Runner
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        self.events = os.path.join(self.dir, 'events')
+        directories = [os.path.join('workers', name) for name in ('a', 'b', 'c')]
+        for directory in directories:
+            os.makedirs(directory)
+        self.runner = Sc2Runner('terranbot', intents=discord.Intents.none(),
+                                results_options={'results_path': 'results.json', 'db_path': 'results.db'},
+                                compose_command=fake_compose.command(game=0.3, teardown=0.2, events=self.events),
+                                workers=directories, concurrency=2)
+        for worker in self.runner.workers:
+            worker.completion.poll_interval = 0.02
+        self.addCleanup(self.runner.io_executor.shutdown)
+        self.addCleanup(self.runner.results.close)
+        self.channel = Channel()
+        self.runner.channel_id = 1
+        self.runner.get_channel = lambda channel_id: self.channel
+
+    async def drain(self):
+        """process_queue, polling quickly, until the queue is empty and every match reported."""
+        runner = self.runner
+        while runner.match_queue or runner.match_tasks:
+            if not await runner._dispatch():
+                await asyncio.sleep(0.02)
+        for worker in runner.workers:
+            if worker.teardown_task:
+                await worker.teardown_task
+
+    def overlap(self):
+        """Most matches playing at once, from the stand-in's start/end events."""
+        running = most = 0
+        with open(self.events) as f:
+            events = sorted((float(at), kind) for kind, _, at, *_ in (line.split() for line in f))
+        for _, kind in events:
+            running += 1 if kind == 'start' else -1
+            most = max(most, running)
+        return most
+
+    def test_matches_run_concurrently_and_merge_in_order(self):
+        for n in range(5):
+            self.runner.queue_match(f'bot{n}', 'GresvanAIE')
+        asyncio.run(self.drain())
+        self.assertEqual(self.overlap(), 2)
+        with open('results.json') as f:
+            results = json.load(f)['results']
+        self.assertEqual([entry['match'] for entry in results], [1, 2, 3, 4, 5])
+        self.assertEqual([entry['bot2'] for entry in results], [f'bot{n}' for n in range(5)])
+        self.assertTrue(all(entry['worker'].startswith('sc2_') for entry in results))
+        self.assertEqual(self.runner.results.leaderboard.totals('terranbot')['games'], 5)
+        reports = [m for m in self.channel.messages if m.startswith('**Match Results')]
+        self.assertEqual(len(reports), 5)
+        # Later ids continue from the merged results
+        self.assertEqual(self.runner._assign_match_id(self.runner.workers[0]), 6)
+
+    def test_a_match_without_result_does_not_block_the_merge(self):
+        self.runner.queue_match('bot0', 'crash')
+        self.runner.queue_match('bot1', 'GresvanAIE')
+        self.runner.queue_match('bot2', 'GresvanAIE')
+        asyncio.run(self.drain())
+        with open('results.json') as f:
+            self.assertEqual([entry['match'] for entry in json.load(f)['results']], [2, 3])
+        self.assertEqual(len(self.runner.merger), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()